@@ -0,0 +1,101 @@
+"""
+Render a fixed synthetic fixture under each encoder profile and report
+encode fps, wall time, CPU seconds and output size.
+
+Fixtures are generated locally with ffmpeg lavfi sources, so no assets or
+API keys are needed. Usage (from the repository root):
+    python -m benchmarks.bench_encoder_profiles --duration 20
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from src.subtitles import Cue, write_srt
+from src.video_processing import ENCODER_PROFILES, VIDEO_FPS, VideoProcessor
+
+
+def make_fixture(directory, duration):
+    """Background video, narration-like tone, music and subtitles for the benchmark"""
+    directory = Path(directory)
+    background = directory / 'background.mp4'
+    narration = directory / 'narration.wav'
+    music = directory / 'music.mp3'
+    subtitles = directory / 'subtitles.srt'
+
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc2=s=1280x720:r=25',
+                    '-t', '10', '-pix_fmt', 'yuv420p', str(background)], check=True)
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+                    '-i', f'sine=frequency=220:sample_rate=24000:duration={duration}',
+                    '-af', 'volume=0.5', str(narration)], check=True)
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+                    '-i', 'anoisesrc=color=pink:duration=15', '-ac', '2', str(music)], check=True)
+    write_srt([Cue(t, t + 2.0, f"Benchmark subtitle line number {int(t // 2) + 1}")
+               for t in range(0, int(duration), 2)], subtitles)
+
+    return {
+        'video': {
+            'background_video_path': str(background),
+            'background_music_path': str(music),
+            'output_path': str(directory / 'out'),
+            'asset_cache_dir': str(directory / 'cache' / 'backgrounds'),
+            'loudness_cache_dir': str(directory / 'cache' / 'loudness'),
+        }
+    }, narration, subtitles
+
+
+def run_profile(processor, profile, narration, subtitles, duration):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    output = processor.create_video(str(narration), str(subtitles), f"{profile}.mp4",
+                                    duration=duration, profile=profile)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if not output:
+        return {'profile': profile, 'error': 'render failed'}
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {
+        'profile': profile,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'encode_fps': round(duration * VIDEO_FPS / wall, 1),
+        'output_bytes': Path(output).stat().st_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encoder profile speed/quality benchmark")
+    parser.add_argument('--duration', type=float, default=20.0, help="Narration length in seconds")
+    parser.add_argument('--profiles', nargs='*', default=list(ENCODER_PROFILES))
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config, narration, subtitles = make_fixture(directory, args.duration)
+        processor = VideoProcessor(config)
+        # One-time asset work is not part of what we measure
+        processor.prepare_background()
+        processor.measure_loudness(config['video']['background_music_path'])
+
+        results = [run_profile(processor, profile, narration, subtitles, args.duration)
+                   for profile in args.profiles]
+
+    print(f"{'profile':<12}{'wall s':>9}{'cpu s':>9}{'fps':>8}{'size MB':>10}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['profile']:<12}{result['error']:>36}")
+            continue
+        print(f"{result['profile']:<12}{result['wall_seconds']:>9.2f}{result['cpu_seconds']:>9.2f}"
+              f"{result['encode_fps']:>8.1f}{result['output_bytes'] / 1e6:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
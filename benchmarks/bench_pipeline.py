@@ -0,0 +1,303 @@
+"""
+End-to-end pipeline benchmark with offline stand-ins.
+
+Runs VideoAutomation with the template text backend, the tone TTS engine
+and lavfi-generated background assets, so no API keys, model weights or
+network are needed. Every (script length, concurrency) case runs in a
+fresh process so peak RSS is per case. Per stage it records wall time,
+CPU time, peak RSS and output size; results are written as JSON and can
+be compared with an earlier run.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --facts 3 6 12 --concurrency 1 2
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline-abc1234.json
+    python -m benchmarks.bench_pipeline --in-memory --compare benchmarks/results/pipeline-abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from benchmarks.bench_encoder_profiles import make_fixture
+from main import VideoAutomation
+from src.metrics import children_cpu, peak_rss_bytes
+
+
+STAGES = ['script', 'tts', 'subtitles', 'render']
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    return peak_rss_bytes(who) / (1024 * 1024)
+
+
+class StageRecorder:
+    """
+    Per-job, per-stage measurements. Nested measurements (subtitles run
+    inside the render stage) are subtracted from the enclosing stage.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def measure(self, stage, job_id):
+        stack = self._local.__dict__.setdefault('stack', [])
+        record = {'stage': stage, 'job_id': job_id, 'output_bytes': 0, 'nested_wall': 0.0, 'nested_cpu': 0.0}
+        stack.append(record)
+        wall = time.perf_counter()
+        # Thread CPU covers Python work in this stage; ffmpeg runs as a child
+        # process, which is only attributed exactly when stages run one at a time
+        cpu = time.thread_time()
+        child_cpu = children_cpu()
+        try:
+            yield record
+        finally:
+            stack.pop()
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.thread_time() - cpu + children_cpu() - child_cpu
+            record['peak_rss_mb'] = peak_rss_mb()
+            if stack:
+                stack[-1]['nested_wall'] += record['wall_seconds']
+                stack[-1]['nested_cpu'] += record['cpu_seconds']
+            record['wall_seconds'] -= record.pop('nested_wall')
+            record['cpu_seconds'] -= record.pop('nested_cpu')
+            with self._lock:
+                self.records.append(record)
+
+
+def file_size(path):
+    return Path(path).stat().st_size if path and Path(path).exists() else 0
+
+
+class MeasuredAutomation(VideoAutomation):
+    """VideoAutomation with every stage wrapped in a StageRecorder measurement"""
+
+    def __init__(self, recorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def _script_stage(self, job):
+        with self.recorder.measure('script', job.job_id) as record:
+            job = super()._script_stage(job)
+            record['output_bytes'] = file_size(job.path('script.json'))
+        return job
+
+    def _tts_stage(self, job):
+        with self.recorder.measure('tts', job.job_id) as record:
+            job = super()._tts_stage(job)
+            record['output_bytes'] = (job.narration.nbytes if job.narration is not None
+                                      else file_size(job.narration_path))
+            if job.segments:
+                record['audio_seconds'] = job.segments[-1].end
+        return job
+
+    def _create_subtitles(self, job):
+        with self.recorder.measure('subtitles', job.job_id) as record:
+            created = super()._create_subtitles(job)
+            record['output_bytes'] = file_size(job.subtitle_path)
+        return created
+
+    def _render_stage(self, job):
+        with self.recorder.measure('render', job.job_id) as record:
+            final_video = super()._render_stage(job)
+            record['output_bytes'] = file_size(final_video)
+        return final_video
+
+
+def make_config(directory, facts, concurrency, profile, in_memory=False):
+    directory = Path(directory)
+    config, _, _ = make_fixture(directory, 1.0)
+    config['video']['encoder_profile'] = profile
+    config['video']['output_path'] = str(directory / 'videos')
+    config.update({
+        'llm': {'backend': 'template', 'cache': False},
+        'template': {'facts': facts},
+        'tts': {'model': 'tone', 'chunked': True, 'in_memory': in_memory, 'cache': False},
+        'subtitles': {'timing': 'auto'},
+        'pipeline': {
+            'scratch_dir': str(directory / 'jobs'),
+            'job_store': str(directory / 'jobs.sqlite3'),
+            'script_workers': concurrency,
+            'tts_workers': concurrency,
+            'render_workers': concurrency,
+        },
+        'render': {
+            'max_jobs': concurrency,
+            'threads_per_job': max(1, (os.cpu_count() or 1) // concurrency),
+        },
+    })
+    return config
+
+
+def summarize(records):
+    """Mean/max per stage over all jobs of a case"""
+    stages = {}
+    for stage in STAGES:
+        rows = [record for record in records if record['stage'] == stage]
+        if not rows:
+            continue
+        count = len(rows)
+        stages[stage] = {
+            'jobs': count,
+            'wall_seconds_mean': round(sum(r['wall_seconds'] for r in rows) / count, 4),
+            'wall_seconds_max': round(max(r['wall_seconds'] for r in rows), 4),
+            'cpu_seconds_mean': round(sum(r['cpu_seconds'] for r in rows) / count, 4),
+            'peak_rss_mb': round(max(r['peak_rss_mb'] for r in rows), 1),
+            'output_bytes_mean': int(sum(r['output_bytes'] for r in rows) / count),
+        }
+    return stages
+
+
+def run_case(facts, concurrency, videos, profile, in_memory=False):
+    """Run one case in this process and return its measurements"""
+    with tempfile.TemporaryDirectory() as directory:
+        config = make_config(directory, facts, concurrency, profile, in_memory)
+        recorder = StageRecorder()
+        automation = MeasuredAutomation(recorder, config=config)
+        # One-time asset work is not part of what we measure
+        automation.video_processor.prepare_background()
+        automation.video_processor.measure_loudness(config['video']['background_music_path'])
+
+        prompts = [f"Create a video about benchmark topic {index}" for index in range(videos)]
+        cpu_before = time.process_time() + children_cpu()
+        started = time.perf_counter()
+        if concurrency == 1:
+            results = [automation.create_video(prompt) for prompt in prompts]
+        else:
+            results = automation.create_videos(prompts)
+        wall = time.perf_counter() - started
+        cpu = time.process_time() + children_cpu() - cpu_before
+        automation.job_store.close()
+
+        audio = [r['audio_seconds'] for r in recorder.records if 'audio_seconds' in r]
+        return {
+            'facts': facts,
+            'concurrency': concurrency,
+            'videos': videos,
+            'succeeded': sum(1 for result in results if result),
+            'profile': profile,
+            'in_memory': in_memory,
+            'wall_seconds': round(wall, 3),
+            'cpu_seconds': round(cpu, 3),
+            'videos_per_hour': round(videos * 3600 / wall, 1) if wall else 0.0,
+            'audio_seconds_mean': round(sum(audio) / len(audio), 2) if audio else 0.0,
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'child_peak_rss_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            'stages': summarize(recorder.records),
+        }
+
+
+def run_case_isolated(facts, concurrency, videos, profile, in_memory=False):
+    """Run a case in a fresh interpreter so peak RSS only covers that case"""
+    with tempfile.NamedTemporaryFile(suffix='.json') as output:
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_pipeline', '--case',
+             json.dumps([facts, concurrency, videos, profile, in_memory]), '--case-output', output.name],
+            cwd=Path(__file__).parent.parent, capture_output=True, text=True)
+        if process.returncode != 0:
+            return {'facts': facts, 'concurrency': concurrency, 'error': process.stderr[-2000:]}
+        return json.loads(Path(output.name).read_text())
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(cases):
+    print(f"{'facts':>5}{'conc':>5}{'wall s':>9}{'cpu s':>9}{'rss MB':>8}{'videos/h':>10}  stage wall s (mean)")
+    for case in cases:
+        if 'error' in case:
+            print(f"{case['facts']:>5}{case['concurrency']:>5}  failed: {case['error'].splitlines()[-1:]}")
+            continue
+        stages = '  '.join(f"{name} {stage['wall_seconds_mean']:.2f}" for name, stage in case['stages'].items())
+        print(f"{case['facts']:>5}{case['concurrency']:>5}{case['wall_seconds']:>9.2f}{case['cpu_seconds']:>9.2f}"
+              f"{case['peak_rss_mb']:>8.0f}{case['videos_per_hour']:>10.0f}  {stages}")
+
+
+def compare(cases, baseline_path):
+    """Print the change of every case/stage metric against an earlier run"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {(case['facts'], case['concurrency']): case for case in baseline['cases'] if 'error' not in case}
+    print(f"\nChange versus {baseline.get('commit') or baseline_path}:")
+    for case in cases:
+        old = previous.get((case['facts'], case['concurrency']))
+        if old is None or 'error' in case:
+            continue
+        changes = [f"total wall {change(old['wall_seconds'], case['wall_seconds'])}",
+                   f"cpu {change(old['cpu_seconds'], case['cpu_seconds'])}",
+                   f"rss {change(old['peak_rss_mb'], case['peak_rss_mb'])}"]
+        for name, stage in case['stages'].items():
+            if name in old['stages']:
+                changes.append(f"{name} {change(old['stages'][name]['wall_seconds_mean'], stage['wall_seconds_mean'])}")
+        print(f"  facts={case['facts']} concurrency={case['concurrency']}: " + ', '.join(changes))
+
+
+def change(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark (offline)")
+    parser.add_argument('--facts', type=int, nargs='*', default=[3, 6, 12], help="Script lengths (facts per script)")
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 2], help="Workers per stage")
+    parser.add_argument('--videos-per-worker', type=int, default=2)
+    parser.add_argument('--profile', default='draft', help="Encoder profile")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Pipe the synthesized PCM into the render instead of a narration file")
+    parser.add_argument('--json', help="Results file (default: benchmarks/results/pipeline-<commit>[-in-memory].json)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--case-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        result = run_case(*json.loads(args.case))
+        Path(args.case_output).write_text(json.dumps(result))
+        return
+
+    cases = []
+    for facts in args.facts:
+        for concurrency in args.concurrency:
+            cases.append(run_case_isolated(facts, concurrency, concurrency * args.videos_per_worker,
+                                           args.profile, args.in_memory))
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+        },
+        'cases': cases,
+    }
+    # Each audio path gets its own file, so one run can be compared with the other
+    mode = '-in-memory' if args.in_memory else ''
+    output = Path(args.json) if args.json else RESULTS_DIR / f"pipeline-{commit or 'local'}{mode}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    print_results(cases)
+    print(f"\n📊 Results written to {output}")
+    if args.compare:
+        compare(cases, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark for the CLI subcommands.
+
+Every run starts a fresh interpreter that imports main and builds the
+components main() builds for the subcommand (main.COMMAND_COMPONENTS) from
+an offline config (template text backend, tone TTS engine), so only import
+and construction cost is measured, not the command's work. `status` runs
+as is, since it only reads the job store. Reports the median
+wall time, peak RSS and which heavy modules each command pulled in.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --commands render upload --tts-model F5TTS_v1_Base
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).parent.parent
+
+# Modules whose presence in sys.modules tells where startup time goes
+HEAVY_MODULES = ['numpy', 'ffmpeg', 'torch', 'torchaudio', 'f5_tts', 'faster_whisper',
+                 'googleapiclient', 'google_auth_oauthlib', 'src.llm_client']
+
+
+def make_config(directory, tts_model):
+    directory = Path(directory)
+    return {
+        'llm': {'backend': 'template', 'cache': False},
+        'tts': {'model': tts_model, 'cache': False},
+        'video': {
+            'background_video_path': str(directory / 'background.mp4'),
+            'background_music_path': str(directory / 'music.mp3'),
+            'output_path': str(directory / 'videos'),
+            'asset_cache_dir': str(directory / 'cache' / 'backgrounds'),
+            'loudness_cache_dir': str(directory / 'cache' / 'loudness'),
+        },
+        'subtitles': {'cache_dir': str(directory / 'cache' / 'subtitles')},
+        'pipeline': {'scratch_dir': str(directory / 'jobs'), 'job_store': str(directory / 'jobs.sqlite3')},
+        'youtube': {'session_store': str(directory / 'upload_sessions.json')},
+    }
+
+
+def cold_start(command, config_path):
+    """Runs in the child: import main and build what `command` needs"""
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    result = {'import_seconds': imported - started}
+    try:
+        if command == 'status':
+            main.print_status(config_path=config_path)
+        else:
+            main.VideoAutomation(main.load_config(config_path)).build(main.COMMAND_COMPONENTS[command])
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['build_seconds'] = time.perf_counter() - imported
+    result['modules'] = len(sys.modules)
+    result['heavy_modules'] = [name for name in HEAVY_MODULES if name in sys.modules]
+    scale = 1 if sys.platform == 'darwin' else 1024
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024)
+    return result
+
+
+def measure(command, config_path, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_startup', '--child', command, '--config', str(config_path)],
+            cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if process.returncode != 0:
+            return {'command': command, 'error': process.stderr.strip().splitlines()[-1:]}
+        run = json.loads(process.stdout.strip().splitlines()[-1])
+        run['wall_seconds'] = wall
+        runs.append(run)
+
+    median = lambda key: round(statistics.median(run[key] for run in runs), 4)
+    return {
+        'command': command,
+        'wall_seconds': median('wall_seconds'),
+        'import_seconds': median('import_seconds'),
+        'build_seconds': median('build_seconds'),
+        'peak_rss_mb': round(max(run['peak_rss_mb'] for run in runs), 1),
+        'modules': runs[-1]['modules'],
+        'heavy_modules': runs[-1]['heavy_modules'],
+        'error': runs[-1].get('error'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of each CLI subcommand")
+    parser.add_argument('--commands', nargs='*', help="Subcommands to measure (default: all)")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per command (median is reported)")
+    parser.add_argument('--tts-model', default='tone', help="tts.model to load for tts/run/resume")
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(cold_start(args.child, args.config)))
+        return
+
+    # Imported only here: the children must start without main loaded
+    from main import COMMAND_COMPONENTS
+    commands = args.commands or [*COMMAND_COMPONENTS, 'status']
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = Path(directory) / 'config.json'
+        config_path.write_text(json.dumps(make_config(directory, args.tts_model)))
+        results = [measure(command, config_path, args.repeat) for command in commands]
+
+    print(f"{'command':<8}{'wall s':>8}{'import s':>10}{'build s':>9}{'rss MB':>8}{'modules':>9}  heavy modules")
+    for result in results:
+        if 'wall_seconds' not in result:
+            print(f"{result['command']:<8}  failed: {result['error']}")
+            continue
+        heavy = ', '.join(result['heavy_modules']) or '-'
+        if result['error']:
+            heavy += f"  (⚠️ {result['error']})"
+        print(f"{result['command']:<8}{result['wall_seconds']:>8.3f}{result['import_seconds']:>10.3f}"
+              f"{result['build_seconds']:>9.3f}{result['peak_rss_mb']:>8.0f}{result['modules']:>9}  {heavy}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n📊 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark the local STT engine and report its real-time factor.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_stt output/jobs/<job>/narration.wav --runs 3
+"""
+
+import argparse
+import resource
+import time
+from src.audio_processing import load_pcm
+from src.stt_engine import DEFAULT_STT_MODEL, get_stt_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local STT real-time factor benchmark")
+    parser.add_argument('audio', help="Narration audio file to transcribe")
+    parser.add_argument('--model', default=DEFAULT_STT_MODEL)
+    parser.add_argument('--compute-type', default='int8')
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--window', type=float, default=30.0,
+                        help="Streaming window length in seconds")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    audio_seconds = len(load_pcm(args.audio)) / 16000
+
+    started = time.perf_counter()
+    engine = get_stt_engine(args.model, args.compute_type, args.threads)
+    print(f"Model load: {time.perf_counter() - started:.2f}s ({args.model}, {args.compute_type})")
+    print(f"Audio: {audio_seconds:.1f}s, window {args.window:.0f}s")
+
+    for run in range(args.runs):
+        started = time.perf_counter()
+        words = engine.transcribe_words(args.audio, window_seconds=args.window)
+        elapsed = time.perf_counter() - started
+        print(f"Run {run + 1}: {elapsed:.2f}s, {len(words)} words, "
+              f"RTF {elapsed / audio_seconds:.3f}")
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Overall RTF: {engine.real_time_factor():.3f}, peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the libass subtitles filter with pre-rendered overlay cues on the
+same synthetic fixture.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_subtitles --duration 30 --profile draft
+"""
+
+import argparse
+import resource
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.bench_encoder_profiles import make_fixture
+from src.video_processing import VIDEO_FPS, VideoProcessor
+
+
+def render(processor, engine, narration, subtitles, duration, profile, name):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    output = processor.create_video(str(narration), str(subtitles), f"{name}.mp4",
+                                    duration=duration, profile=profile,
+                                    segmented=False, subtitle_engine=engine)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    size = Path(output).stat().st_size if output else 0
+    return wall, cpu, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subtitle engine benchmark")
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--profile', default='draft')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config, narration, subtitles = make_fixture(directory, args.duration)
+        config['video']['background_music_path'] = ''
+        config['subtitles'] = {'cache_dir': str(Path(directory) / 'cache' / 'subtitles')}
+        processor = VideoProcessor(config)
+        processor.prepare_background()
+
+        runs = [
+            ('libass', 'libass'),
+            ('overlay (cold cue cache)', 'overlay'),
+            ('overlay (warm cue cache)', 'overlay'),
+        ]
+        print(f"{'engine':<26}{'wall s':>9}{'cpu s':>9}{'fps':>8}")
+        for index, (label, engine) in enumerate(runs):
+            wall, cpu, _ = render(processor, engine, narration, subtitles,
+                                  args.duration, args.profile, f"run{index}")
+            print(f"{label:<26}{wall:>9.2f}{cpu:>9.2f}{args.duration * VIDEO_FPS / wall:>8.1f}")
+
+        stats = processor.overlay_renderer.stats
+        print(f"Cue images: {stats['rendered']} rendered, {stats['cached']} reused")
+
+
+if __name__ == "__main__":
+    main()
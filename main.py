@@ -1,150 +1,806 @@
+import argparse
+import importlib
+import inspect
 import json
+import logging
+import os
+import threading
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from src.text_generation import TextGenerator
-from src.audio_processing import AudioProcessor
-from src.video_processing import VideoProcessor
+from src.job_store import JOB_STATUSES, JobStore
+from src.jobs import Job, load_segments, resolve_scratch_root, save_segments
+from src.metrics import PipelineMetrics
+from src.pipeline import Stage, StagedPipeline
+from src.script import Script, parse_script
+from src.utils import load_config, setup_logging
+
+
+# Heavy components are imported and built on first use, so importing main
+# (or running a subcommand that does not need them) never loads the text
+# backend, numpy/ffmpeg or the Google client libraries
+COMPONENTS = {
+    'text_generator': ('src.text_generation', 'TextGenerator'),
+    'audio_processor': ('src.audio_processing', 'AudioProcessor'),
+    'video_processor': ('src.video_processing', 'VideoProcessor'),
+    'uploader': ('src.youtube_uploader', 'YouTubeUploader'),
+}
+
+# What main() builds for each subcommand before running it. A dotted name is
+# an attribute loaded on first use, or a check method that is called: the TTS
+# model is never loaded up front (a job resumed at render does not need it,
+# and cached narrations skip it), only checked to be importable. Anything
+# else is only built if the command ends up needing it: render builds the
+# audio processor just for audio-timed subtitles, and run/resume build the
+# uploader when a video is done. `status` only opens the job store. Measured
+# by benchmarks/bench_startup.py.
+COMMAND_COMPONENTS = {
+    'script': ['text_generator'],
+    'tts': ['audio_processor.check_engine'],
+    'render': ['video_processor'],
+    'upload': ['uploader'],
+    'run': ['text_generator', 'audio_processor.check_engine', 'video_processor'],
+    'resume': ['text_generator', 'audio_processor.check_engine', 'video_processor'],
+}
+
+logger = logging.getLogger('video_automation')
+
+EXAMPLE_PROMPT = """
+    Create a viral-style video script about a current trending topic. Follow this exact format:
+
+    Title: 6 shocking facts about [choose a current trending topic]
+
+    Start with: "Here are 6 mind-blowing facts about [topic]"
+
+    Then list 6 facts, one per line, starting each with "Fact:" followed by the information.
+    Make each fact brief, engaging, and easy to understand.
+    Focus on recent events, discoveries, or trending news.
+
+    End with: "Which fact surprised you the most? Let us know in the comments!"
+
+    Important:
+    - Do not use numbers, hashtags, or special characters
+    - Keep each fact under 15 words
+    - Make it conversational and easy to read aloud
+    - Focus on verified, factual information
+    """
+
+
+def job_store_path(config):
+    return Path(__file__).parent / config.get('pipeline', {}).get('job_store', 'output/jobs.sqlite3')
 
 
 class VideoAutomation:
-    def __init__(self):
-        self.text_generator = TextGenerator()
-        self.audio_processor = AudioProcessor()
-        self.video_processor = VideoProcessor()
+    def __init__(self, config=None, text_generator=None, audio_processor=None, video_processor=None):
+        """
+        Components are built on first use from the shared config unless
+        passed in (a config dict or ready-made processors, e.g. offline
+        ones for benchmarks)
+        """
+        self.config = config if config is not None else load_config()
+        self._components = {
+            'text_generator': text_generator,
+            'audio_processor': audio_processor,
+            'video_processor': video_processor,
+        }
+        self._components_lock = threading.Lock()
 
         # Create necessary directories
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
 
-    def create_video(self, prompt):
+        pipeline_config = self.config.get('pipeline', {})
+        self.scratch_root = resolve_scratch_root(
+            pipeline_config, self.output_dir / "jobs")
+        self.keep_scratch = pipeline_config.get('keep_scratch', False)
+        self._job_store = None
+        self.jobs = []
+
+        # Progress messages and per-stage metrics events are logged; the
+        # metrics are also exported for Prometheus (see src/metrics.py)
+        json_log = self.config.get('metrics', {}).get('json_log', 'output/logs/pipeline.jsonl')
+        setup_logging(Path(__file__).parent / json_log if json_log else None)
+        self.metrics = PipelineMetrics.from_config(self.config, Path(__file__).parent)
+
+        # Opt-in (--profiling, VIDEO_AUTOMATION_PROFILE or profiling.enabled);
+        # when off the profiler is never imported
+        self.profiler = None
+        if os.environ.get('VIDEO_AUTOMATION_PROFILE') or self.config.get('profiling', {}).get('enabled'):
+            from src.profiling import PipelineProfiler, profiling_requested
+            if profiling_requested(self.config):
+                self.profiler = PipelineProfiler.from_config(self.config)
+
+    def component(self, name):
+        """Return a component, importing its module and building it on first use"""
+        with self._components_lock:
+            if self._components.get(name) is None:
+                module_name, class_name = COMPONENTS[name]
+                component_class = getattr(importlib.import_module(module_name), class_name)
+                self._components[name] = component_class(self.config)
+            return self._components[name]
+
+    def build(self, names):
+        """Build the named components up front (see COMMAND_COMPONENTS)"""
+        for name in names:
+            target = self
+            for attribute in name.split('.'):
+                target = getattr(target, attribute)
+            if inspect.ismethod(target):
+                target()
+        return self
+
+    @property
+    def text_generator(self):
+        return self.component('text_generator')
+
+    @property
+    def audio_processor(self):
+        return self.component('audio_processor')
+
+    @property
+    def video_processor(self):
+        return self.component('video_processor')
+
+    @property
+    def uploader(self):
+        return self.component('uploader')
+
+    @property
+    def job_store(self):
+        with self._components_lock:
+            if self._job_store is None:
+                self._job_store = JobStore(job_store_path(self.config))
+            return self._job_store
+
+    def _profile(self, job, stage):
+        if self.profiler is None:
+            return nullcontext()
+        # ffmpeg runs of these stages are benchmarked too
+        render_farm = self.video_processor.render_farm if stage in ('srt', 'render') else None
+        return self.profiler.stage(job.job_id, stage, render_farm)
+
+    @contextmanager
+    def _stage(self, job, stage, bytes_in=0):
+        """A checkpointed stage, measured by the pipeline metrics (and profiled if enabled)"""
+        with self.metrics.stage(job.job_id, stage, bytes_in) as record, self._profile(job, stage):
+            with self.job_store.stage(job.job_id, stage):
+                yield record
+
+    def new_job(self, prompt, output_filename=None):
+        """Create a job with its own scratch directory for one prompt"""
+        job = Job(prompt, self.video_processor.output_path,
+                  self.scratch_root, output_filename=output_filename)
+        job.subtitle_format = self.config.get('subtitles', {}).get('format', 'srt')
+        self.job_store.create_job(job)
+        self.jobs.append(job)
+        return job
+
+    def load_job(self, job_id):
+        """Recreate a stored job so it can continue from its last completed stage"""
+        record = self.job_store.get_job(job_id)
+        if record is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        if record['status'] == 'done' and record['final_path'] and Path(record['final_path']).exists():
+            raise ValueError(f"Job {job_id} is already done: {record['final_path']}")
+        job = Job(record['prompt'], self.video_processor.output_path,
+                  Path(record['scratch_dir']).parent, job_id=job_id,
+                  output_filename=record['output_filename'])
+        job.subtitle_format = self.config.get('subtitles', {}).get('format', 'srt')
+        self.jobs.append(job)
+        return job
+
+    def create_video(self, prompt, output_filename=None, job_id=None):
         """
         Complete video creation pipeline:
         1. Generate script from prompt
         2. Convert script to audio
         3. Generate subtitles
         4. Create final video
+
+        Intermediates are written to a per-job scratch directory and the
+        final video is moved into the output directory atomically. Each
+        stage is checkpointed in the job store; passing the job_id of a
+        failed job resumes it from the last completed stage.
         """
+        job = None
         try:
-            print("🧠 Generating script...")
-            script = self.text_generator.generate_script(prompt)
+            self.video_processor.validate_assets()
+            job = self.load_job(job_id) if job_id else self.new_job(prompt, output_filename)
+            final_video = self._run_job(job)
+
+            self.metrics.job_finished(job.job_id, True)
+            logger.info(f"✅ Video created successfully: {final_video}")
+            return final_video
+
+        except Exception as e:
+            job_label = f" (job {job.job_id})" if job else ""
+            if job:
+                self.metrics.job_finished(job.job_id, False)
+            logger.error(f"❌ Error in video creation pipeline{job_label}: {str(e)}")
+            return None
+
+    def resume(self, job_id):
+        """Continue a stored job from its last completed stage"""
+        return self.create_video(None, job_id=job_id)
+
+    def create_videos(self, prompts, script_workers=None, tts_workers=None, render_workers=None):
+        """
+        Create one video per prompt using a staged pipeline.
+
+        Script generation, TTS and rendering each get their own worker pool,
+        so the Gemini call for video N+1 overlaps with TTS for video N and
+        encoding for video N-1. Pools are sized by what limits each stage:
+        network round trips for scripts, the TTS model for audio and CPU
+        cores for ffmpeg.
+
+        Returns a list with the final video path (or None) for each prompt.
+        """
+        return self._run_batch(lambda: [self.new_job(prompt) for prompt in prompts],
+                               len(prompts), script_workers, tts_workers, render_workers)
+
+    def resume_videos(self, job_ids, script_workers=None, tts_workers=None, render_workers=None):
+        """Resume several stored jobs through the staged pipeline"""
+        def load_jobs():
+            jobs = []
+            for job_id in job_ids:
+                try:
+                    jobs.append(self.load_job(job_id))
+                except ValueError as e:
+                    logger.warning(f"⚠️ Skipping: {str(e)}")
+            return jobs
+
+        return self._run_batch(load_jobs, len(job_ids), script_workers, tts_workers, render_workers)
+
+    def _run_batch(self, make_jobs, count, script_workers, tts_workers, render_workers):
+        pipeline_config = self.config.get('pipeline', {})
+        if script_workers is None:
+            # Requests are paced by the backend's rate limiter, so the pool
+            # only needs to cover the allowed concurrency
+            script_workers = (pipeline_config.get('script_workers')
+                              or self.text_generator.backend.max_concurrency)
+        if tts_workers is None:
+            tts_workers = pipeline_config.get('tts_workers', 1)
+        if render_workers is None:
+            # More render workers than farm slots would only queue
+            render_workers = pipeline_config.get(
+                'render_workers', self.video_processor.render_farm.max_jobs)
+
+        try:
+            self.video_processor.validate_assets()
+        except ValueError as e:
+            logger.error(f"❌ Invalid assets, batch not started: {str(e)}")
+            return [None] * count
+
+        jobs = make_jobs()
+
+        pipeline = StagedPipeline([
+            Stage('script', self._script_stage, script_workers),
+            Stage('tts', self._tts_stage, tts_workers),
+            Stage('render', self._render_stage, render_workers),
+        ])
+        results = pipeline.run(jobs)
+        for job, result in zip(jobs, results):
+            self.metrics.job_finished(job.job_id, bool(result))
+
+        created = sum(1 for result in results if result)
+        logger.info(f"✅ Batch finished: {created}/{len(results)} videos created")
+        logger.info(f"📈 Stages: {self.metrics.report()}")
+        logger.info(f"📝 Script cache: {self.text_generator.cache_report()}")
+        logger.info(f"🎬 Render farm: {self.video_processor.render_farm.report()}")
+        logger.info(f"🎙️ TTS timings: {self.audio_processor.timing_report()}")
+        if self.audio_processor.segment_cache is not None:
+            logger.info(f"🗃️ TTS segment cache: {self.audio_processor.segment_cache.report()}")
+        return results
+
+    def _run_job(self, job):
+        job = self._script_stage(job)
+        job = self._tts_stage(job)
+        return self._render_stage(job)
+
+    def _script_stage(self, job):
+        artifact = self.job_store.completed_artifact(job.job_id, 'script')
+        if artifact:
+            job.script = Script.from_dict(json.loads(artifact.read_text(encoding='utf-8')))
+            logger.info(f"⏩ Reusing script (job {job.job_id})")
+            self.metrics.skip(job.job_id, 'script')
+            return job
+
+        with self._stage(job, 'script', len(job.prompt.encode('utf-8'))) as record:
+            logger.info(f"🧠 Generating script... (job {job.job_id})")
+            script = self.text_generator.generate_script(job.prompt)
             if not script:
                 raise Exception("Failed to generate script")
+            # Log first 100 chars of script
+            logger.info(f"Generated script: {script.text[:100]}...")
+            job.script = script
+
+            script_path = job.path("script.json")
+            script_path.write_text(json.dumps(script.to_dict()), encoding='utf-8')
+            record['bytes_out'] = script_path.stat().st_size
+            self.job_store.finish_stage(job.job_id, 'script', script_path)
+        return job
+
+    def _tts_stage(self, job):
+        artifact = self.job_store.completed_artifact(job.job_id, 'tts')
+        # An in-memory narration is checkpointed by its segments alone, so
+        # after a restart it is synthesized again (from the segment cache)
+        if artifact and artifact != job.path("segments.json"):
+            job.narration_path = artifact
+            job.segments = load_segments(job.path("segments.json"))
+            logger.info(f"⏩ Reusing narration (job {job.job_id})")
+            self.metrics.skip(job.job_id, 'tts')
+            return job
 
-            print("🎙️ Converting to speech...")
-            audio_path = self.output_dir / "narration.mp3"
-            # Print first 100 chars of script
-            print(f"Generated script: {script[:100]}...")
-            tts_result = self.audio_processor.text_to_speech(
-                script, str(audio_path))
+        with self._stage(job, 'tts', len(job.script.text.encode('utf-8'))) as record:
+            logger.info(f"🎙️ Converting to speech... (job {job.job_id})")
+            if self.audio_processor.in_memory:
+                # PCM stays in memory and is piped into the render; the WAV
+                # is only written when subtitles are timed from the audio
+                job.narration, job.segments = self.audio_processor.synthesize(job.script.lines())
+                if job.narration is None:
+                    raise Exception("Failed to convert text to speech")
+                save_segments(job.segments, job.path("segments.json"))
+                record['bytes_out'] = job.narration.nbytes
+                if self._subtitles_need_audio():
+                    checkpoint = job.narration.write_wav(job.narration_path)
+                else:
+                    checkpoint = job.path("segments.json")
+                self.job_store.finish_stage(job.job_id, 'tts', checkpoint)
+                return job
+
+            if self.audio_processor.chunked:
+                # Streamed sentence by sentence; keeps per-sentence durations
+                job.segments = self.audio_processor.text_to_speech_chunked(
+                    job.script.lines(), str(job.narration_path))
+                tts_result = job.segments is not None
+                if tts_result:
+                    save_segments(job.segments, job.path("segments.json"))
+            else:
+                tts_result = self.audio_processor.text_to_speech(
+                    job.script.text, str(job.narration_path))
+            audio_path = job.narration_path
             if not tts_result:
                 raise Exception("Failed to convert text to speech")
-            print(f"Audio file should be at: {audio_path}")
             if not audio_path.exists():
                 raise Exception(f"Audio file was not created at {audio_path}")
+            record['bytes_out'] = audio_path.stat().st_size
+            self.job_store.finish_stage(job.job_id, 'tts', audio_path)
+        return job
+
+    def _subtitles_need_audio(self):
+        """True when subtitles are timed from the narration audio instead of TTS segment durations"""
+        subtitle_config = self.config.get('subtitles', {})
+        return subtitle_config.get('timing', 'auto') != 'auto' or subtitle_config.get('karaoke', False)
+
+    def _narration_size(self, job):
+        if job.narration is not None:
+            return job.narration.nbytes
+        return job.narration_path.stat().st_size
 
-            print("🎬 Creating subtitles...")
-            subtitle_path = self.output_dir / "subtitles.srt"
-            # Get audio duration for subtitle timing
-            import ffmpeg
-            probe = ffmpeg.probe(str(audio_path))
-            duration = float(probe['streams'][0]['duration'])
+    def _render_stage(self, job):
+        final_artifact = self.job_store.completed_artifact(job.job_id, 'render')
+        if final_artifact:
+            logger.info(f"⏩ Video already rendered (job {job.job_id})")
+            self.metrics.skip(job.job_id, 'render')
+            self.job_store.set_job_status(job.job_id, 'done', final_path=str(final_artifact))
+            return str(final_artifact)
 
-            if not self.video_processor.create_simple_srt(script, duration, str(subtitle_path)):
-                raise Exception("Failed to create subtitles")
+        audio_path = job.narration_path
+        subtitle_path = job.subtitle_path
+
+        if self.job_store.completed_artifact(job.job_id, 'srt'):
+            logger.info(f"⏩ Reusing subtitles (job {job.job_id})")
+            self.metrics.skip(job.job_id, 'srt')
+        else:
+            with self._stage(job, 'srt') as record:
+                logger.info(f"🎬 Creating subtitles... (job {job.job_id})")
+                record['bytes_in'] = self._narration_size(job)
+                # Probed once; the metadata travels with the job from here on
+                job.audio_info = (job.narration.info() if job.narration is not None
+                                  else self.video_processor.media.probe(audio_path))
+                if not self._create_subtitles(job):
+                    raise Exception("Failed to create subtitles")
+                record['bytes_out'] = subtitle_path.stat().st_size
+                self.job_store.finish_stage(job.job_id, 'srt', subtitle_path)
 
-            print("🎬 Creating final video...")
-            final_video = self.video_processor.create_video(
-                str(audio_path),
+        with self._stage(job, 'render') as record:
+            logger.info(f"🎬 Creating final video... (job {job.job_id})")
+            record['bytes_in'] = self._narration_size(job) + subtitle_path.stat().st_size
+            if job.audio_info is None:
+                job.audio_info = (job.narration.info() if job.narration is not None
+                                  else self.video_processor.media.probe(audio_path))
+            rendered = self.video_processor.create_video(
+                job.narration if job.narration is not None else str(audio_path),
                 str(subtitle_path),
-                "final_video.mp4"
+                "render.mp4",
+                output_dir=job.scratch_dir,
+                duration=job.audio_info.duration
             )
 
-            if not final_video:
+            if not rendered:
                 raise Exception("Failed to create video")
 
-            print(f"✅ Video created successfully: {final_video}")
-            return final_video
+            final_video = job.publish(rendered)
+            job.narration = None
+            record['bytes_out'] = Path(final_video).stat().st_size
+            self.job_store.finish_stage(job.job_id, 'render', final_video)
+        self.job_store.set_job_status(job.job_id, 'done', final_path=final_video)
 
-        except Exception as e:
-            print(f"❌ Error in video creation pipeline: {str(e)}")
-            return None
+        if not self.keep_scratch:
+            job.cleanup()
+        return final_video
+
+    def _create_subtitles(self, job):
+        return self.create_subtitles(job.script, job.narration_path, job.subtitle_path,
+                                     segments=job.segments, audio_info=job.audio_info)
+
+    def create_subtitles(self, script, narration_path, subtitle_path, segments=None, audio_info=None):
+        """
+        Time subtitles as accurately as the available data allows:
+        per-sentence TTS durations, then a silence analysis (or local STT)
+        of the narration, then an even split over the audio duration
+        """
+        subtitle_config = self.config.get('subtitles', {})
+        timing = subtitle_config.get('timing', 'auto')
+        karaoke = subtitle_config.get('karaoke', False)
+        subtitle_path = str(subtitle_path)
+
+        if timing == 'auto' and segments and not karaoke:
+            return self.video_processor.create_timed_srt(segments, subtitle_path)
+        if timing in ('auto', 'energy', 'stt'):
+            method = 'stt' if timing == 'stt' else 'auto'
+            if self.audio_processor.generate_subtitles(
+                    str(narration_path), subtitle_path, text=script.lines(),
+                    method=method, karaoke=karaoke):
+                return True
+            logger.warning("⚠️ Audio-based subtitle timing failed, splitting evenly")
+
+        if audio_info is None:
+            audio_info = self.video_processor.media.probe(str(narration_path))
+        return self.video_processor.create_simple_srt(
+            script, audio_info.duration, subtitle_path)
+
+    def upload_video(self, video_path, metadata, job_id=None, privacy_status="private"):
+        """
+        Upload a finished video with the given title/description, measured
+        as the job's upload stage. Returns the video ID or None.
+        """
+        size = Path(video_path).stat().st_size
+        with self.metrics.stage(job_id or Path(video_path).stem, 'upload', size) as record:
+            video_id = self.uploader.upload_video(
+                video_path,
+                title=metadata['title'],
+                description=metadata['description'],
+                privacy_status=privacy_status,
+            )
+            if video_id:
+                record['bytes_out'] = size
+            else:
+                record['status'] = 'error'
+        return video_id
+
+    def upload_videos(self, video_paths, metadata, privacy_status="private"):
+        """
+        Upload several videos with the same title/description through the
+        uploader's resumable queue (youtube.max_workers at a time), each
+        measured as an upload stage. Returns the video IDs, None for failures.
+        """
+        videos = [(str(path), metadata['title'], metadata['description']) for path in video_paths]
+        return self.uploader.upload_videos(videos, privacy_status, measure=self._upload_stage)
+
+    @contextmanager
+    def _upload_stage(self, video_path):
+        size = Path(video_path).stat().st_size
+        with self.metrics.stage(Path(video_path).stem, 'upload', size) as record:
+            yield record
+            record['bytes_out'] = size
 
     def cleanup(self):
         """
-        Clean up temporary files
+        Clean up the scratch directories of jobs created by this instance
         """
         try:
-            # Remove temporary files but keep the final video
-            temp_files = ["narration.mp3", "subtitles.srt"]
-            for file in temp_files:
-                temp_path = self.output_dir / file
-                if temp_path.exists():
-                    temp_path.unlink()
+            # Final videos live in the output directory and are kept;
+            # unfinished jobs keep their scratch so they can be resumed
+            for job in self.jobs:
+                if job.final_path:
+                    job.cleanup()
         except Exception as e:
-            print(f"Warning: Cleanup failed: {str(e)}")
+            logger.warning(f"Warning: Cleanup failed: {str(e)}")
 
 
-def main():
-    # Example usage
-    automation = VideoAutomation()
+def load_prompts(path):
+    """
+    Read prompts from a text file, one prompt per block separated by a
+    line containing only '---'
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    prompts = [block.strip() for block in content.split('\n---\n')]
+    return [prompt for prompt in prompts if prompt]
 
-    # Example prompt
-    prompt = """
-    Create a viral-style video script about a current trending topic. Follow this exact format:
 
-    Title: 6 shocking facts about [choose a current trending topic]
+def format_stage(stage):
+    """One-line summary of a stage checkpoint for the status command"""
+    text = f"{stage['stage']}={stage['status']}"
+    if stage['started_at'] and stage['finished_at']:
+        text += f" ({stage['finished_at'] - stage['started_at']:.1f}s)"
+    return text
 
-    Start with: "Here are 6 mind-blowing facts about [topic]"
 
-    Then list 6 facts, one per line, starting each with "Fact:" followed by the information.
-    Make each fact brief, engaging, and easy to understand.
-    Focus on recent events, discoveries, or trending news.
+def print_status(status=None, config_path=None):
+    """List stored jobs with their stage checkpoints"""
+    store = JobStore(job_store_path(load_config(config_path)))
+    try:
+        jobs = store.list_jobs(status)
+        if not jobs:
+            print("No jobs found")
+        for job in jobs:
+            stages = ", ".join(format_stage(stage) for stage in store.stages(job['job_id']))
+            print(f"{job['job_id']}  {job['status']:<8} {stages}")
+            if job['final_path']:
+                print(f"    📁 {job['final_path']}")
+            if job['error']:
+                print(f"    ❌ {job['error']}")
+    finally:
+        store.close()
 
-    End with: "Which fact surprised you the most? Let us know in the comments!"
 
-    Important:
-    - Do not use numbers, hashtags, or special characters
-    - Keep each fact under 15 words
-    - Make it conversational and easy to read aloud
-    - Focus on verified, factual information
-    """
+def read_script(path):
+    """A Script from a script.json written by the script command, or from plain script text"""
+    text = Path(path).read_text(encoding='utf-8')
+    if Path(path).suffix == '.json':
+        return Script.from_dict(json.loads(text))
+    return parse_script(text)
+
+
+def segments_path(narration_path):
+    """Per-sentence timings written next to a narration by the tts command"""
+    return Path(narration_path).with_suffix('.segments.json')
+
+
+def print_results(results):
+    for result in results:
+        if result:
+            logger.info(f"📁 Video saved to: {result}")
+
+
+def command_script(automation, args):
+    """Generate a script and save it as JSON (printed when no output is given)"""
+    prompt = Path(args.prompt_file).read_text(encoding='utf-8') if args.prompt_file else args.prompt
+    script = automation.text_generator.generate_script(prompt or EXAMPLE_PROMPT)
+    if not script:
+        logger.error("❌ Failed to generate script")
+        return False
+
+    text = json.dumps(script.to_dict(), indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+        logger.info(f"📝 Script saved to: {args.output}")
+    else:
+        print(text)
+    return True
+
+
+def command_tts(automation, args):
+    """Narrate a script into a WAV file, keeping per-sentence timings for render"""
+    script = read_script(args.script)
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    segments = automation.audio_processor.text_to_speech_chunked(script.lines(), str(output_path))
+    if segments is None:
+        logger.error("❌ Failed to convert text to speech")
+        return False
+
+    save_segments(segments, segments_path(output_path))
+    logger.info(f"🎙️ Narration saved to: {output_path} ({segments[-1].end:.1f}s)" if segments
+                else f"🎙️ Narration saved to: {output_path}")
+    return True
+
+
+def command_render(automation, args):
+    """Render a narration (and its subtitles or script) into a video"""
+    narration_path = Path(args.narration)
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    subtitle_path = args.subtitles
+    if subtitle_path is None:
+        if not args.script:
+            logger.error("❌ Pass --subtitles or --script to time subtitles from")
+            return False
+        subtitle_format = automation.config.get('subtitles', {}).get('format', 'srt')
+        subtitle_path = output_path.with_suffix(f".{subtitle_format}")
+        logger.info("🎬 Creating subtitles...")
+        if not automation.create_subtitles(read_script(args.script), narration_path, subtitle_path,
+                                           segments=load_segments(segments_path(narration_path))):
+            logger.error("❌ Failed to create subtitles")
+            return False
+
+    logger.info("🎬 Creating final video...")
+    automation.video_processor.validate_assets()
+    rendered = automation.video_processor.create_video(
+        str(narration_path), str(subtitle_path), output_path.name,
+        output_dir=output_path.parent, profile=args.profile)
+    if not rendered:
+        logger.error("❌ Failed to create video")
+        return False
+    logger.info(f"📁 Video saved to: {rendered}")
+    return True
+
+
+def command_upload(automation, args):
+    """Upload existing videos, with metadata from a script or the command line"""
+    if args.script:
+        metadata = read_script(args.script).metadata()
+    else:
+        metadata = {'title': args.title or Path(args.videos[0]).stem, 'description': args.description}
+
+    video_ids = automation.upload_videos(args.videos, metadata, privacy_status=args.privacy)
+    for video_id in video_ids:
+        if video_id:
+            logger.info(f"🔗 Watch here: https://youtu.be/{video_id}")
+    return all(video_ids)
+
+
+def command_resume(automation, args):
+    if len(args.job_ids) == 1:
+        results = [automation.resume(args.job_ids[0])]
+    else:
+        results = automation.resume_videos(
+            args.job_ids,
+            script_workers=args.script_workers,
+            tts_workers=args.tts_workers,
+            render_workers=args.render_workers,
+        )
+    print_results(results)
+    return all(results)
+
+
+def command_run(automation, args):
+    """The full pipeline: script, narration, subtitles, render and upload"""
+    if args.prompts_file or args.count > 1:
+        prompts = load_prompts(args.prompts_file) if args.prompts_file else [EXAMPLE_PROMPT] * args.count
+        results = automation.create_videos(
+            prompts,
+            script_workers=args.script_workers,
+            tts_workers=args.tts_workers,
+            render_workers=args.render_workers,
+        )
+        print_results(results)
+        return all(results)
 
     try:
-        final_video = automation.create_video(prompt)
+        final_video = automation.create_video(EXAMPLE_PROMPT)
         if final_video:
-            print("\n🎉 Video creation completed!")
-            print(f"📁 Video saved to: {final_video}")
+            logger.info("\n🎉 Video creation completed!")
+            logger.info(f"📁 Video saved to: {final_video}")
 
             # Upload to YouTube
             try:
-                from src.youtube_uploader import YouTubeUploader
-                uploader = YouTubeUploader()
-
-                # Extract title from the script
-                title = prompt.split('\n')[0].strip()
-                if not title:
-                    title = "AI Generated Video"
+                # Title and description come from the generated script
+                metadata = automation.jobs[-1].script.metadata()
 
-                video_id = uploader.upload_video(
-                    final_video,
-                    title=title,
+                video_id = automation.upload_video(
+                    final_video, metadata, job_id=automation.jobs[-1].job_id,
                     privacy_status="private"  # Start as private for safety
                 )
 
                 if video_id:
-                    print(f"\n🎥 Video uploaded to YouTube!")
-                    print(f"🔗 Watch here: https://youtu.be/{video_id}")
-                    print("\nNote: The video is set to PRIVATE by default.")
-                    print("You can change privacy settings in YouTube Studio.")
+                    logger.info(f"\n🎥 Video uploaded to YouTube!")
+                    logger.info(f"🔗 Watch here: https://youtu.be/{video_id}")
+                    logger.info("\nNote: The video is set to PRIVATE by default.")
+                    logger.info("You can change privacy settings in YouTube Studio.")
             except Exception as e:
-                print(f"\n⚠️ YouTube upload failed: {str(e)}")
-                print("The video was created successfully but couldn't be uploaded.")
-                print("You can upload it manually or try again later.")
+                logger.warning(f"\n⚠️ YouTube upload failed: {str(e)}")
+                logger.warning("The video was created successfully but couldn't be uploaded.")
+                logger.warning("You can upload it manually or try again later.")
         else:
-            print("\n❌ Video creation failed")
+            logger.error("\n❌ Video creation failed")
+        return bool(final_video)
     finally:
         # Temporarily disable cleanup to debug audio issues
         pass  # automation.cleanup()
 
 
+COMMANDS = {
+    'script': command_script,
+    'tts': command_tts,
+    'render': command_render,
+    'upload': command_upload,
+    'run': command_run,
+    'resume': command_resume,
+}
+
+
+def add_worker_options(parser, default=None):
+    parser.add_argument('--script-workers', type=int, default=default,
+                        help="Concurrent script generation requests")
+    parser.add_argument('--tts-workers', type=int, default=default, help="Concurrent TTS workers")
+    parser.add_argument('--render-workers', type=int, default=default, help="Concurrent ffmpeg renders")
+
+
+def add_run_options(parser, default=None):
+    add_worker_options(parser, default)
+    parser.add_argument('--prompts-file', default=default,
+                        help="Render one video per prompt in this file (prompts separated by '---' lines)")
+    parser.add_argument('--count', type=int, default=1 if default is None else default,
+                        help="Render the example prompt this many times as a batch")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Automated YouTube Shorts creation")
+    parser.add_argument('--config', help="Configuration file (default: config/config.json)")
+    parser.add_argument('--profiling', action='store_true',
+                        help="Profile each pipeline stage (cProfile, allocations, ffmpeg -benchmark)")
+    # Run options may come before or after `run`; SUPPRESS keeps the
+    # subcommand's unset options from overwriting the top-level ones
+    add_run_options(parser)
+    subparsers = parser.add_subparsers(dest='command')
+
+    script_parser = subparsers.add_parser('script', help="Generate a script from a prompt")
+    script_parser.add_argument('prompt', nargs='?', help="Prompt (default: the example prompt)")
+    script_parser.add_argument('--prompt-file', help="Read the prompt from this file")
+    script_parser.add_argument('-o', '--output', help="Write the script JSON here instead of printing it")
+
+    tts_parser = subparsers.add_parser('tts', help="Narrate a script into a WAV file")
+    tts_parser.add_argument('script', help="script.json from the script command, or plain script text")
+    tts_parser.add_argument('-o', '--output', default='output/narration.wav')
+
+    render_parser = subparsers.add_parser('render', help="Render a narration into a video")
+    render_parser.add_argument('narration', help="Narration audio file")
+    render_parser.add_argument('--subtitles', help="Existing SRT/ASS subtitles")
+    render_parser.add_argument('--script', help="Script to time subtitles from when --subtitles is not given")
+    render_parser.add_argument('--profile', help="Encoder profile (default: video.encoder_profile)")
+    render_parser.add_argument('-o', '--output', default='output/video.mp4')
+
+    upload_parser = subparsers.add_parser('upload', help="Upload existing videos to YouTube")
+    upload_parser.add_argument('videos', nargs='+', metavar='VIDEO')
+    upload_parser.add_argument('--script', help="Take title and description from this script")
+    upload_parser.add_argument('--title')
+    upload_parser.add_argument('--description')
+    upload_parser.add_argument('--privacy', default='private', choices=['private', 'unlisted', 'public'])
+
+    run_parser = subparsers.add_parser('run', help="Full pipeline from prompt to upload (default)")
+    add_run_options(run_parser, argparse.SUPPRESS)
+
+    status_parser = subparsers.add_parser('status', help="List jobs and their stage checkpoints")
+    status_parser.add_argument('--status', choices=JOB_STATUSES, help="Only show jobs with this status")
+    resume_parser = subparsers.add_parser('resume', help="Continue failed jobs from their last completed stage")
+    resume_parser.add_argument('job_ids', nargs='+', metavar='JOB_ID')
+    add_worker_options(resume_parser, argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.command == 'status':
+        print_status(args.status, args.config)
+        return
+
+    # Each command only builds (and imports) the components it uses
+    command = args.command or 'run'
+    config = load_config(args.config)
+    if args.profiling:
+        config = dict(config, profiling=dict(config.get('profiling', {}), enabled=True))
+    automation = VideoAutomation(config)
+    try:
+        automation.build(COMMAND_COMPONENTS[command])
+    except Exception as e:
+        logger.error(f"❌ Could not set up '{command}': {str(e)}")
+        raise SystemExit(1)
+    port = automation.config.get('metrics', {}).get('port')
+    if port:
+        automation.metrics.serve(port)
+    try:
+        succeeded = COMMANDS[command](automation, args)
+    finally:
+        automation.metrics.close()
+        if automation.profiler is not None:
+            automation.profiler.close()
+    if not succeeded:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -1,11 +1,267 @@
-import json
+import logging
+import re
+import wave
 from pathlib import Path
-from f5_tts.api import F5TTS
+import ffmpeg
+import numpy as np
+from src.cache import DiskCache, cache_key
+from src.media_info import MediaInfo
+from src.stt_engine import DEFAULT_STT_MODEL, align_words_to_script, get_stt_engine
+from src.subtitles import (
+    align_sentences,
+    cues_from_words,
+    karaoke_ass_cues,
+    karaoke_srt_cues,
+    write_ass,
+    write_srt,
+)
+from src.tts_engine import DEFAULT_MODEL, check_tts_engine, get_tts_engine, voice_id
+from src.utils import load_config
+
+
+logger = logging.getLogger('video_automation.audio')
+
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+def script_sentences(text):
+    """
+    Sentences to synthesize/time: a list of script lines (Script.lines())
+    is used as given, plain text is split at sentence boundaries
+    """
+    if isinstance(text, (list, tuple)):
+        return [line.strip() for line in text if line and line.strip()]
+    return split_sentences(text)
+
+
+def split_sentences(text):
+    """Split a script into sentences at punctuation and line breaks"""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+
+def to_pcm16(samples):
+    """Convert float samples in [-1, 1] to little-endian 16-bit PCM bytes"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+def load_pcm(audio_path, sample_rate=16000):
+    """Decode any audio file to a mono float32 waveform at sample_rate"""
+    out, _ = (
+        ffmpeg
+        .input(str(audio_path))
+        .output('pipe:', format='f32le', ac=1, ar=sample_rate)
+        .run(capture_stdout=True, capture_stderr=True, quiet=True)
+    )
+    return np.frombuffer(out, dtype=np.float32)
+
+
+class NarrationSegment:
+    """A synthesized sentence and where it sits in the narration"""
+
+    def __init__(self, text, start, duration):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def __repr__(self):
+        return f"NarrationSegment({self.text!r}, start={self.start:.3f}, duration={self.duration:.3f})"
+
+
+class PcmAudio:
+    """
+    A narration held in memory as mono 16-bit PCM.
+
+    samples is a NumPy view over the synthesized buffer (no copy), and the
+    render reads it over ffmpeg's stdin through data, so the narration
+    never round-trips through an encoded intermediate file.
+    """
+
+    def __init__(self, pcm, sample_rate):
+        self.samples = np.frombuffer(pcm, dtype='<i2')
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    @property
+    def nbytes(self):
+        return self.samples.nbytes
+
+    @property
+    def data(self):
+        """The raw PCM as a byte memoryview over the same buffer"""
+        return memoryview(self.samples).cast('B')
+
+    def ffmpeg_input(self):
+        """An ffmpeg-python input reading this PCM from stdin"""
+        return ffmpeg.input('pipe:0', f='s16le', ar=self.sample_rate, ac=1)
+
+    def info(self):
+        return MediaInfo(None, self.duration, audio_codec='pcm_s16le',
+                         sample_rate=self.sample_rate, channels=1)
+
+    def write_wav(self, path):
+        with WavStreamWriter(path, self.sample_rate) as writer:
+            writer.write_pcm(self.data)
+        return Path(path)
+
+
+class WavStreamWriter:
+    """
+    Incremental 16-bit mono WAV writer.
+
+    Float PCM chunks are converted and appended as they arrive, so the full
+    narration never has to be held in memory.
+    """
+
+    def __init__(self, path, sample_rate):
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._wav = wave.open(str(path), 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, samples):
+        """Append float samples in [-1, 1] and return the chunk duration in seconds"""
+        return self.write_pcm(to_pcm16(samples))
+
+    def write_pcm(self, pcm):
+        """Append already encoded 16-bit PCM bytes as-is"""
+        self._wav.writeframes(pcm)
+        frames = len(pcm) // 2
+        self.frames += frames
+        return frames / self.sample_rate
+
+    def write_silence(self, seconds):
+        return self.write(np.zeros(int(seconds * self.sample_rate), dtype=np.float32))
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def close(self):
+        self._wav.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 class AudioProcessor:
-    def __init__(self):
-        self.tts = F5TTS()
+    def __init__(self, config=None):
+        if config is None:
+            config = load_config()
+
+        tts_config = config.get('tts', {})
+        self.chunked = tts_config.get('chunked', False)
+        # Synthesize into memory and pipe the PCM into the render (see synthesize)
+        self.in_memory = tts_config.get('in_memory', False)
+        self.sentence_pause = tts_config.get('sentence_pause', 0.1)
+        self.speed = tts_config.get('speed', 1.0)
+
+        subtitle_config = config.get('subtitles', {})
+        self.stt_model = subtitle_config.get('stt_model', DEFAULT_STT_MODEL)
+        self.ass_style = subtitle_config.get('ass_style')
+
+        # Shared per process and loaded on first synthesis, so processors
+        # that only time subtitles never load the model
+        self.tts_model = tts_config.get('model', DEFAULT_MODEL)
+        self._engine = None
+        self._voice = None
+        self._sample_rate = None
+
+        # Synthesized sentences, keyed by text + reference voice + model
+        self.segment_cache = None
+        if tts_config.get('cache', True):
+            cache_dir = Path(__file__).parent.parent / \
+                tts_config.get('cache_dir', 'cache/tts')
+            self.segment_cache = DiskCache(
+                cache_dir, tts_config.get('cache_max_mb', 1024) * 1024 * 1024)
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_tts_engine(self.tts_model)
+        return self._engine
+
+    def check_engine(self):
+        """Fail early if the TTS engine's dependencies are missing, without loading the model"""
+        check_tts_engine(self.tts_model)
+
+    @property
+    def tts(self):
+        return self.engine.tts
+
+    def timing_report(self):
+        """TTS engine timings, without loading the model if nothing was synthesized"""
+        if self._engine is None:
+            return "model not loaded"
+        return self._engine.timing_report()
+
+    @property
+    def voice(self):
+        """(model id, reference voice hash) of the narration voice, without loading the model"""
+        if self._voice is None:
+            self._voice = voice_id(self.tts_model)
+        return self._voice
+
+    @property
+    def sample_rate(self):
+        """
+        Sample rate of synthesized speech; remembered in the segment cache,
+        so fully cached narrations never load the model to find it out
+        """
+        if self._sample_rate is None:
+            key = cache_key('tts-sample-rate', *self.voice)
+            cached = self.segment_cache.get(key) if self.segment_cache is not None else None
+            if cached is not None:
+                self._sample_rate = int(cached)
+            else:
+                self._sample_rate = self.engine.sample_rate
+                if self.segment_cache is not None:
+                    self.segment_cache.put(key, str(self._sample_rate).encode('ascii'))
+        return self._sample_rate
+
+    def _segment_key(self, sentence):
+        model, voice = self.voice
+        return cache_key('tts-segment', sentence, voice, model, self.speed)
+
+    def _synthesize_pcm(self, sentences):
+        """
+        Yield (sentence, 16-bit PCM bytes) for each sentence, taking cached
+        segments from disk and synthesizing only the ones that changed. The
+        model and reference voice are only loaded on the first miss.
+
+        F5-TTS cross-fades the batches of a single infer call into one
+        waveform, so each sentence gets its own call to keep its exact
+        duration; only one sentence's audio is held in memory at a time.
+        """
+        reference = None
+        for sentence in sentences:
+            key = None
+            if self.segment_cache is not None:
+                key = self._segment_key(sentence)
+                pcm = self.segment_cache.get(key)
+                if pcm is not None:
+                    yield sentence, pcm
+                    continue
+
+            if reference is None:
+                reference = self.engine.reference()
+            audio, _ = self.engine.synthesize(sentence, reference, self.speed)
+            pcm = to_pcm16(audio)
+            if key is not None:
+                self.segment_cache.put(key, pcm)
+            yield sentence, pcm
 
     def text_to_speech(self, text, output_path):
         """
@@ -16,39 +272,152 @@ class AudioProcessor:
             output_dir = Path(output_path).parent
             output_dir.mkdir(parents=True, exist_ok=True)
 
-            # Reference files for voice style
-            ref_file = Path(__file__).parent.parent / \
-                'assets' / 'tts' / 'ref_voice.mp3'
-            ref_text = Path(__file__).parent.parent / \
-                'assets' / 'tts' / 'ref_text.txt'
-
-            # Use F5TTS instance to generate audio
-            audio_tuple = self.tts.infer(
-                gen_text=text, ref_file=str(ref_file), ref_text=str(ref_text))
-            # Unpack audio bytes from tuple
-            audio = audio_tuple[0] if isinstance(
-                audio_tuple, tuple) else audio_tuple
-            # Save audio to output_path
-            with open(output_path, "wb") as f:
-                f.write(audio)
+            # Reference voice (assets/tts/ref_voice.mp3 + ref_text.txt) is
+            # preprocessed once and cached by the engine
+            reference = self.engine.reference()
+            audio, sample_rate = self.engine.synthesize(text, reference, self.speed)
+            # The engine returns float samples; store them as 16-bit PCM WAV
+            with WavStreamWriter(output_path, sample_rate) as writer:
+                writer.write(audio)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error in text to speech conversion: {str(e)}")
+            return False
+
+    def text_to_speech_chunked(self, text, output_path):
+        """
+        Convert text to speech sentence by sentence, streaming the audio
+        into a WAV file as each sentence is synthesized.
+
+        Sentences already in the segment cache are copied into the WAV as
+        PCM without touching the model, so editing one line of a script
+        only re-synthesizes that line.
+
+        text may be plain text or the lines of a Script, which are kept as
+        the segment boundaries.
+
+        Returns the list of NarrationSegment with the exact start and
+        duration of every sentence, or None on failure.
+        """
+        try:
+            output_dir = Path(output_path).parent
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            sentences = script_sentences(text)
+            if not sentences:
+                raise ValueError("No sentences to synthesize")
+
+            segments = []
+            with WavStreamWriter(output_path, self.sample_rate) as writer:
+                for sentence, pcm in self._synthesize_pcm(sentences):
+                    if segments and self.sentence_pause:
+                        writer.write_silence(self.sentence_pause)
+                    start = writer.duration
+                    duration = writer.write_pcm(pcm)
+                    segments.append(NarrationSegment(sentence, start, duration))
+
+            return segments
+
+        except Exception as e:
+            logger.error(f"Error in chunked text to speech conversion: {str(e)}")
+            return None
+
+    def synthesize(self, text):
+        """
+        Synthesize a narration into memory, sentence by sentence like
+        text_to_speech_chunked (sharing its segment cache), without writing
+        any audio file.
+
+        Returns (PcmAudio, list of NarrationSegment), or (None, None) on
+        failure.
+        """
+        try:
+            sentences = script_sentences(text)
+            if not sentences:
+                raise ValueError("No sentences to synthesize")
+
+            sample_rate = self.sample_rate
+            pause = bytes(2 * int(self.sentence_pause * sample_rate))
+            pcm = bytearray()
+            segments = []
+            for sentence, chunk in self._synthesize_pcm(sentences):
+                if segments:
+                    pcm += pause
+                start = len(pcm) // 2 / sample_rate
+                pcm += chunk
+                segments.append(NarrationSegment(sentence, start, len(chunk) // 2 / sample_rate))
+
+            return PcmAudio(pcm, sample_rate), segments
+
+        except Exception as e:
+            logger.error(f"Error in text to speech conversion: {str(e)}")
+            return None, None
+
+    def generate_subtitles(self, audio_path, output_path, text=None, method='auto', karaoke=False):
+        """
+        Generate subtitles for a narration.
+
+        method 'energy' times the known script with a silence analysis of
+        the waveform (fast, no model). method 'stt' runs local CPU speech
+        recognition for word-level timestamps; when the script is known
+        the recognized timings are carried over to the script's own words.
+        'auto' uses 'energy' when text is given and 'stt' otherwise. text
+        may be plain text or the lines of a Script (one cue block each).
+
+        With karaoke=True cues are emitted word by word (\\k-timed ASS when
+        output_path ends in .ass, highlighted SRT otherwise).
+        """
+        if method == 'auto':
+            method = 'energy' if text and not karaoke else 'stt'
+
+        try:
+            if method == 'energy':
+                if not text:
+                    raise ValueError("Energy-based timing needs the script text")
+                sample_rate = 16000
+                samples = load_pcm(audio_path, sample_rate)
+                cues = align_sentences(script_sentences(text), samples, sample_rate)
+            else:
+                words = self.transcribe_words(audio_path, text)
+                if karaoke and str(output_path).endswith('.ass'):
+                    cues = karaoke_ass_cues(words)
+                elif karaoke:
+                    cues = karaoke_srt_cues(words)
+                else:
+                    cues = cues_from_words(words)
+
+            if not cues:
+                raise ValueError("No subtitle cues could be aligned")
+            if str(output_path).endswith('.ass'):
+                write_ass(cues, output_path, self.ass_style)
+            else:
+                write_srt(cues, output_path)
             return True
 
         except Exception as e:
-            print(f"Error in text to speech conversion: {str(e)}")
+            logger.error(f"Error generating subtitles: {str(e)}")
             return False
 
-    def generate_subtitles(self, audio_path, output_path):
+    def transcribe_words(self, audio_path, text=None):
         """
-        Generate subtitles from audio - placeholder
+        Word-level timestamps from the local STT engine, aligned to the
+        script words when the script is known
         """
-        print("STT functionality not yet implemented")
-        return False
+        if isinstance(text, (list, tuple)):
+            text = '\n'.join(text)
+        engine = get_stt_engine(self.stt_model)
+        words = engine.transcribe_words(audio_path, initial_prompt=text[:200] if text else None)
+        return align_words_to_script(words, text) if text else words
 
 
 if __name__ == "__main__":
     # Test the audio processing
     processor = AudioProcessor()
     test_text = "This is a test of the text to speech conversion."
-    result = processor.text_to_speech(test_text, "output/test_audio.mp3")
+    result = processor.text_to_speech(test_text, "output/test_audio.wav")
     if result:
         print("Audio file generated successfully")
+    print(processor.engine.timing_report())
+    if processor.segment_cache is not None:
+        print(f"Segment cache: {processor.segment_cache.report()}")
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+
+def cache_key(*parts):
+    """Build a content-addressed key from strings, bytes or JSON-able values"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode('utf-8')
+        else:
+            data = json.dumps(part, sort_keys=True).encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+# Every entry starts with a format tag and its write time (float64), whether
+# or not the cache has a TTL, so the TTL can be turned on and off over the
+# same directory. Entries without the header (older formats) read as misses.
+HEADER = struct.Struct('>4sd')
+HEADER_TAG = b'DC1\0'
+
+
+class DiskCache:
+    """
+    On-disk key/value cache with size-based LRU eviction.
+
+    Each entry is a file named after its key. Reads bump the file's mtime,
+    so eviction removes the least recently used entries first once the
+    total size goes over max_bytes.
+
+    With a ttl (seconds), entries also expire that long after they were
+    written, however often they are read. Unreadable entries are evicted
+    and count as misses.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024, ttl=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'expired': 0,
+                      'unreadable': 0}
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entries())
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def _entries(self):
+        return (path for path in self.directory.glob('*/*') if path.is_file()
+                and not path.name.endswith('.tmp'))
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        now = time.time()
+        if len(data) < HEADER.size or data[:len(HEADER_TAG)] != HEADER_TAG:
+            self._discard(path, len(data), 'unreadable')
+            return None
+        _, written = HEADER.unpack_from(data)
+        if self.ttl is not None and now - written > self.ttl:
+            self._discard(path, len(data), 'expired')
+            return None
+        data = data[HEADER.size:]
+
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.stats['hits'] += 1
+        return data
+
+    def put(self, key, data):
+        """Store bytes under key (atomic write) and evict old entries if needed"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        data = HEADER.pack(HEADER_TAG, time.time()) + data
+        temp_path.write_bytes(data)
+
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(temp_path, path)
+            self._size += len(data) - previous
+            self.stats['writes'] += 1
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _discard(self, path, size, reason):
+        with self._lock:
+            try:
+                path.unlink()
+                self._size -= size
+            except FileNotFoundError:
+                pass
+            self.stats[reason] += 1
+            self.stats['misses'] += 1
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.stats['evictions'] += 1
+
+    @property
+    def size(self):
+        return self._size
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def report(self):
+        """Human readable summary of the cache statistics"""
+        stats = self.stats
+        return (
+            f"{stats['hits']} hits/{stats['misses']} misses "
+            f"({self.hit_rate() * 100:.0f}% hit rate), "
+            f"{stats['evictions']} evictions, {self._size / (1024 * 1024):.1f} MB"
+        )
@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from src.utils import file_sha256
+
+
+JOB_STATUSES = ('queued', 'running', 'failed', 'done')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    scratch_dir TEXT NOT NULL,
+    output_filename TEXT NOT NULL,
+    final_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id TEXT NOT NULL REFERENCES jobs(job_id),
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    artifact TEXT,
+    sha256 TEXT,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class JobStore:
+    """
+    Persistent record of jobs and their stage checkpoints (SQLite).
+
+    Every completed stage stores the path and SHA-256 of the artifact it
+    produced. A re-run of the job skips stages whose artifact still exists
+    with the same hash and continues from the first incomplete one.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._db:
+            return self._db.execute(sql, params).fetchall()
+
+    def create_job(self, job):
+        now = time.time()
+        self._execute(
+            "INSERT OR IGNORE INTO jobs (job_id, prompt, status, scratch_dir, output_filename, "
+            "created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job.job_id, job.prompt, str(job.scratch_dir), job.output_filename, now, now))
+
+    def get_job(self, job_id):
+        rows = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def set_job_status(self, job_id, status, error=None, final_path=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, final_path = COALESCE(?, final_path), "
+            "updated_at = ? WHERE job_id = ?",
+            (status, error, final_path, time.time(), job_id))
+
+    def list_jobs(self, status=None):
+        if status:
+            rows = self._execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (status,))
+        else:
+            rows = self._execute("SELECT * FROM jobs ORDER BY created_at")
+        return [dict(row) for row in rows]
+
+    def stages(self, job_id):
+        rows = self._execute(
+            "SELECT * FROM stages WHERE job_id = ? ORDER BY started_at", (job_id,))
+        return [dict(row) for row in rows]
+
+    def completed_artifact(self, job_id, stage):
+        """
+        Path of a completed stage's artifact if it is still on disk with
+        the recorded hash, else None (the stage must run again)
+        """
+        rows = self._execute(
+            "SELECT artifact, sha256 FROM stages WHERE job_id = ? AND stage = ? AND status = 'done'",
+            (job_id, stage))
+        if not rows or not rows[0]['artifact']:
+            return None
+        artifact = Path(rows[0]['artifact'])
+        if not artifact.is_file() or file_sha256(artifact) != rows[0]['sha256']:
+            return None
+        return artifact
+
+    @contextmanager
+    def stage(self, job_id, stage):
+        """
+        Record a stage run. The body must call finish_stage() with its
+        artifact; an exception marks the stage and the job as failed.
+        """
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO stages (job_id, stage, status, started_at) "
+            "VALUES (?, ?, 'running', ?)", (job_id, stage, now))
+        self._execute(
+            "UPDATE jobs SET status = 'running', error = NULL, updated_at = ? WHERE job_id = ?",
+            (now, job_id))
+        try:
+            yield
+        except Exception as e:
+            self._execute(
+                "UPDATE stages SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE job_id = ? AND stage = ?", (str(e), time.time(), job_id, stage))
+            self.set_job_status(job_id, 'failed', error=f"{stage}: {str(e)}")
+            raise
+
+    def finish_stage(self, job_id, stage, artifact):
+        self._execute(
+            "UPDATE stages SET status = 'done', artifact = ?, sha256 = ?, finished_at = ?, "
+            "error = NULL WHERE job_id = ? AND stage = ?",
+            (str(artifact), file_sha256(artifact), time.time(), job_id, stage))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+def new_job_id():
+    """Create a unique, time-sortable job ID"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def resolve_scratch_root(pipeline_config, default_root):
+    """
+    Pick the directory where job scratch directories are created.
+
+    `pipeline.scratch_dir` wins if set; otherwise `pipeline.ram_scratch`
+    puts intermediates on /dev/shm (RAM-backed) when the host has it.
+    """
+    scratch_dir = pipeline_config.get('scratch_dir')
+    if scratch_dir:
+        return Path(scratch_dir)
+
+    shm = Path('/dev/shm')
+    if pipeline_config.get('ram_scratch') and shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / 'video-automation'
+
+    return Path(default_root)
+
+
+class Job:
+    """
+    A single video job with its own scratch directory.
+
+    All intermediates (narration, subtitles, the rendered video) live in
+    the scratch directory, so concurrent jobs never touch each other's
+    files. The finished video is moved into the output directory with an
+    atomic rename by publish().
+    """
+
+    def __init__(self, prompt, output_dir, scratch_root, job_id=None, output_filename=None):
+        self.job_id = job_id or new_job_id()
+        self.prompt = prompt
+        self.output_dir = Path(output_dir)
+        self.scratch_dir = Path(scratch_root) / self.job_id
+        self.output_filename = output_filename or f"{self.job_id}.mp4"
+        self.script = None
+        self.segments = None
+        # In-memory narration (PcmAudio) handed from the tts to the render stage
+        self.narration = None
+        self.audio_info = None
+        self.final_path = None
+
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        self.narration_path = self.path("narration.wav")
+        self.subtitle_format = "srt"
+
+    def path(self, name):
+        """Path of an intermediate file inside this job's scratch directory"""
+        return self.scratch_dir / name
+
+    @property
+    def subtitle_path(self):
+        return self.path(f"subtitles.{self.subtitle_format}")
+
+    def publish(self, rendered_path):
+        """
+        Atomically move the rendered video to output_dir/output_filename.
+
+        If the scratch directory is on another filesystem (e.g. tmpfs) the
+        file is first copied next to the destination and then renamed, so
+        readers never see a partially written video.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        destination = self.output_dir / self.output_filename
+        try:
+            os.replace(rendered_path, destination)
+        except OSError:
+            staging = self.output_dir / f".{self.output_filename}.{self.job_id}.tmp"
+            shutil.copyfile(rendered_path, staging)
+            os.replace(staging, destination)
+            Path(rendered_path).unlink()
+
+        self.final_path = str(destination)
+        return self.final_path
+
+    def cleanup(self):
+        """Remove this job's scratch directory"""
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def save_segments(segments, path):
+    """Store narration segments next to the narration they describe"""
+    data = [{'text': s.text, 'start': s.start, 'duration': s.duration} for s in segments]
+    Path(path).write_text(json.dumps(data), encoding='utf-8')
+
+
+def load_segments(path):
+    """Load segments written by save_segments(), or None if there are none"""
+    from src.audio_processing import NarrationSegment
+
+    path = Path(path)
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return [NarrationSegment(item['text'], item['start'], item['duration']) for item in data]
@@ -0,0 +1,418 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+
+logger = logging.getLogger('video_automation.llm')
+
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.0-flash"
+OPENAI_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Status codes worth retrying: rate limited or a transient server error
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A request that failed for good (bad request, or retries exhausted)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used to budget requests"""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window over requests and tokens.
+
+    acquire() waits until both the requests-per-minute and tokens-per-minute
+    budgets have room. The window is guarded by a thread lock, so one
+    limiter can be shared by event loops running in different threads.
+    """
+
+    def __init__(self, rpm=None, tpm=None, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._entries = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries and now - self._entries[0][0] >= self.window:
+            self._entries.popleft()
+
+    def _wait_time(self, tokens, now):
+        """Seconds until a request of this size fits, or 0 to go now"""
+        self._expire(now)
+        waits = []
+        if self.rpm and len(self._entries) >= self.rpm:
+            waits.append(self._entries[len(self._entries) - self.rpm][0] + self.window - now)
+        if self.tpm and self._entries:
+            # Never block forever on a single request larger than the budget
+            budget = max(self.tpm - tokens, 0)
+            used = sum(entry[1] for entry in self._entries)
+            for entry in self._entries:
+                if used <= budget:
+                    break
+                used -= entry[1]
+                waits.append(entry[0] + self.window - now)
+        return max(waits, default=0)
+
+    async def acquire(self, tokens=1):
+        """Reserve budget for one request; returns a handle for settle()"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    entry = [now, tokens]
+                    self._entries.append(entry)
+                    return entry
+            await asyncio.sleep(wait)
+
+    def settle(self, entry, tokens):
+        """Replace a reservation's estimated tokens with the real usage"""
+        with self._lock:
+            entry[1] = tokens
+
+
+class HTTPBackend:
+    """
+    Shared machinery for text generation backends behind an HTTP API.
+
+    Requests run in worker threads (urllib), share a RateLimiter and are
+    retried with exponential backoff on 429/5xx, honouring Retry-After.
+    Subclasses describe the request (_request) and the response
+    (response_text, _usage). base_url can point at a local stub server.
+    """
+
+    name = None
+    default_model = None
+    default_base_url = None
+    # config keys passed to __init__ by from_config()
+    options = ('model', 'base_url', 'timeout', 'max_retries', 'backoff', 'max_backoff',
+               'rpm', 'tpm', 'max_concurrency', 'max_output_tokens', 'generation_config')
+
+    def __init__(self, api_key, model=None, base_url=None,
+                 timeout=60, max_retries=5, backoff=1.0, max_backoff=60.0,
+                 rpm=None, tpm=None, max_concurrency=8, max_output_tokens=1024,
+                 generation_config=None):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        self.base_url = (base_url or self.default_base_url).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.max_output_tokens = max_output_tokens
+        self.generation_config = dict(generation_config or {})
+        self.limiter = RateLimiter(rpm, tpm)
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'tokens': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a backend from its section of config.json"""
+        options = {key: config[key] for key in cls.options if config.get(key) is not None}
+        return cls(config.get('api_key'), **options)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def request_params(self, json_mode=False):
+        """Everything besides the prompt that shapes a response"""
+        raise NotImplementedError
+
+    def _request(self, prompt, json_mode=False):
+        """(url, headers, JSON body) for one prompt"""
+        raise NotImplementedError
+
+    def _usage(self, payload):
+        """Total tokens billed for a response, if reported"""
+        raise NotImplementedError
+
+    def response_text(self, payload):
+        """The generated text in a response ('' if there is none)"""
+        raise NotImplementedError
+
+    def _post(self, prompt, json_mode=False):
+        """Blocking HTTP call; returns (status, headers, parsed body)"""
+        url, headers, body = self._request(prompt, json_mode)
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(body).encode('utf-8'),
+            headers=dict(headers, **{'Content-Type': 'application/json'}),
+            method='POST',
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b'{}')
+            except ValueError:
+                payload = {}
+            return e.code, e.headers, payload
+
+    def _retry_delay(self, attempt, headers):
+        retry_after = headers.get('Retry-After') if headers else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        # Full jitter keeps concurrent retries from arriving in lockstep
+        return random.uniform(delay / 2, delay)
+
+    async def generate_raw(self, prompt, json_mode=False):
+        """
+        Send one prompt and return the full JSON response. With json_mode
+        the model is asked to answer with a JSON object.
+        """
+        estimate = estimate_tokens(prompt) + self.max_output_tokens
+        for attempt in range(self.max_retries + 1):
+            reservation = await self.limiter.acquire(estimate)
+            self._count('requests')
+            try:
+                status, headers, payload = await asyncio.to_thread(self._post, prompt, json_mode)
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                status, headers, payload = None, None, {'error': {'message': str(e)}}
+
+            if status == 200:
+                usage = self._usage(payload)
+                if usage:
+                    self.limiter.settle(reservation, usage)
+                    self._count('tokens', usage)
+                return payload
+
+            error = payload.get('error')
+            message = (error.get('message') if isinstance(error, dict) else error) or f"HTTP {status}"
+            if status is not None and status not in RETRYABLE_STATUS:
+                self._count('failures')
+                raise LLMError(f"{self.name} request failed: {message}", status)
+            if attempt == self.max_retries:
+                break
+            self._count('retries')
+            await asyncio.sleep(self._retry_delay(attempt, headers))
+
+        self._count('failures')
+        raise LLMError(f"{self.name} request failed after {self.max_retries + 1} attempts: {message}", status)
+
+    async def generate(self, prompt):
+        """Send one prompt and return the generated text ('' if blocked)"""
+        return self.response_text(await self.generate_raw(prompt))
+
+    async def generate_many(self, prompts):
+        """
+        Run prompts concurrently (up to max_concurrency in flight, within the
+        rate limits). Returns texts in input order, with None for failures.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(prompt):
+            async with semaphore:
+                try:
+                    return await self.generate(prompt)
+                except LLMError as e:
+                    logger.error(f"Error generating text: {str(e)}")
+                    return None
+
+        return await asyncio.gather(*(run(prompt) for prompt in prompts))
+
+
+class GeminiClient(HTTPBackend):
+    """Gemini generateContent REST endpoint"""
+
+    name = 'gemini'
+    default_model = DEFAULT_MODEL
+    default_base_url = DEFAULT_BASE_URL
+
+    def request_params(self, json_mode=False):
+        generation_config = dict(self.generation_config)
+        generation_config.setdefault('maxOutputTokens', self.max_output_tokens)
+        if json_mode:
+            generation_config['responseMimeType'] = 'application/json'
+        return {'backend': self.name, 'model': self.model, 'generationConfig': generation_config}
+
+    def _request(self, prompt, json_mode=False):
+        return (
+            f"{self.base_url}/models/{self.model}:generateContent",
+            {'x-goog-api-key': self.api_key},
+            {
+                'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                'generationConfig': self.request_params(json_mode)['generationConfig'],
+            },
+        )
+
+    def _usage(self, payload):
+        return payload.get('usageMetadata', {}).get('totalTokenCount')
+
+    def response_text(self, payload):
+        """Concatenate the text parts of the first candidate"""
+        candidates = payload.get('candidates') or []
+        if not candidates:
+            return ''
+        parts = candidates[0].get('content', {}).get('parts', [])
+        return ''.join(part.get('text', '') for part in parts)
+
+
+class OpenAICompatibleClient(HTTPBackend):
+    """
+    Any /chat/completions API: OpenRouter, OpenAI, or a local server such
+    as llama.cpp, Ollama or vLLM (api_key may be empty for those)
+    """
+
+    name = 'openai'
+    default_base_url = OPENAI_BASE_URL
+
+    def request_params(self, json_mode=False):
+        params = dict(self.generation_config)
+        params.setdefault('max_tokens', self.max_output_tokens)
+        if json_mode:
+            params['response_format'] = {'type': 'json_object'}
+        return {'backend': self.name, 'base_url': self.base_url, 'model': self.model, 'params': params}
+
+    def _request(self, prompt, json_mode=False):
+        headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+        body = dict(self.request_params(json_mode)['params'], model=self.model,
+                    messages=[{'role': 'user', 'content': prompt}])
+        return f"{self.base_url}/chat/completions", headers, body
+
+    def _usage(self, payload):
+        return (payload.get('usage') or {}).get('total_tokens')
+
+    def response_text(self, payload):
+        choices = payload.get('choices') or []
+        if not choices:
+            return ''
+        return (choices[0].get('message') or {}).get('content') or ''
+
+
+TOPIC_PATTERNS = [
+    re.compile(r'facts about ([^\n.:,\[\]]+)', re.IGNORECASE),
+    re.compile(r'about (?:a |an |the )?([^\n.:,\[\]]+)', re.IGNORECASE),
+]
+
+TEMPLATE_FACTS = [
+    "Scientists are still finding new surprises about {topic} every year",
+    "Most people learn about {topic} completely by accident",
+    "The history of {topic} is much older than you think",
+    "There are more myths about {topic} than proven facts",
+    "Experts disagree about what makes {topic} so popular",
+    "Small changes in {topic} can have huge effects",
+    "Some of the best ideas about {topic} came from amateurs",
+    "Interest in {topic} has doubled in the last few years",
+    "Every country has its own story about {topic}",
+    "The simplest explanation of {topic} is usually the right one",
+]
+
+
+class TemplateBackend:
+    """
+    Offline, deterministic backend: builds a script in the house format
+    (title, hook, six facts, call to action) from the prompt's topic.
+
+    It needs no network or quota, so the rest of the pipeline can be run
+    and benchmarked end to end offline. The same prompt always gives the
+    same script.
+    """
+
+    name = 'template'
+
+    def __init__(self, facts=6, max_concurrency=64):
+        self.facts = facts
+        self.max_concurrency = max_concurrency
+        self.model = 'template'
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'tokens': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**{key: config[key] for key in ('facts', 'max_concurrency') if key in config})
+
+    def request_params(self, json_mode=False):
+        return {'backend': self.name, 'facts': self.facts, 'json': json_mode}
+
+    def topic(self, prompt):
+        for pattern in TOPIC_PATTERNS:
+            match = pattern.search(prompt)
+            if match and match.group(1).strip():
+                return match.group(1).strip()
+        return "this topic"
+
+    def script(self, prompt, json_mode=False):
+        topic = self.topic(prompt)
+        # Deterministic choice of facts for this prompt
+        start = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16) % len(TEMPLATE_FACTS)
+        parts = {
+            'title': f"{self.facts} shocking facts about {topic}",
+            'hook': f"Here are {self.facts} mind-blowing facts about {topic}",
+            'facts': [TEMPLATE_FACTS[(start + i) % len(TEMPLATE_FACTS)].format(topic=topic) + '.'
+                      for i in range(self.facts)],
+            'cta': "Which fact surprised you the most? Let us know in the comments!",
+        }
+        if json_mode:
+            return json.dumps(parts)
+        lines = [f"Title: {parts['title']}", parts['hook']]
+        lines += [f"Fact: {fact}" for fact in parts['facts']]
+        lines.append(parts['cta'])
+        return '\n'.join(lines)
+
+    async def generate_raw(self, prompt, json_mode=False):
+        self.stats['requests'] += 1
+        return {'text': self.script(prompt, json_mode)}
+
+    def response_text(self, payload):
+        return payload.get('text', '')
+
+    async def generate(self, prompt):
+        return self.script(prompt)
+
+    async def generate_many(self, prompts):
+        return [self.script(prompt) for prompt in prompts]
+
+
+BACKENDS = {
+    'gemini': GeminiClient,
+    'openai': OpenAICompatibleClient,
+    'template': TemplateBackend,
+}
+
+# Keys each backend needs in its config section
+REQUIRED_KEYS = {
+    'gemini': ['api_key'],
+    'openai': ['base_url', 'model'],
+    'template': [],
+}
+
+
+def backend_name(config):
+    return config.get('llm', {}).get('backend', 'gemini')
+
+
+def create_backend(config):
+    """
+    Build the text generation backend selected by `llm.backend`
+    (gemini, openai or template), configured from the section of the
+    same name
+    """
+    name = backend_name(config)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown llm.backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name].from_config(config.get(name, {}))
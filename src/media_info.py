@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import ffmpeg
+
+
+logger = logging.getLogger('video_automation.media')
+
+
+MEDIA_EXTENSIONS = {'.mp4', '.mov', '.mkv', '.webm', '.avi',
+                    '.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac'}
+
+
+def _parse_rate(rate):
+    """Parse an ffprobe frame rate such as '30000/1001'"""
+    try:
+        numerator, _, denominator = rate.partition('/')
+        denominator = float(denominator or 1)
+        return float(numerator) / denominator if denominator else 0.0
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+class MediaInfo:
+    """Typed subset of ffprobe output used by the pipeline"""
+
+    def __init__(self, path, duration, width=None, height=None, fps=None,
+                 video_codec=None, audio_codec=None, sample_rate=None, channels=None):
+        self.path = path
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.video_codec = video_codec
+        self.audio_codec = audio_codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def has_video(self):
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self):
+        return self.audio_codec is not None
+
+    @property
+    def resolution(self):
+        return (self.width, self.height) if self.has_video else None
+
+    @classmethod
+    def from_probe(cls, path, probe):
+        video = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'video'), None)
+        audio = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'audio'), None)
+
+        duration = probe.get('format', {}).get('duration')
+        if duration is None:
+            durations = [float(s['duration']) for s in probe.get('streams', []) if 'duration' in s]
+            duration = max(durations) if durations else 0.0
+
+        info = cls(str(path), float(duration))
+        if video is not None:
+            info.width = int(video.get('width', 0))
+            info.height = int(video.get('height', 0))
+            info.fps = _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate'))
+            info.video_codec = video.get('codec_name')
+        if audio is not None:
+            info.audio_codec = audio.get('codec_name')
+            info.sample_rate = int(audio.get('sample_rate', 0))
+            info.channels = int(audio.get('channels', 0))
+        return info
+
+    def __repr__(self):
+        parts = [f"duration={self.duration:.2f}s"]
+        if self.has_video:
+            parts.append(f"{self.width}x{self.height}@{self.fps:.2f} {self.video_codec}")
+        if self.has_audio:
+            parts.append(f"{self.audio_codec} {self.sample_rate}Hz")
+        # In-memory audio (audio_processing.PcmAudio.info) has no path
+        name = Path(self.path).name if self.path else '<memory>'
+        return f"MediaInfo({name}: {', '.join(parts)})"
+
+
+class MediaInfoService:
+    """
+    Probe each media file once.
+
+    Results are cached by path, mtime and size, so a file is only probed
+    again after it changes. Thread-safe; shared by the whole pipeline.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {'probes': 0, 'hits': 0}
+
+    def probe(self, path):
+        """Return MediaInfo for path, running ffprobe only on a cache miss"""
+        path = Path(path).resolve()
+        stat = os.stat(path)
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            info = self._cache.get(key)
+            if info is not None:
+                self.stats['hits'] += 1
+                return info
+
+        info = MediaInfo.from_probe(path, ffmpeg.probe(str(path)))
+        with self._lock:
+            self._cache[key] = info
+            self.stats['probes'] += 1
+        return info
+
+    def probe_directory(self, directory, extensions=MEDIA_EXTENSIONS, workers=4):
+        """
+        Probe every media file under a directory in parallel.
+
+        Returns a dict of path -> MediaInfo; files ffprobe cannot read are
+        reported and left out.
+        """
+        paths = sorted(p for p in Path(directory).rglob('*')
+                       if p.is_file() and p.suffix.lower() in extensions)
+        results = {}
+
+        def probe_one(path):
+            try:
+                return path, self.probe(path)
+            except (ffmpeg.Error, OSError) as e:
+                logger.warning(f"⚠️ Could not probe {path}: {str(e)}")
+                return path, None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, info in pool.map(probe_one, paths):
+                if info is not None:
+                    results[str(path)] = info
+        return results
+
+    def validate(self, path, require_video=False, require_audio=False):
+        """Probe an asset and raise ValueError if it is missing or unusable"""
+        if not Path(path).is_file():
+            raise ValueError(f"Media file not found: {path}")
+        try:
+            info = self.probe(path)
+        except ffmpeg.Error:
+            raise ValueError(f"Media file could not be read by ffprobe: {path}")
+        if require_video and not info.has_video:
+            raise ValueError(f"Media file has no video stream: {path}")
+        if require_audio and not info.has_audio:
+            raise ValueError(f"Media file has no audio stream: {path}")
+        if info.duration <= 0:
+            raise ValueError(f"Media file has no duration: {path}")
+        return info
+
+
+_service = MediaInfoService()
+
+
+def get_media_info_service():
+    """Return the process-wide media info service"""
+    return _service
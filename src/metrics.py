@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+STAGES = ['script', 'tts', 'srt', 'render', 'upload']
+
+# Upper bounds of the stage duration histogram, in seconds
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float('inf'))
+
+logger = logging.getLogger('video_automation.metrics')
+
+
+def children_cpu():
+    """CPU seconds used by finished child processes (ffmpeg)"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss_bytes(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return resource.getrusage(who).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per log record. Structured fields passed as
+    extra={'fields': {...}} are merged into the object.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StageStats:
+    """Running totals for one stage across all jobs"""
+
+    def __init__(self):
+        self.runs = {'ok': 0, 'error': 0, 'skipped': 0}
+        self.in_progress = 0
+        self.duration_sum = 0.0
+        self.cpu_sum = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_rss_growth = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def observe(self, record):
+        self.runs[record['status']] += 1
+        self.duration_sum += record['duration_seconds']
+        self.cpu_sum += record['cpu_seconds']
+        self.bytes_in += record['bytes_in']
+        self.bytes_out += record['bytes_out']
+        self.peak_rss_growth = max(self.peak_rss_growth, record['peak_rss_growth_bytes'])
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if record['duration_seconds'] <= bound:
+                self.buckets[index] += 1
+
+
+class PipelineMetrics:
+    """
+    Per-job, per-stage instrumentation: duration, CPU time, peak memory
+    growth, bytes in/out and errors.
+
+    Every finished stage is logged as a structured event (see
+    JsonFormatter) and folded into per-stage totals, which are exported in
+    the Prometheus text format to a file (for node_exporter's textfile
+    collector) and/or served on a local HTTP endpoint. Comparing
+    in-progress counts and duration sums across stages shows which one
+    limits throughput.
+
+    CPU time is the stage thread's own time plus the CPU of child
+    processes (ffmpeg) that finished meanwhile, so child CPU is only
+    attributed exactly when stages do not overlap. Likewise, peak memory
+    growth is how far the process RSS high-water mark rose while the stage
+    ran: exact for a stage running alone, and zero for a stage that stayed
+    under an earlier peak. The high-water mark itself is reported once, as
+    a process-wide figure.
+    """
+
+    def __init__(self, prometheus_path=None, namespace='video'):
+        self.prometheus_path = Path(prometheus_path) if prometheus_path else None
+        self.namespace = namespace
+        self.stages = {stage: StageStats() for stage in STAGES}
+        self.jobs = {'done': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @classmethod
+    def from_config(cls, config, base_dir):
+        """Build from the `metrics` section of config.json"""
+        metrics_config = config.get('metrics', {})
+        prometheus_file = metrics_config.get('prometheus_file', 'output/metrics.prom')
+        return cls(Path(base_dir) / prometheus_file if prometheus_file else None)
+
+    def _stats(self, stage):
+        return self.stages.setdefault(stage, StageStats())
+
+    @contextmanager
+    def stage(self, job_id, stage, bytes_in=0):
+        """
+        Measure one stage of one job. The yielded record takes the stage's
+        byte counts ('bytes_in', 'bytes_out'); an exception counts as an
+        error and is re-raised, and a caller that handles a failure itself
+        can set record['status'] = 'error'.
+        """
+        record = {'job_id': job_id, 'stage': stage, 'bytes_in': bytes_in, 'bytes_out': 0}
+        with self._lock:
+            self._stats(stage).in_progress += 1
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        child_cpu = children_cpu()
+        peak_rss = peak_rss_bytes()
+        try:
+            yield record
+            record.setdefault('status', 'ok')
+        except BaseException as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+            raise
+        finally:
+            record['duration_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.thread_time() - cpu + children_cpu() - child_cpu
+            record['process_peak_rss_bytes'] = peak_rss_bytes()
+            record['peak_rss_growth_bytes'] = record['process_peak_rss_bytes'] - peak_rss
+            with self._lock:
+                stats = self._stats(stage)
+                stats.in_progress -= 1
+                stats.observe(record)
+            logger.debug(f"{stage} {record['status']} in {record['duration_seconds']:.2f}s (job {job_id})",
+                         extra={'fields': {'event': 'stage', **record}})
+            self.write_prometheus()
+
+    def skip(self, job_id, stage):
+        """Count a stage whose checkpoint was reused"""
+        with self._lock:
+            self._stats(stage).runs['skipped'] += 1
+        logger.debug(f"{stage} skipped (job {job_id})",
+                     extra={'fields': {'event': 'stage', 'job_id': job_id, 'stage': stage, 'status': 'skipped'}})
+
+    def job_finished(self, job_id, succeeded):
+        status = 'done' if succeeded else 'failed'
+        with self._lock:
+            self.jobs[status] += 1
+        logger.debug(f"job {status} (job {job_id})",
+                     extra={'fields': {'event': 'job', 'job_id': job_id, 'status': status}})
+        self.write_prometheus()
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        name = self.namespace
+        lines = []
+
+        def metric(metric_name, kind, help_text, samples):
+            lines.append(f"# HELP {name}_{metric_name} {help_text}")
+            lines.append(f"# TYPE {name}_{metric_name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                label_text = f"{{{label_text}}}" if label_text else ''
+                lines.append(f"{name}_{metric_name}{suffix}{label_text} {value}")
+
+        with self._lock:
+            stages = list(self.stages.items())
+            metric('stage_runs_total', 'counter', "Stage runs by outcome",
+                   [('', {'stage': stage, 'status': status}, count)
+                    for stage, stats in stages for status, count in stats.runs.items()])
+            metric('stage_in_progress', 'gauge', "Stages currently running",
+                   [('', {'stage': stage}, stats.in_progress) for stage, stats in stages])
+
+            histogram = []
+            for stage, stats in stages:
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    histogram.append(('_bucket', {'stage': stage, 'le': '+Inf' if bound == float('inf') else bound},
+                                      count))
+                histogram.append(('_sum', {'stage': stage}, round(stats.duration_sum, 6)))
+                histogram.append(('_count', {'stage': stage}, stats.runs['ok'] + stats.runs['error']))
+            metric('stage_duration_seconds', 'histogram', "Wall time per stage run", histogram)
+
+            metric('stage_cpu_seconds_total', 'counter', "CPU time spent in stages, including child processes",
+                   [('', {'stage': stage}, round(stats.cpu_sum, 6)) for stage, stats in stages])
+            metric('stage_bytes_in_total', 'counter', "Bytes read by stages",
+                   [('', {'stage': stage}, stats.bytes_in) for stage, stats in stages])
+            metric('stage_bytes_out_total', 'counter', "Bytes written by stages",
+                   [('', {'stage': stage}, stats.bytes_out) for stage, stats in stages])
+            metric('stage_peak_rss_growth_bytes', 'gauge',
+                   "Largest rise of the process peak RSS during one stage run",
+                   [('', {'stage': stage}, stats.peak_rss_growth) for stage, stats in stages])
+            metric('process_peak_rss_bytes', 'gauge', "Process peak RSS (high-water mark) so far",
+                   [('', {}, peak_rss_bytes())])
+            metric('jobs_total', 'counter', "Finished jobs by outcome",
+                   [('', {'status': status}, count) for status, count in self.jobs.items()])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        """Atomically rewrite the metrics file, if one is configured"""
+        if self.prometheus_path is None:
+            return
+        try:
+            self.prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.prometheus_path.with_name(
+                f"{self.prometheus_path.name}.{threading.get_ident()}.tmp")
+            temp_path.write_text(self.prometheus_text(), encoding='utf-8')
+            os.replace(temp_path, self.prometheus_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write metrics file: {str(e)}")
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics on a background thread; returns the server"""
+        # Imported here: http.server costs more startup time than the rest
+        # of this module, and most runs never serve metrics
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logger.info(f"📈 Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def report(self):
+        """One-line summary per stage for the console"""
+        with self._lock:
+            parts = []
+            for stage, stats in self.stages.items():
+                runs = stats.runs['ok'] + stats.runs['error']
+                if not runs and not stats.runs['skipped']:
+                    continue
+                mean = stats.duration_sum / runs if runs else 0.0
+                parts.append(f"{stage} {runs} runs, {mean:.2f}s mean, {stats.runs['error']} errors")
+        return '; '.join(parts) or "no stages run"
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
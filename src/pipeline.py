@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+
+
+_STOP = object()
+
+logger = logging.getLogger('video_automation.pipeline')
+
+
+class Stage:
+    """A pipeline stage: a function applied to each item by its own worker pool"""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+
+
+class StagedPipeline:
+    """
+    Run items through a sequence of stages, each with its own worker threads.
+
+    Every stage reads from its own queue, so while one item is in the last
+    stage the next items can already be in the earlier ones. A stage that
+    raises or returns None marks the item as failed and it is not passed on.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.timings = {stage.name: [] for stage in self.stages}
+        self._lock = threading.Lock()
+
+    def run(self, items):
+        """
+        Process all items and return their final results in input order
+        (None for items that failed in any stage)
+        """
+        items = list(items)
+        results = [None] * len(items)
+        queues = [queue.Queue() for _ in self.stages]
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            next_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+            stage_threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[index], next_queue, results),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                for n in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        for position, item in enumerate(items):
+            queues[0].put((position, item))
+
+        # Shut stages down in order: once every worker of a stage has
+        # drained its queue, nothing more can reach the next one.
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                queues[index].put(_STOP)
+            for thread in threads[index]:
+                thread.join()
+
+        return results
+
+    def _worker(self, stage, in_queue, out_queue, results):
+        while True:
+            entry = in_queue.get()
+            if entry is _STOP:
+                return
+
+            position, value = entry
+            started = time.perf_counter()
+            try:
+                result = stage.func(value)
+            except Exception as e:
+                job_id = getattr(value, 'job_id', None)
+                logger.error(f"❌ Stage '{stage.name}' failed for item {position}"
+                             + (f" (job {job_id})" if job_id else "") + f": {str(e)}",
+                             extra={'fields': {'event': 'stage_failed', 'stage': stage.name,
+                                               'item': position, 'job_id': job_id, 'error': str(e)}})
+                result = None
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self.timings[stage.name].append(elapsed)
+
+            if result is None:
+                continue
+            if out_queue is None:
+                results[position] = result
+            else:
+                out_queue.put((position, result))
@@ -0,0 +1,193 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+
+# Set to anything but 0/false/no to profile every pipeline stage
+PROFILE_ENV = 'VIDEO_AUTOMATION_PROFILE'
+
+logger = logging.getLogger('video_automation.profiling')
+
+
+def profiling_requested(config=None):
+    """True when VIDEO_AUTOMATION_PROFILE is set or profiling.enabled is on"""
+    value = os.environ.get(PROFILE_ENV, '')
+    if value and value.lower() not in ('0', 'false', 'no'):
+        return True
+    return bool((config or {}).get('profiling', {}).get('enabled'))
+
+
+def frame_name(code):
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(';', ':')
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every interval seconds. The counts
+    are collapsed stacks ("outer;inner count"), the input format of
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class PipelineProfiler:
+    """
+    Opt-in profiling of pipeline stages (see profiling_requested).
+
+    Each stage runs under cProfile, a stack sampler and tracemalloc
+    snapshots; renders submitted to the render farm meanwhile run with
+    ffmpeg's -benchmark. Per job, the artifacts go to
+    <output_dir>/<job_id>.profile/:
+
+        <stage>.pstats             cProfile data (python -m pstats, snakeviz)
+        <stage>.collapsed          collapsed stacks for flame graphs
+        <stage>.allocations.txt    top allocations made during the stage
+        summary.json               per stage: wall time, top functions,
+                                   allocated bytes, ffmpeg utime/stime/rtime/maxrss
+
+    This shows whether a slow job spends its time in Python-side
+    preprocessing, in the TTS model or in ffmpeg. Only built when
+    profiling is enabled, so the disabled pipeline pays nothing.
+    """
+
+    def __init__(self, output_dir, top=25, sample_interval=0.005, memory_frames=10):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(memory_frames)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from the `profiling` section of config.json"""
+        profiling_config = config.get('profiling', {})
+        output_dir = profiling_config.get('output_dir') or config['video']['output_path']
+        return cls(
+            output_dir,
+            top=profiling_config.get('top', 25),
+            sample_interval=profiling_config.get('sample_interval', 0.005),
+            memory_frames=profiling_config.get('memory_frames', 10),
+        )
+
+    def job_dir(self, job_id):
+        return self.output_dir / f"{job_id}.profile"
+
+    @contextmanager
+    def stage(self, job_id, stage, render_farm=None):
+        """Profile the block as `stage` of `job_id`"""
+        directory = self.job_dir(job_id)
+        before = tracemalloc.take_snapshot()
+        sampler = StackSampler(threading.get_ident(), self.sample_interval).start()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; the
+            # sampler and tracemalloc still cover this stage
+            profile = None
+        renders = render_farm.collect(benchmark=True) if render_farm is not None else nullcontext([])
+
+        started = time.perf_counter()
+        try:
+            with renders as render_jobs:
+                yield
+        finally:
+            wall = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            try:
+                self._write(directory, stage, wall, profile, sampler, before, after, render_jobs)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write {stage} profile for job {job_id}: {str(e)}")
+
+    def _write(self, directory, stage, wall, profile, sampler, before, after, render_jobs):
+        directory.mkdir(parents=True, exist_ok=True)
+        summary = {'wall_seconds': round(wall, 4), 'samples': sum(sampler.stacks.values())}
+
+        if profile is not None:
+            profile.dump_stats(directory / f"{stage}.pstats")
+            stats = pstats.Stats(profile).sort_stats('cumulative')
+            summary['top_functions'] = [
+                {
+                    'function': pstats.func_std_string(function),
+                    'calls': stats.stats[function][1],
+                    'tottime': round(stats.stats[function][2], 4),
+                    'cumtime': round(stats.stats[function][3], 4),
+                }
+                for function in stats.fcn_list[:self.top]
+            ]
+        (directory / f"{stage}.collapsed").write_text(sampler.collapsed(), encoding='utf-8')
+
+        ignore = [tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)]
+        ignore.append(tracemalloc.Filter(False, '<frozen importlib._bootstrap>'))
+        allocations = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        summary['allocated_bytes'] = sum(stat.size_diff for stat in allocations if stat.size_diff > 0)
+        (directory / f"{stage}.allocations.txt").write_text(
+            ''.join(f"{stat}\n" for stat in allocations[:self.top]), encoding='utf-8')
+
+        if render_jobs:
+            summary['ffmpeg'] = [
+                {'label': job.label, 'status': job.status, 'wall_seconds': job.wall_seconds,
+                 'benchmark': job.benchmark}
+                for job in render_jobs
+            ]
+
+        with self._lock:
+            summary_path = directory / 'summary.json'
+            try:
+                summaries = json.loads(summary_path.read_text(encoding='utf-8'))
+            except (FileNotFoundError, ValueError):
+                summaries = {}
+            summaries[stage] = summary
+            summary_path.write_text(json.dumps(summaries, indent=2), encoding='utf-8')
+
+        ffmpeg_seconds = sum((job.benchmark or {}).get('rtime', 0.0) for job in render_jobs)
+        logger.info(f"🔬 {stage} profiled: {wall:.2f}s"
+                    + (f" ({ffmpeg_seconds:.2f}s in ffmpeg)" if ffmpeg_seconds else "")
+                    + f" → {directory}")
+
+    def close(self):
+        """Stop tracing allocations (if this profiler started it)"""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
@@ -0,0 +1,347 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import ffmpeg
+
+
+# ffmpeg -benchmark: "bench: utime=1.2s stime=0.1s rtime=2.0s", "bench: maxrss=12544KiB"
+BENCH_VALUE = re.compile(r'(\w+)=([\d.]+)(s|KiB)')
+
+
+class RenderTimeout(Exception):
+    """An ffmpeg render took longer than its timeout and was killed"""
+
+
+class RenderCancelled(Exception):
+    """An ffmpeg render was cancelled before it finished"""
+
+
+def parse_benchmark(stderr):
+    """CPU, wall time (seconds) and peak RSS (KiB) from ffmpeg -benchmark output"""
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode('utf-8', 'replace')
+    benchmark = {}
+    for line in stderr.splitlines():
+        if line.startswith('bench:'):
+            for name, value, unit in BENCH_VALUE.findall(line):
+                benchmark[f"{name}_kib" if unit == 'KiB' else name] = float(value)
+    return benchmark
+
+
+def plan_concurrency(cpu_count=None, max_jobs=None, threads_per_job=None):
+    """
+    Choose how many ffmpeg processes to run at once and how many threads
+    each gets, so jobs x threads matches the core count.
+
+    x264 stops scaling well past a handful of threads per encode, so beyond
+    4 cores it is better to run more encodes in parallel than to give one
+    encode more threads.
+    """
+    cores = cpu_count or os.cpu_count() or 1
+    jobs = max_jobs or max(1, cores // 4)
+    threads = threads_per_job or max(1, cores // jobs)
+    return jobs, threads
+
+
+class RenderJob:
+    """One queued or running ffmpeg command"""
+
+    def __init__(self, job_id, args, timeout, label=None, input=None, video=False):
+        self.job_id = job_id
+        self.args = args
+        # True for a job that produces a whole video (counted for throughput)
+        self.video = video
+        self.input = input
+        self.timeout = timeout
+        self.label = label or f"render-{job_id}"
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.returncode = None
+        self.benchmark = None
+        self.future = None
+        self._process = None
+        self._cancelled = False
+
+    @property
+    def wall_seconds(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def result(self):
+        """Wait for the render and return (stdout, stderr), raising on failure"""
+        return self.future.result()
+
+
+class RenderVideo:
+    """A video rendered as several ffmpeg jobs, e.g. segments plus their concat"""
+
+    def __init__(self, label):
+        self.label = label
+        self.jobs = []
+        self.status = 'running'
+        self.started_at = time.time()
+        self.finished_at = None
+        self._cancelled = False
+
+
+class RenderFarm:
+    """
+    Bounded pool of concurrent ffmpeg processes.
+
+    Jobs beyond max_jobs wait in a FIFO queue. Each job can have a timeout
+    after which its process is killed, and queued or running jobs can be
+    cancelled. Jobs submitted with video=True (a complete video rather
+    than a probe, preparation step or segment) feed a videos-per-hour
+    throughput figure, as does a video() group of jobs; only the last
+    `history` finished jobs are kept for inspection.
+    """
+
+    def __init__(self, max_jobs=None, threads_per_job=None, default_timeout=None, history=100):
+        self.max_jobs, self.threads_per_job = plan_concurrency(
+            max_jobs=max_jobs, threads_per_job=threads_per_job)
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_jobs, thread_name_prefix='render')
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.active = {}
+        self.finished = deque(maxlen=history)
+        self.finished_counts = {}
+        self.video_counts = {}
+        self.started_at = None
+        self.last_finished_at = None
+        self._local = threading.local()
+
+    def submit(self, stream_spec, timeout=None, label=None, input=None, video=False, parent=None):
+        """
+        Queue an ffmpeg-python stream spec (or argument list) for rendering.
+        input is fed to ffmpeg's stdin (a 'pipe:0' input); bytes-like
+        objects are passed as a memoryview, so large buffers are not copied.
+        video=True marks a render that produces a finished video; parent
+        is the RenderVideo (see video()) the job is a part of.
+        """
+        if isinstance(stream_spec, (list, tuple)):
+            args = list(stream_spec)
+        else:
+            args = ffmpeg.compile(stream_spec, overwrite_output=True)
+
+        collector = getattr(self._local, 'collector', None)
+        if collector is not None and collector[1]:
+            args = [args[0], '-benchmark', *args[1:]]
+
+        with self._lock:
+            if parent is not None and parent._cancelled:
+                raise RenderCancelled(parent.label)
+            self._next_id += 1
+            job = RenderJob(self._next_id, args, timeout or self.default_timeout, label,
+                            None if input is None else memoryview(input).cast('B'), video)
+            self.active[job.job_id] = job
+            if parent is not None:
+                parent.jobs.append(job)
+        if collector is not None:
+            collector[0].append(job)
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def run(self, stream_spec, timeout=None, label=None, input=None, video=False, parent=None):
+        """
+        Render and wait, like ffmpeg.run(): returns (stdout, stderr) and
+        raises ffmpeg.Error on a non-zero exit
+        """
+        return self.submit(stream_spec, timeout, label, input, video, parent).result()
+
+    @contextmanager
+    def video(self, label):
+        """
+        Group the jobs submitted with parent=<the yielded RenderVideo> into
+        one video: it counts once for throughput, and cancel(video) or an
+        error inside the block cancels all of its jobs
+        """
+        video = RenderVideo(label)
+        try:
+            yield video
+        except BaseException as e:
+            self.cancel(video)
+            self._finish_video(video, 'cancelled' if isinstance(e, RenderCancelled) else 'failed')
+            raise
+        self._finish_video(video, 'done')
+
+    def _finish_video(self, video, status):
+        with self._lock:
+            video.status = status
+            video.finished_at = time.time()
+            self.video_counts[status] = self.video_counts.get(status, 0) + 1
+            self.last_finished_at = video.finished_at
+
+    @property
+    def jobs(self):
+        """Queued and running jobs plus the most recently finished ones, oldest first"""
+        with self._lock:
+            return sorted([*self.finished, *self.active.values()], key=lambda job: job.job_id)
+
+    @contextmanager
+    def collect(self, benchmark=False):
+        """
+        Collect the jobs submitted from this thread while the block runs.
+        With benchmark=True they run with ffmpeg's -benchmark and its
+        timings end up in job.benchmark (see parse_benchmark).
+        """
+        jobs = []
+        previous = getattr(self._local, 'collector', None)
+        self._local.collector = (jobs, benchmark)
+        try:
+            yield jobs
+        finally:
+            self._local.collector = previous
+
+    def cancel(self, job):
+        """Cancel a queued job or kill a running one, or every job of a RenderVideo"""
+        if isinstance(job, RenderVideo):
+            with self._lock:
+                job._cancelled = True
+                jobs = list(job.jobs)
+            for part in jobs:
+                self.cancel(part)
+            return True
+
+        with self._lock:
+            job._cancelled = True
+            if job.status == 'queued' and job.future.cancel():
+                self._retire(job, 'cancelled')
+                return True
+            process = job._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        return True
+
+    def _run(self, job):
+        with self._lock:
+            if job._cancelled:
+                self._retire(job, 'cancelled')
+                raise RenderCancelled(job.label)
+            job.status = 'running'
+            job.started_at = time.time()
+            if self.started_at is None:
+                self.started_at = job.started_at
+
+        # Spawning can be slow, so it happens outside the lock; a cancel
+        # that arrives meanwhile is picked up once the process is stored
+        try:
+            process = subprocess.Popen(
+                job.args, stdin=subprocess.DEVNULL if job.input is None else subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError:
+            self._finish(job, 'failed')
+            raise
+        with self._lock:
+            job._process = process
+            cancelled = job._cancelled
+        if cancelled:
+            process.kill()
+
+        try:
+            stdout, stderr = process.communicate(job.input, timeout=job.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            self._finish(job, 'timeout')
+            raise RenderTimeout(f"{job.label} exceeded {job.timeout}s")
+
+        job.returncode = process.returncode
+        if '-benchmark' in job.args:
+            job.benchmark = parse_benchmark(stderr)
+        if job._cancelled:
+            self._finish(job, 'cancelled')
+            raise RenderCancelled(job.label)
+        if job.returncode != 0:
+            self._finish(job, 'failed')
+            raise ffmpeg.Error('ffmpeg', stdout, stderr)
+
+        self._finish(job, 'done')
+        return stdout, stderr
+
+    def _finish(self, job, status):
+        with self._lock:
+            self._retire(job, status)
+
+    def _retire(self, job, status):
+        """Move a job from active to the finished history (call with the lock held)"""
+        job.status = status
+        job.finished_at = time.time()
+        job._process = None
+        # Recent jobs stay in the history; do not keep their input alive
+        job.input = None
+        self.active.pop(job.job_id, None)
+        self.finished.append(job)
+        self.finished_counts[status] = self.finished_counts.get(status, 0) + 1
+        if job.video:
+            self.video_counts[status] = self.video_counts.get(status, 0) + 1
+            self.last_finished_at = job.finished_at
+
+    def stats(self):
+        """
+        Job and video counts by status, and throughput in finished videos
+        per hour from the first render's start to the last video's finish
+        """
+        with self._lock:
+            counts = dict(self.finished_counts)
+            for job in self.active.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            videos = dict(self.video_counts)
+            elapsed = (self.last_finished_at - self.started_at
+                       if self.started_at and self.last_finished_at else 0.0)
+        done = videos.get('done', 0)
+        return {
+            'max_jobs': self.max_jobs,
+            'threads_per_job': self.threads_per_job,
+            'counts': counts,
+            'videos': videos,
+            'videos_per_hour': done * 3600 / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        videos = ', '.join(f"{count} {status}" for status, count in sorted(stats['videos'].items()))
+        counts = ', '.join(f"{count} {status}" for status, count in sorted(stats['counts'].items()))
+        return (f"{stats['max_jobs']} parallel x {stats['threads_per_job']} threads; "
+                f"videos: {videos or 'none'}; ffmpeg jobs: {counts or 'none'}; "
+                f"{stats['videos_per_hour']:.1f} videos/hour")
+
+    def shutdown(self, cancel_pending=False):
+        if cancel_pending:
+            with self._lock:
+                pending = list(self.active.values())
+            for job in pending:
+                self.cancel(job)
+        self._executor.shutdown(wait=True)
+
+
+_farm = None
+_farm_lock = threading.Lock()
+
+
+def get_render_farm(render_config=None):
+    """
+    Return the process-wide render farm; the first call's config
+    (render.max_jobs, render.threads_per_job, render.timeout,
+    render.history) sizes it
+    """
+    global _farm
+    with _farm_lock:
+        if _farm is None:
+            render_config = render_config or {}
+            _farm = RenderFarm(
+                max_jobs=render_config.get('max_jobs'),
+                threads_per_job=render_config.get('threads_per_job'),
+                default_timeout=render_config.get('timeout'),
+                history=render_config.get('history', 100),
+            )
+        return _farm
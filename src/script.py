@@ -0,0 +1,156 @@
+import json
+import re
+
+
+# One pass over the model output. Each line is a parenthetical note (dropped),
+# a labelled part ("Title:", "Fact 3:", "**Hook**:"), a list item or plain text.
+TOKENIZER = re.compile(r"""
+    ^[ \t]*\((?P<note>[^\n]*)\)[ \t]*$
+  | ^[ \t]*(?:[-*•][ \t]+|\d+[.)][ \t]+)?[#*_ \t]*
+        (?P<label>title|hook|intro|fact|call[ \t]to[ \t]action|cta|outro)
+        (?:[ \t]*\d+)?[*_ \t]*:[*_ \t]*(?P<labelled>[^\n]*?)[ \t]*$
+  | ^[ \t]*(?:[-*•]|\d+[.)])[ \t]+(?P<item>[^\n]*?)[ \t]*$
+  | ^[ \t]*(?P<line>\S[^\n]*?)[ \t]*$
+""", re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+# Markdown and other characters the TTS engine would read aloud
+MARKUP = re.compile(r'[#*_~`]+')
+
+LABELS = {
+    'title': 'title',
+    'hook': 'hook',
+    'intro': 'hook',
+    'fact': 'fact',
+    'cta': 'cta',
+    'outro': 'cta',
+    'call to action': 'cta',
+}
+
+YOUTUBE_TITLE_LIMIT = 100
+
+# Appended to the prompt when the backend is asked for JSON output
+JSON_INSTRUCTIONS = """
+Respond only with a JSON object of this form:
+{"title": "...", "hook": "...", "facts": ["...", "..."], "cta": "..."}
+"""
+
+JSON_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': {'type': 'string'},
+        'hook': {'type': 'string'},
+        'facts': {'type': 'array', 'items': {'type': 'string'}},
+        'cta': {'type': 'string'},
+    },
+    'required': ['title', 'hook', 'facts', 'cta'],
+}
+
+
+def clean_text(text):
+    return MARKUP.sub('', text).strip().strip('"').strip()
+
+
+class Script:
+    """
+    A video script split into its parts: title, hook, facts and call to
+    action.
+
+    Every later stage works from these parts: each one is synthesized as
+    its own narration segment, timed as its own subtitle block and the
+    title/facts become the upload metadata, so the text is parsed once.
+    """
+
+    def __init__(self, title='', hook='', facts=None, cta=''):
+        self.title = title
+        self.hook = hook
+        self.facts = list(facts or [])
+        self.cta = cta
+
+    def lines(self):
+        """The spoken parts in narration order"""
+        return [line for line in [self.title, self.hook, *self.facts, self.cta] if line]
+
+    @property
+    def text(self):
+        """Narration text, one part per line"""
+        return '\n'.join(self.lines())
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return bool(self.lines())
+
+    def metadata(self):
+        """Title and description for the upload"""
+        title = self.title or self.hook or "AI Generated Video"
+        if len(title) > YOUTUBE_TITLE_LIMIT:
+            title = title[:YOUTUBE_TITLE_LIMIT - 1].rsplit(' ', 1)[0] + '…'
+        description = '\n'.join(part for part in [
+            self.hook,
+            '\n'.join(f"• {fact}" for fact in self.facts),
+            self.cta,
+        ] if part)
+        return {'title': title, 'description': description or "Created with Video Automation"}
+
+    def to_dict(self):
+        return {'title': self.title, 'hook': self.hook, 'facts': self.facts, 'cta': self.cta}
+
+    @classmethod
+    def from_dict(cls, data):
+        facts = data.get('facts') or []
+        if isinstance(facts, str):
+            facts = [facts]
+        return cls(
+            clean_text(str(data.get('title') or '')),
+            clean_text(str(data.get('hook') or '')),
+            [clean_text(str(fact)) for fact in facts if clean_text(str(fact))],
+            clean_text(str(data.get('cta') or '')),
+        )
+
+
+def parse_script(text):
+    """
+    Parse model output into a Script.
+
+    Labelled lines go to their part; unlabelled list items are facts;
+    plain lines before the first fact form the hook and plain lines after
+    the facts form the call to action. JSON output (from JSON mode) is
+    read directly.
+    """
+    stripped = text.strip()
+    if stripped.startswith('```'):
+        stripped = stripped.strip('`').removeprefix('json').strip()
+    if stripped.startswith('{'):
+        try:
+            return Script.from_dict(json.loads(stripped))
+        except (ValueError, AttributeError):
+            pass
+
+    script = Script()
+    hook, cta = [], []
+    for match in TOKENIZER.finditer(text):
+        if match.group('note') is not None:
+            continue
+        if match.group('label'):
+            label = LABELS[re.sub(r'\s+', ' ', match.group('label').lower())]
+            body = clean_text(match.group('labelled'))
+        elif match.group('item') is not None:
+            label, body = 'fact', clean_text(match.group('item'))
+        else:
+            label, body = None, clean_text(match.group('line'))
+        if not body:
+            continue
+
+        if label == 'title' and not script.title:
+            script.title = body
+        elif label == 'fact':
+            script.facts.append(body)
+        elif label == 'cta' or (label is None and script.facts):
+            cta.append(body)
+        else:
+            hook.append(body)
+
+    script.hook = ' '.join(hook)
+    script.cta = ' '.join(cta)
+    return script
@@ -0,0 +1,185 @@
+import difflib
+import re
+import threading
+import time
+import ffmpeg
+import numpy as np
+from src.subtitles import find_pauses
+
+
+DEFAULT_STT_MODEL = 'base.en'
+SAMPLE_RATE = 16000
+
+_engines = {}
+_engine_lock = threading.Lock()
+
+
+def get_stt_engine(model_size=DEFAULT_STT_MODEL, compute_type='int8', cpu_threads=0):
+    """Return the process-wide STT engine for a model, loading it on first use"""
+    key = (model_size, compute_type, cpu_threads)
+    with _engine_lock:
+        if key not in _engines:
+            _engines[key] = STTEngine(model_size, compute_type, cpu_threads)
+        return _engines[key]
+
+
+class Word:
+    """A recognized word with its timestamps in seconds"""
+
+    def __init__(self, start, end, text, probability=1.0):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.probability = probability
+
+    def __repr__(self):
+        return f"Word({self.start:.2f}, {self.end:.2f}, {self.text!r})"
+
+
+def stream_audio_windows(audio_path, window_seconds=30.0, search_seconds=5.0,
+                         sample_rate=SAMPLE_RATE):
+    """
+    Decode audio through ffmpeg and yield (offset, samples) windows.
+
+    Only about one window is held in memory at a time. Each window is cut
+    at the last pause within its final search_seconds (when there is one)
+    so words are not split across windows; the remainder is carried into
+    the next window.
+    """
+    process = (
+        ffmpeg
+        .input(str(audio_path))
+        .output('pipe:', format='f32le', ac=1, ar=sample_rate)
+        .global_args('-v', 'quiet')
+        .run_async(pipe_stdout=True)
+    )
+    window = int(window_seconds * sample_rate)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0.0
+    try:
+        while True:
+            data = process.stdout.read((window - len(buffer)) * 4)
+            if data:
+                buffer = np.concatenate([buffer, np.frombuffer(data, dtype=np.float32)])
+            if len(buffer) < window and data:
+                continue
+            if not data:
+                if len(buffer):
+                    yield offset, buffer
+                break
+
+            cut = len(buffer)
+            search_start = len(buffer) - int(search_seconds * sample_rate)
+            _, _, pauses = find_pauses(buffer[search_start:], sample_rate, min_pause=0.1)
+            if pauses:
+                pause_start, pause_end = pauses[-1]
+                cut = search_start + int((pause_start + pause_end) / 2 * sample_rate)
+
+            yield offset, buffer[:cut]
+            offset += cut / sample_rate
+            buffer = buffer[cut:].copy()
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+class STTEngine:
+    """
+    Offline CPU speech-to-text with word timestamps (faster-whisper).
+
+    The model is loaded once and reused across jobs; audio is transcribed
+    in streaming windows so memory stays flat for long narrations.
+    """
+
+    def __init__(self, model_size=DEFAULT_STT_MODEL, compute_type='int8', cpu_threads=0):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError(
+                "Local STT requires faster-whisper: pip install faster-whisper")
+
+        self.stats = {
+            'model_load_seconds': 0.0,
+            'audio_seconds': 0.0,
+            'transcribe_seconds': 0.0,
+        }
+        self._lock = threading.Lock()
+
+        started = time.perf_counter()
+        self.model = WhisperModel(
+            model_size, device='cpu', compute_type=compute_type, cpu_threads=cpu_threads)
+        self.stats['model_load_seconds'] = time.perf_counter() - started
+
+    def transcribe_words(self, audio_path, window_seconds=30.0, initial_prompt=None):
+        """Transcribe audio and return a list of Word with absolute timestamps"""
+        words = []
+        for offset, samples in stream_audio_windows(audio_path, window_seconds):
+            with self._lock:
+                started = time.perf_counter()
+                segments, _ = self.model.transcribe(
+                    samples, word_timestamps=True, initial_prompt=initial_prompt,
+                    condition_on_previous_text=False)
+                for segment in segments:
+                    for word in segment.words or []:
+                        words.append(Word(offset + word.start, offset + word.end,
+                                          word.word.strip(), word.probability))
+                self.stats['transcribe_seconds'] += time.perf_counter() - started
+                self.stats['audio_seconds'] += len(samples) / SAMPLE_RATE
+        return words
+
+    def real_time_factor(self):
+        """Processing time divided by audio duration (lower is faster)"""
+        if not self.stats['audio_seconds']:
+            return 0.0
+        return self.stats['transcribe_seconds'] / self.stats['audio_seconds']
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", '', word.lower())
+
+
+def align_words_to_script(words, script):
+    """
+    Carry recognized word timestamps over to the words of the known script.
+
+    The script text is what gets displayed; recognition errors only affect
+    timing. Script words the recognizer missed are interpolated between
+    their matched neighbours.
+    """
+    script_words = script.split()
+    if not words or not script_words:
+        return []
+
+    matcher = difflib.SequenceMatcher(
+        None, [_normalize(w) for w in script_words], [_normalize(w.text) for w in words],
+        autojunk=False)
+    times = [None] * len(script_words)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            for k in range(i2 - i1):
+                times[i1 + k] = (words[j1 + k].start, words[j1 + k].end)
+        elif tag == 'replace':
+            # Spread the recognized span over the script words it replaces
+            start, end = words[j1].start, words[j2 - 1].end
+            step = (end - start) / (i2 - i1)
+            for k in range(i2 - i1):
+                times[i1 + k] = (start + k * step, start + (k + 1) * step)
+
+    # Script words the recognizer missed share the gap between their neighbours
+    index = 0
+    while index < len(times):
+        if times[index] is not None:
+            index += 1
+            continue
+        run_end = index
+        while run_end < len(times) and times[run_end] is None:
+            run_end += 1
+        gap_start = times[index - 1][1] if index > 0 else words[0].start
+        gap_end = times[run_end][0] if run_end < len(times) else words[-1].end
+        gap_end = max(gap_start, gap_end)
+        step = (gap_end - gap_start) / (run_end - index)
+        for k in range(index, run_end):
+            times[k] = (gap_start + (k - index) * step, gap_start + (k - index + 1) * step)
+        index = run_end
+
+    return [Word(start, end, text) for text, (start, end) in zip(script_words, times)]
@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+from pathlib import Path
+from src.cache import cache_key
+
+
+TAG = re.compile(r'<[^>]+>|\{[^}]*\}')
+
+# SRT color spans, e.g. the highlighted word of a karaoke cue
+FONT_SPAN = re.compile(r'<font\s+color=["\']?([^"\'>]+)["\']?\s*>(.*?)</font>', re.IGNORECASE | re.DOTALL)
+
+# Matches the libass look of the default subtitles: bold white text with a
+# black outline in the lower third of a 1080x1920 frame
+DEFAULT_OVERLAY_STYLE = {
+    'font_file': None,
+    'size': 72,
+    'color': '#FFFFFF',
+    'outline_color': '#000000',
+    'outline': 5,
+    'line_spacing': 12,
+    'max_width': 920,
+    'margin_v': 400,
+}
+
+FALLBACK_FONTS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    '/Library/Fonts/Arial Bold.ttf',
+    'C:/Windows/Fonts/arialbd.ttf',
+]
+
+
+def styled_words(text, color):
+    """
+    The words of a cue line as (word, color) pairs: words inside a
+    <font color=...> span keep that color, other markup is dropped
+    """
+    words = []
+    position = 0
+    for match in FONT_SPAN.finditer(text):
+        words += [(word, color) for word in TAG.sub('', text[position:match.start()]).split()]
+        words += [(word, match.group(1)) for word in TAG.sub('', match.group(2)).split()]
+        position = match.end()
+    words += [(word, color) for word in TAG.sub('', text[position:]).split()]
+    return words
+
+
+class SubtitleOverlayRenderer:
+    """
+    Subtitle engine that rasterizes each cue once into a transparent
+    frame-sized PNG and composites them all as a single timed image
+    sequence (one input, one overlay filter), instead of having libass lay
+    out and rasterize text for every frame of the encode.
+
+    Color spans such as karaoke highlights are drawn in their color. Cue
+    images and timelines are cached on disk by content + style, so
+    repeated lines (and re-renders of the same script) reuse them.
+    """
+
+    def __init__(self, cache_dir, style=None, width=1080, height=1920):
+        try:
+            from PIL import ImageFont  # noqa: F401
+        except ImportError:
+            raise ImportError("The overlay subtitle engine requires Pillow: pip install Pillow")
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.style = dict(DEFAULT_OVERLAY_STYLE, **(style or {}))
+        self.width = width
+        self.height = height
+        self.stats = {'rendered': 0, 'cached': 0}
+        self._font = None
+        self._lock = threading.Lock()
+
+    def _load_font(self):
+        from PIL import ImageFont
+
+        if self._font is None:
+            candidates = [self.style['font_file']] if self.style['font_file'] else FALLBACK_FONTS
+            for candidate in candidates:
+                if candidate and Path(candidate).exists():
+                    self._font = ImageFont.truetype(candidate, self.style['size'])
+                    break
+            else:
+                self._font = ImageFont.load_default(self.style['size'])
+        return self._font
+
+    def _wrap(self, draw, words, font):
+        """Greedy word wrap of (word, color) pairs to the configured maximum line width"""
+        lines = []
+        line = []
+        for word in words:
+            candidate = ' '.join(text for text, _ in line + [word])
+            if line and draw.textlength(candidate, font=font) > self.style['max_width']:
+                lines.append(line)
+                line = [word]
+            else:
+                line.append(word)
+        if line:
+            lines.append(line)
+        return lines
+
+    def _save(self, image, path):
+        temp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp.png")
+        image.save(temp_path)
+        os.replace(temp_path, path)
+
+    def render_cue(self, text):
+        """
+        Return the path of the transparent frame-sized PNG with a cue's
+        text in the lower third
+        """
+        from PIL import Image, ImageDraw
+
+        paragraphs = [styled_words(line, self.style['color']) for line in text.strip().split('\n')]
+        key = cache_key('subtitle-cue', paragraphs, self.style, self.width, self.height)
+        path = self.cache_dir / f"{key[:24]}.png"
+
+        with self._lock:
+            if path.exists():
+                self.stats['cached'] += 1
+                return path
+
+            font = self._load_font()
+            outline = self.style['outline']
+            measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+            lines = [line for words in paragraphs for line in self._wrap(measure, words, font)] or [[]]
+            texts = [' '.join(word for word, _ in line) for line in lines]
+            boxes = [measure.textbbox((0, 0), text, font=font, stroke_width=outline) for text in texts]
+            line_height = max(box[3] - box[1] for box in boxes)
+            block_height = len(lines) * line_height + (len(lines) - 1) * self.style['line_spacing']
+
+            image = Image.new('RGBA', (self.width, self.height), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(image)
+            y = self.height - self.style['margin_v'] - block_height
+            for line, text, box in zip(lines, texts, boxes):
+                x = (self.width - (box[2] - box[0])) / 2 - box[0]
+                for index, (word, color) in enumerate(line):
+                    prefix = ' '.join(text for text, _ in line[:index]) + (' ' if index else '')
+                    draw.text((x + draw.textlength(prefix, font=font), y - box[1]), word, font=font,
+                              fill=color, stroke_width=outline, stroke_fill=self.style['outline_color'])
+                y += line_height + self.style['line_spacing']
+
+            self._save(image, path)
+            self.stats['rendered'] += 1
+            return path
+
+    def _blank(self):
+        from PIL import Image
+
+        path = self.cache_dir / f"blank-{self.width}x{self.height}.png"
+        with self._lock:
+            if not path.exists():
+                self._save(Image.new('RGBA', (self.width, self.height), (0, 0, 0, 0)), path)
+        return path
+
+    def timeline(self, cues):
+        """
+        Write an ffconcat list showing each cue image for its duration and
+        a blank frame in between; returns its path, or None without cues
+        """
+        entries = []
+        position = 0.0
+        for cue in sorted(cues, key=lambda cue: cue.start):
+            start = max(cue.start, position)
+            if cue.end <= start or not TAG.sub('', cue.text).strip():
+                continue
+            if start > position:
+                entries.append((self._blank(), start - position))
+            entries.append((self.render_cue(cue.text), cue.end - start))
+            position = cue.end
+        if not entries:
+            return None
+
+        # Images default to a 1/25 s time base, which would round cue starts
+        # to the wrong frame, so each file is opened with a millisecond one
+        listing = "ffconcat version 1.0\n" + ''.join(
+            f"file '{path.resolve()}'\noption framerate 1000\nduration {duration:.3f}\n"
+            for path, duration in entries)
+        # The concat demuxer ignores the last duration, so end on a blank
+        # frame that stays up for the rest of the video
+        listing += f"file '{self._blank().resolve()}'\noption framerate 1000\n"
+
+        path = self.cache_dir / f"{cache_key('subtitle-timeline', listing)[:24]}.ffconcat"
+        if not path.exists():
+            temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            temp_path.write_text(listing, encoding='utf-8')
+            os.replace(temp_path, path)
+        return path
+
+    def overlay(self, video, cues):
+        """Composite the cues onto an ffmpeg-python video stream with a single overlay"""
+        import ffmpeg
+
+        listing = self.timeline(cues)
+        if listing is None:
+            return video
+        images = ffmpeg.input(str(listing), f='concat', safe=0)
+        return video.overlay(images, x=0, y=0)
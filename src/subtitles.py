@@ -0,0 +1,282 @@
+import re
+from pathlib import Path
+import numpy as np
+
+
+LABEL_PREFIX = re.compile(r'^(Title|Fact):\s*')
+SENTENCE_END = re.compile(r'[.!?…]["\')]*$')
+
+# Styled for 9:16 Shorts: large bold text with an outline, in the lower third
+DEFAULT_ASS_STYLE = {
+    'font': 'Arial',
+    'size': 72,
+    'primary_colour': '&H0000FFFF',    # highlighted (spoken) karaoke text
+    'secondary_colour': '&H00FFFFFF',  # text before it is spoken
+    'outline_colour': '&H00000000',
+    'back_colour': '&H80000000',
+    'bold': -1,
+    'outline': 4,
+    'shadow': 1,
+    'alignment': 2,
+    'margin_v': 400,
+    'position': None,  # optional (x, y) anchor overriding alignment/margins
+}
+
+
+class Cue:
+    """A single subtitle cue"""
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({self.start:.3f}, {self.end:.3f}, {self.text!r})"
+
+
+def format_srt_time(seconds):
+    """Format time for SRT format (HH:MM:SS,mmm)"""
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def write_srt(cues, output_path):
+    """Write cues to an SRT file"""
+    srt_content = ""
+    for i, cue in enumerate(cues):
+        srt_content += f"{i + 1}\n"
+        srt_content += f"{format_srt_time(cue.start)} --> {format_srt_time(cue.end)}\n"
+        srt_content += f"{cue.text}\n\n"
+
+    output_dir = Path(output_path).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(srt_content)
+
+
+SRT_TIME = re.compile(r'(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)')
+
+
+def parse_srt(path):
+    """Read cues back from an SRT file"""
+    with open(path, encoding='utf-8') as f:
+        blocks = re.split(r'\n\s*\n', f.read().strip())
+
+    cues = []
+    for block in blocks:
+        lines = block.strip().splitlines()
+        for index, line in enumerate(lines):
+            match = SRT_TIME.search(line)
+            if match:
+                h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(g) for g in match.groups())
+                start = h1 * 3600 + m1 * 60 + s1 + ms1 / 1000
+                end = h2 * 3600 + m2 * 60 + s2 + ms2 / 1000
+                cues.append(Cue(start, end, '\n'.join(lines[index + 1:])))
+                break
+    return cues
+
+
+def split_cue_text(text, max_words=12):
+    """Split a long line at natural pause points (commas) for readability"""
+    text = LABEL_PREFIX.sub('', text.strip())
+    if len(text.split()) <= max_words:
+        return [text] if text else []
+    return [part.strip() for part in text.split(', ') if part.strip()]
+
+
+def spread_over(start, end, parts):
+    """Share [start, end] between text parts in proportion to their length"""
+    total = sum(len(part) for part in parts)
+    cues = []
+    position = start
+    for part in parts:
+        length = (end - start) * len(part) / total if total else 0.0
+        cues.append(Cue(position, position + length, part))
+        position += length
+    return cues
+
+
+def cues_from_segments(segments):
+    """
+    Build cues from the real start/duration of each synthesized sentence
+    (NarrationSegment), splitting long sentences within their own span
+    """
+    cues = []
+    for segment in segments:
+        parts = split_cue_text(segment.text)
+        cues.extend(spread_over(segment.start, segment.end, parts))
+    return cues
+
+
+def find_pauses(samples, sample_rate, frame_seconds=0.02, threshold_db=-35.0, min_pause=0.15):
+    """
+    Find silent stretches in a mono waveform with a frame RMS energy gate.
+
+    Returns (speech_start, speech_end, pauses) in seconds, where pauses is
+    a list of (start, end) tuples of silences between speech.
+    """
+    frame = max(1, int(sample_rate * frame_seconds))
+    count = len(samples) // frame
+    if count == 0:
+        return 0.0, len(samples) / sample_rate, []
+
+    frames = np.asarray(samples[:count * frame], dtype=np.float32).reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    level = 20 * np.log10(rms / (rms.max() + 1e-12))
+    voiced = level > threshold_db
+
+    voiced_frames = np.flatnonzero(voiced)
+    if len(voiced_frames) == 0:
+        return 0.0, count * frame_seconds, []
+    first, last = voiced_frames[0], voiced_frames[-1] + 1
+
+    pauses = []
+    # Edges of silent runs inside the speech region
+    silent = ~voiced[first:last]
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    for run_start, run_end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        if (run_end - run_start) * frame_seconds >= min_pause:
+            pauses.append(((first + run_start) * frame_seconds,
+                           (first + run_end) * frame_seconds))
+
+    return first * frame_seconds, last * frame_seconds, pauses
+
+
+def align_sentences(sentences, samples, sample_rate, snap_window=1.0):
+    """
+    Time sentences against the narration waveform without STT.
+
+    Boundaries are first estimated from each sentence's share of the
+    characters, then snapped to the nearest unused pause in the audio.
+    """
+    sentences = [s for s in sentences if s.strip()]
+    if not sentences:
+        return []
+
+    speech_start, speech_end, pauses = find_pauses(samples, sample_rate)
+    total_chars = sum(len(s) for s in sentences)
+    span = speech_end - speech_start
+
+    boundaries = [speech_start]
+    consumed = 0
+    available = list(pauses)
+    for sentence in sentences[:-1]:
+        consumed += len(sentence)
+        estimate = speech_start + span * consumed / total_chars
+        candidates = [p for p in available if abs((p[0] + p[1]) / 2 - estimate) <= snap_window
+                      and (p[0] + p[1]) / 2 > boundaries[-1]]
+        if candidates:
+            pause = min(candidates, key=lambda p: abs((p[0] + p[1]) / 2 - estimate))
+            available = [p for p in available if p[0] > pause[0]]
+            boundaries.append((pause[0] + pause[1]) / 2)
+        else:
+            boundaries.append(max(estimate, boundaries[-1]))
+    boundaries.append(speech_end)
+
+    cues = []
+    for sentence, start, end in zip(sentences, boundaries, boundaries[1:]):
+        cues.extend(spread_over(start, end, split_cue_text(sentence)))
+    return cues
+
+
+def group_words(words, max_words=6, max_gap=0.6):
+    """Group timed words into subtitle lines at sentence ends, pauses and max_words"""
+    groups = []
+    current = []
+    for word in words:
+        if current and (len(current) >= max_words or word.start - current[-1].end > max_gap):
+            groups.append(current)
+            current = []
+        current.append(word)
+        if SENTENCE_END.search(word.text):
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def cues_from_words(words, max_words=8):
+    """One cue per line of words, from the first word's start to the last word's end"""
+    return [Cue(group[0].start, group[-1].end, ' '.join(w.text for w in group))
+            for group in group_words(words, max_words)]
+
+
+def karaoke_srt_cues(words, max_words=6, highlight='#FFFF00'):
+    """
+    Word-by-word SRT cues: each line is repeated once per word with the
+    word being spoken highlighted
+    """
+    cues = []
+    for group in group_words(words, max_words):
+        for index, word in enumerate(group):
+            end = group[index + 1].start if index + 1 < len(group) else word.end
+            text = ' '.join(
+                f'<font color="{highlight}">{w.text}</font>' if k == index else w.text
+                for k, w in enumerate(group))
+            cues.append(Cue(word.start, max(end, word.start), text))
+    return cues
+
+
+def karaoke_ass_cues(words, max_words=6):
+    """ASS cues with \\k tags so libass fills each word as it is spoken"""
+    cues = []
+    for group in group_words(words, max_words):
+        parts = []
+        for index, word in enumerate(group):
+            end = group[index + 1].start if index + 1 < len(group) else word.end
+            centiseconds = max(0, int(round((end - word.start) * 100)))
+            parts.append(f"{{\\k{centiseconds}}}{word.text}")
+        cues.append(Cue(group[0].start, group[-1].end, ' '.join(parts)))
+    return cues
+
+
+def format_ass_time(seconds):
+    """Format time for ASS format (H:MM:SS.cc)"""
+    centis = int(round(max(seconds, 0.0) * 100))
+    hours, centis = divmod(centis, 3600 * 100)
+    minutes, centis = divmod(centis, 60 * 100)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def write_ass(cues, output_path, style=None, width=1080, height=1920):
+    """Write cues to an ASS file with a single styled 'Default' style"""
+    style = dict(DEFAULT_ASS_STYLE, **(style or {}))
+    content = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {width}\n"
+        f"PlayResY: {height}\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        f"Style: Default,{style['font']},{style['size']},{style['primary_colour']},"
+        f"{style['secondary_colour']},{style['outline_colour']},{style['back_colour']},"
+        f"{style['bold']},0,0,0,100,100,0,0,1,{style['outline']},{style['shadow']},"
+        f"{style['alignment']},60,60,{style['margin_v']},1\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    position = ''
+    if style.get('position'):
+        x, y = style['position']
+        position = f"{{\\pos({x},{y})}}"
+    for cue in cues:
+        text = position + cue.text.replace('\n', '\\N')
+        content += (f"Dialogue: 0,{format_ass_time(cue.start)},{format_ass_time(cue.end)},"
+                    f"Default,,0,0,0,,{text}\n")
+
+    output_dir = Path(output_path).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(content)
@@ -1,48 +1,145 @@
+import asyncio
 import json
+import logging
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-import google.generativeai as genai
+from src.cache import DiskCache, cache_key
+from src.llm_client import LLMError, create_backend
+from src.script import JSON_INSTRUCTIONS, Script, parse_script
+from src.utils import load_config
+
+
+logger = logging.getLogger('video_automation.text')
+
+
+# Bump whenever parse_script() changes: parsed scripts are cached under
+# this version, raw responses are not, so new rules need no new API calls
+SCRIPT_PARSER_VERSION = 2
+
+# Failures that lose one prompt's script: API errors and malformed bodies
+# (a 200 response or cache entry that does not have the expected shape)
+SCRIPT_ERRORS = (LLMError, ValueError, KeyError, TypeError, AttributeError)
 
 
 class TextGenerator:
-    def __init__(self):
-        config_path = Path(__file__).parent.parent / 'config' / 'config.json'
-        with open(config_path) as f:
-            config = json.load(f)
+    def __init__(self, config=None):
+        if config is None:
+            config = load_config()
+
+        # One backend (and so one rate limit budget) shared by every caller
+        self.backend = create_backend(config)
 
-        self.api_key = config['gemini']['api_key']
-        genai.configure(api_key=self.api_key)
-        # Use gemini-pro model for text generation
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        llm_config = config.get('llm', {})
+        # Ask the model for a JSON object instead of parsing free text
+        self.json_mode = llm_config.get('json_mode', False)
+        self.cache = None
+        if llm_config.get('cache', True):
+            cache_dir = Path(__file__).parent.parent / llm_config.get('cache_dir', 'cache/llm')
+            ttl_hours = llm_config.get('cache_ttl_hours', 24)
+            self.cache = DiskCache(
+                cache_dir,
+                max_bytes=int(llm_config.get('cache_max_mb', 64) * 1024 * 1024),
+                ttl=ttl_hours * 3600 if ttl_hours else None,
+            )
+        # Requests currently waiting on the API, by response key; identical
+        # prompts issued meanwhile wait on the same call
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _prompt(self, prompt):
+        return prompt + JSON_INSTRUCTIONS if self.json_mode else prompt
+
+    def _response_key(self, prompt):
+        return cache_key('llm-response', self.backend.request_params(self.json_mode), self._prompt(prompt))
+
+    async def _raw_response(self, prompt, key):
+        """The API response for a prompt: cached, shared with an identical in-flight request, or fetched"""
+        if self.cache is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                return json.loads(data)
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            # wrap_future works across threads, so callers in other event loops can share it
+            return await asyncio.wrap_future(future)
+
+        try:
+            payload = await self.backend.generate_raw(self._prompt(prompt), self.json_mode)
+            # Blocked or empty answers are worth asking again next time
+            if self.cache is not None and self.backend.response_text(payload):
+                self.cache.put(key, json.dumps(payload).encode('utf-8'))
+            future.set_result(payload)
+            return payload
+        except BaseException as e:
+            # Coalesced waiters must not hang when this task is cancelled
+            future.set_exception(e if isinstance(e, Exception)
+                                 else LLMError(f"Request cancelled ({type(e).__name__})"))
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    async def _script(self, prompt):
+        key = self._response_key(prompt)
+        script_key = cache_key('script', SCRIPT_PARSER_VERSION, key)
+        if self.cache is not None:
+            data = self.cache.get(script_key)
+            if data is not None:
+                return Script.from_dict(json.loads(data))
+
+        text = self.backend.response_text(await self._raw_response(prompt, key))
+        if not text:
+            return None
+        script = parse_script(text)
+        if self.cache is not None and script:
+            self.cache.put(script_key, json.dumps(script.to_dict()).encode('utf-8'))
+        return script
 
     def generate_script(self, prompt):
         """
-        Generate a script using the Gemini API
+        Generate a script with the configured backend and parse it into
+        a Script (title, hook, facts, call to action)
         """
         try:
-            response = self.model.generate_content(prompt)
-
-            if response.text:
-                # Clean up the text - remove metadata comments and special characters like #
-                clean_text = response.text
-                # Remove anything in parentheses at the end
-                clean_text = clean_text.split('(')[0].strip()
-                # Remove any quotes if present
-                clean_text = clean_text.strip('"')
-                # Remove '#' and other special characters that might be read aloud
-                for ch in ['#', '*', '_', '~', '`']:
-                    clean_text = clean_text.replace(ch, '')
-                # Remove "Fact:" from the text that will be spoken
-                clean_text = clean_text.replace('Fact:', '')
-                clean_text = clean_text.strip()
-
-                return clean_text
-            else:
-                return None
-
-        except Exception as e:
-            print(f"Error generating text: {str(e)}")
+            return asyncio.run(self._script(prompt)) or None
+
+        except SCRIPT_ERRORS as e:
+            logger.error(f"Error generating text: {str(e)}")
             return None
 
+    def generate_scripts(self, prompts):
+        """
+        Generate scripts for many prompts concurrently, within the configured
+        requests/tokens per minute. Returns scripts in input order, with None
+        for prompts that failed.
+        """
+        async def generate_all(unique):
+            semaphore = asyncio.Semaphore(self.backend.max_concurrency)
+
+            async def run(prompt):
+                async with semaphore:
+                    try:
+                        return await self._script(prompt) or None
+                    except SCRIPT_ERRORS as e:
+                        logger.error(f"Error generating text: {str(e)}")
+                        return None
+
+            return await asyncio.gather(*(run(prompt) for prompt in unique))
+
+        # Repeated prompts are generated once
+        unique = list(dict.fromkeys(prompts))
+        scripts = dict(zip(unique, asyncio.run(generate_all(unique))))
+        return [scripts[prompt] for prompt in prompts]
+
+    def cache_report(self):
+        return self.cache.report() if self.cache is not None else "disabled"
+
 
 if __name__ == "__main__":
     # Test the text generation
@@ -58,4 +155,4 @@ if __name__ == "__main__":
     result = generator.generate_script(test_prompt)
     if result:
         print("Generated Text:")
-        print(result)
+        print(json.dumps(result.to_dict(), indent=2))
@@ -0,0 +1,227 @@
+import hashlib
+import importlib.metadata
+import importlib.util
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from src.utils import file_sha256
+
+
+ASSETS_DIR = Path(__file__).parent.parent / 'assets' / 'tts'
+DEFAULT_REF_AUDIO = ASSETS_DIR / 'ref_voice.mp3'
+DEFAULT_REF_TEXT = ASSETS_DIR / 'ref_text.txt'
+DEFAULT_MODEL = 'F5TTS_v1_Base'
+# Model name that selects the offline ToneEngine instead of F5-TTS
+TONE_MODEL = 'tone'
+TONE_SAMPLE_RATE = 24000
+
+_engines = {}
+_engine_lock = threading.Lock()
+
+
+def check_tts_engine(model=DEFAULT_MODEL):
+    """Raise ImportError if the engine for `model` cannot be loaded, without loading it"""
+    if model != TONE_MODEL and importlib.util.find_spec('f5_tts') is None:
+        raise ImportError("Local TTS requires F5-TTS: pip install f5-tts")
+
+
+def model_id(model=DEFAULT_MODEL):
+    """Identifies the weights that produce an utterance, for cache keys, without loading them"""
+    if model == TONE_MODEL:
+        return f"{TONE_MODEL}@{TONE_SAMPLE_RATE}"
+    return f"{model}@f5-tts-{importlib.metadata.version('f5-tts')}"
+
+
+def reference_hash(ref_audio_path=DEFAULT_REF_AUDIO, ref_text_path=DEFAULT_REF_TEXT):
+    """Content hash of a reference voice (audio + transcript), without decoding it"""
+    ref_text = Path(ref_text_path).read_text(encoding='utf-8').strip()
+    return hashlib.sha256(f"{file_sha256(ref_audio_path)}\0{ref_text}".encode('utf-8')).hexdigest()
+
+
+def voice_id(model=DEFAULT_MODEL, ref_audio_path=DEFAULT_REF_AUDIO, ref_text_path=DEFAULT_REF_TEXT):
+    """
+    (model id, reference voice hash) identifying what an engine would
+    synthesize, so cached utterances can be found before loading the model
+    """
+    if model == TONE_MODEL:
+        return model_id(model), TONE_MODEL
+    return model_id(model), reference_hash(ref_audio_path, ref_text_path)
+
+
+def get_tts_engine(model=DEFAULT_MODEL):
+    """Return the process-wide TTS engine, loading the model on first use"""
+    with _engine_lock:
+        if model not in _engines:
+            _engines[model] = ToneEngine() if model == TONE_MODEL else TTSEngine(model)
+        return _engines[model]
+
+
+class ReferenceVoice:
+    """Reference audio/text conditioning, decoded and preprocessed once"""
+
+    def __init__(self, content_hash, audio, sample_rate, text, preprocess_seconds):
+        self.content_hash = content_hash
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.text = text
+        self.preprocess_seconds = preprocess_seconds
+
+    @property
+    def duration(self):
+        return self.audio.shape[-1] / self.sample_rate
+
+
+class TTSEngine:
+    """
+    Long-lived F5-TTS engine.
+
+    The model is loaded once per process and reference voices are cached by
+    the content hash of the reference audio and transcript, so repeated
+    narrations skip decoding, silence clipping and resampling of the
+    reference entirely.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL):
+        try:
+            from f5_tts.api import F5TTS
+        except ImportError:
+            raise ImportError("Local TTS requires F5-TTS: pip install f5-tts")
+
+        self.stats = {
+            'model_load_seconds': 0.0,
+            'reference_preprocess_seconds': 0.0,
+            'reference_cache_hits': 0,
+            'reference_cache_misses': 0,
+            'inference_seconds': 0.0,
+            'utterances': 0,
+        }
+        self._references = {}
+        # The model is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+        started = time.perf_counter()
+        self.tts = F5TTS(model=model)
+        self.stats['model_load_seconds'] = time.perf_counter() - started
+        self.sample_rate = self.tts.target_sample_rate
+        # Identifies the weights that produced an utterance, for cache keys
+        self.model_id = model_id(model)
+
+    def reference(self, ref_audio_path=DEFAULT_REF_AUDIO, ref_text_path=DEFAULT_REF_TEXT):
+        """Return the preprocessed reference voice, computing it only on a cache miss"""
+        from f5_tts.infer.utils_infer import preprocess_ref_audio_text
+        import torchaudio
+
+        content_hash = reference_hash(ref_audio_path, ref_text_path)
+
+        with self._lock:
+            reference = self._references.get(content_hash)
+            if reference is not None:
+                self.stats['reference_cache_hits'] += 1
+                return reference
+
+            started = time.perf_counter()
+            ref_text = Path(ref_text_path).read_text(encoding='utf-8').strip()
+            processed_path, processed_text = preprocess_ref_audio_text(
+                str(ref_audio_path), ref_text)
+            audio, sample_rate = torchaudio.load(processed_path)
+            elapsed = time.perf_counter() - started
+
+            reference = ReferenceVoice(
+                content_hash, audio, sample_rate, processed_text, elapsed)
+            self._references[content_hash] = reference
+            self.stats['reference_cache_misses'] += 1
+            self.stats['reference_preprocess_seconds'] += elapsed
+            return reference
+
+    def synthesize(self, text, reference=None, speed=1.0):
+        """
+        Synthesize text with the given (or default) reference voice.
+
+        Returns a tuple of (float32 numpy waveform, sample rate).
+        """
+        from f5_tts.infer.utils_infer import chunk_text, infer_batch_process
+
+        if reference is None:
+            reference = self.reference()
+
+        # Same batch sizing F5TTS.infer uses, based on the reference speaking rate
+        max_chars = int(len(reference.text.encode('utf-8')) / reference.duration
+                        * (22 - reference.duration) * speed)
+        batches = chunk_text(text, max_chars=max_chars)
+
+        with self._lock:
+            started = time.perf_counter()
+            wave, sample_rate, _ = next(infer_batch_process(
+                (reference.audio, reference.sample_rate),
+                reference.text,
+                batches,
+                self.tts.ema_model,
+                self.tts.vocoder,
+                mel_spec_type=self.tts.mel_spec_type,
+                speed=speed,
+                device=self.tts.device,
+            ))
+            self.stats['inference_seconds'] += time.perf_counter() - started
+            self.stats['utterances'] += 1
+
+        return wave, sample_rate
+
+    def timing_report(self):
+        """Human readable summary of model load versus inference time"""
+        stats = self.stats
+        utterances = stats['utterances']
+        per_utterance = stats['inference_seconds'] / utterances if utterances else 0.0
+        return (
+            f"model load {stats['model_load_seconds']:.2f}s, "
+            f"reference preprocess {stats['reference_preprocess_seconds']:.2f}s "
+            f"({stats['reference_cache_hits']} hits/{stats['reference_cache_misses']} misses), "
+            f"inference {stats['inference_seconds']:.2f}s over {utterances} utterances "
+            f"({per_utterance:.2f}s each)"
+        )
+
+
+class ToneEngine(TTSEngine):
+    """
+    Offline stand-in for the F5-TTS engine (tts.model = "tone").
+
+    Every word becomes a short tone followed by a gap, at a typical
+    speaking rate, so narrations have realistic lengths and pauses for
+    subtitle timing without loading a model. Meant for tests and
+    benchmarks of the rest of the pipeline.
+    """
+
+    words_per_second = 2.5
+
+    def __init__(self, sample_rate=TONE_SAMPLE_RATE):
+        self.stats = {
+            'model_load_seconds': 0.0,
+            'reference_preprocess_seconds': 0.0,
+            'reference_cache_hits': 0,
+            'reference_cache_misses': 0,
+            'inference_seconds': 0.0,
+            'utterances': 0,
+        }
+        self.tts = None
+        self.sample_rate = sample_rate
+        self.model_id = f"{TONE_MODEL}@{sample_rate}"
+        self._lock = threading.Lock()
+        self._reference = ReferenceVoice(TONE_MODEL, np.zeros((1, sample_rate), dtype=np.float32),
+                                         sample_rate, '', 0.0)
+
+    def reference(self, ref_audio_path=None, ref_text_path=None):
+        return self._reference
+
+    def synthesize(self, text, reference=None, speed=1.0):
+        started = time.perf_counter()
+        word_seconds = 1.0 / (self.words_per_second * speed)
+        tone = np.arange(int(word_seconds * 0.75 * self.sample_rate), dtype=np.float32)
+        tone = 0.3 * np.sin(2 * np.pi * 220.0 * tone / self.sample_rate)
+        gap = np.zeros(int(word_seconds * 0.25 * self.sample_rate), dtype=np.float32)
+        words = max(1, len(text.split()))
+        wave = np.tile(np.concatenate([tone, gap]), words)
+
+        with self._lock:
+            self.stats['inference_seconds'] += time.perf_counter() - started
+            self.stats['utterances'] += 1
+        return wave, self.sample_rate
@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.utils import file_sha256
+
+
+YOUTUBE_UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+
+# Resumable upload chunks must be multiples of 256 KiB (except the last)
+CHUNK_ALIGNMENT = 256 * 1024
+MiB = 1024 * 1024
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# YouTube keeps upload sessions for about a week
+SESSION_MAX_AGE = 6 * 24 * 3600
+
+logger = logging.getLogger('video_automation.upload')
+
+
+class UploadError(Exception):
+    """An upload that failed for good"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class SessionExpired(Exception):
+    """The upload session is gone (404/410); the upload has to start over"""
+
+
+def align_chunk(size):
+    return max(CHUNK_ALIGNMENT, int(size) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT)
+
+
+class UploadSessionStore:
+    """
+    Resumable session URIs persisted to a JSON file, keyed by the video's
+    content hash, so an upload interrupted by a crash or restart continues
+    from the bytes the server already has.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, sessions):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        temp_path.write_text(json.dumps(sessions, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def get(self, key):
+        with self._lock:
+            session = self._load().get(key)
+        if session and time.time() - session['created'] < SESSION_MAX_AGE:
+            return session['uri']
+        return None
+
+    def put(self, key, uri):
+        with self._lock:
+            sessions = self._load()
+            now = time.time()
+            sessions = {k: v for k, v in sessions.items() if now - v['created'] < SESSION_MAX_AGE}
+            sessions[key] = {'uri': uri, 'created': now}
+            self._save(sessions)
+
+    def remove(self, key):
+        with self._lock:
+            sessions = self._load()
+            if sessions.pop(key, None) is not None:
+                self._save(sessions)
+
+
+class UploadQueue:
+    """
+    Concurrent YouTube uploads over the resumable upload protocol.
+
+    Each upload opens (or reuses a persisted) session, then sends the file
+    in chunks. With adaptive chunking the chunk size follows the measured
+    throughput so each chunk takes about target_chunk_seconds. Network
+    errors, 429 and 5xx responses are retried with exponential backoff;
+    after a failure the server is asked how many bytes it has and the
+    upload continues from there.
+
+    token_provider(force_refresh=False) returns an OAuth access token.
+    """
+
+    def __init__(self, token_provider, session_store, max_workers=2, chunk_size=8 * MiB,
+                 adaptive=True, min_chunk_size=1 * MiB, max_chunk_size=64 * MiB,
+                 target_chunk_seconds=8.0, max_retries=8, backoff=1.0, max_backoff=60.0,
+                 timeout=120, upload_url=YOUTUBE_UPLOAD_URL):
+        self.token_provider = token_provider
+        self.sessions = session_store
+        self.chunk_size = align_chunk(chunk_size)
+        self.adaptive = adaptive
+        self.min_chunk_size = align_chunk(min_chunk_size)
+        self.max_chunk_size = align_chunk(max_chunk_size)
+        self.target_chunk_seconds = target_chunk_seconds
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.upload_url = upload_url
+        self.stats = {'uploads': 0, 'failures': 0, 'retries': 0, 'resumed': 0, 'bytes': 0}
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+
+    @classmethod
+    def from_config(cls, token_provider, config, base_dir):
+        """Build a queue from the `youtube` section of config.json"""
+        options = {}
+        for key in ('max_workers', 'adaptive', 'target_chunk_seconds', 'max_retries',
+                    'backoff', 'max_backoff', 'timeout', 'upload_url'):
+            if config.get(key) is not None:
+                options[key] = config[key]
+        for key in ('chunk_size', 'min_chunk_size', 'max_chunk_size'):
+            if config.get(f"{key}_mb") is not None:
+                options[key] = config[f"{key}_mb"] * MiB
+        store = UploadSessionStore(Path(base_dir) / config.get('session_store', 'output/upload_sessions.json'))
+        return cls(token_provider, store, **options)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def submit(self, video_path, metadata, label=None, measure=None):
+        """
+        Queue an upload; returns a Future resolving to the video ID.
+        measure is an optional context manager entered around the upload on
+        its worker thread (e.g. a metrics stage).
+        """
+        if measure is None:
+            return self._executor.submit(self.upload, video_path, metadata, label)
+        return self._executor.submit(self._measured_upload, measure, video_path, metadata, label)
+
+    def _measured_upload(self, measure, video_path, metadata, label):
+        with measure:
+            return self.upload(video_path, metadata, label)
+
+    def _request(self, method, url, data=None, headers=None):
+        """Returns (status, headers, body bytes); HTTP errors are returned, not raised"""
+        headers = dict(headers or {})
+        headers['Authorization'] = f"Bearer {self.token_provider()}"
+        request = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def _start_session(self, size, metadata):
+        query = urllib.parse.urlencode({'uploadType': 'resumable', 'part': ','.join(metadata)})
+        status, headers, body = self._request(
+            'POST', f"{self.upload_url}?{query}",
+            data=json.dumps(metadata).encode('utf-8'),
+            headers={
+                'Content-Type': 'application/json; charset=UTF-8',
+                'X-Upload-Content-Type': 'video/*',
+                'X-Upload-Content-Length': str(size),
+            })
+        if status == 401:
+            self.token_provider(force_refresh=True)
+        if status != 200 or not headers.get('Location'):
+            raise self._error("Could not start upload session", status, body)
+        return headers['Location']
+
+    def _error(self, message, status, body):
+        detail = body.decode('utf-8', 'replace')[:300] if body else ''
+        return UploadError(f"{message}: HTTP {status} {detail}".strip(), status)
+
+    def _received(self, session_uri, size):
+        """
+        Ask the server how many bytes it has. Returns the offset to continue
+        from, or the finished video resource if the upload already completed.
+        """
+        status, headers, body = self._request(
+            'PUT', session_uri, data=b'', headers={'Content-Range': f"bytes */{size}"})
+        return self._parse_progress(status, headers, body)
+
+    def _parse_progress(self, status, headers, body):
+        if status in (200, 201):
+            return json.loads(body)
+        if status == 308:
+            received = headers.get('Range')
+            # "bytes=0-N": the server has bytes 0..N
+            return int(received.rsplit('-', 1)[1]) + 1 if received else 0
+        if status in (404, 410):
+            raise SessionExpired()
+        if status == 401:
+            self.token_provider(force_refresh=True)
+        raise self._error("Upload request failed", status, body)
+
+    def _send_chunk(self, session_uri, file, offset, chunk_size, size):
+        file.seek(offset)
+        data = file.read(chunk_size)
+        end = offset + len(data) - 1
+        status, headers, body = self._request(
+            'PUT', session_uri, data=data,
+            headers={'Content-Length': str(len(data)), 'Content-Range': f"bytes {offset}-{end}/{size}"})
+        return self._parse_progress(status, headers, body)
+
+    def _next_chunk_size(self, chunk_size, sent, seconds):
+        if not self.adaptive or seconds <= 0:
+            return chunk_size
+        target = sent / seconds * self.target_chunk_seconds
+        return min(self.max_chunk_size, max(self.min_chunk_size, align_chunk(target)))
+
+    def _retry_delay(self, attempt):
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return random.uniform(delay / 2, delay)
+
+    def upload(self, video_path, metadata, label=None):
+        """
+        Upload a video (blocking) and return its ID.
+
+        metadata is the videos.insert body ({'snippet': ..., 'status': ...}).
+        """
+        video_path = Path(video_path)
+        size = video_path.stat().st_size
+        key = f"{file_sha256(video_path)}:{json.dumps(metadata, sort_keys=True)}"
+        label = label or video_path.name
+        chunk_size = self.chunk_size
+        attempt = 0
+
+        session_uri = self.sessions.get(key)
+        with open(video_path, 'rb') as file:
+            while True:
+                try:
+                    if session_uri is None:
+                        session_uri = self._start_session(size, metadata)
+                        self.sessions.put(key, session_uri)
+                        offset = 0
+                    else:
+                        offset = self._received(session_uri, size)
+                        if isinstance(offset, int) and offset:
+                            self._count('resumed')
+                            logger.info(f"⏯️ Resuming upload of {label} at {offset * 100 // size}%")
+
+                    while isinstance(offset, int):
+                        started = time.perf_counter()
+                        progress = self._send_chunk(session_uri, file, offset, chunk_size, size)
+                        sent = (progress if isinstance(progress, int) else size) - offset
+                        self._count('bytes', sent)
+                        chunk_size = self._next_chunk_size(chunk_size, sent, time.perf_counter() - started)
+                        offset = progress
+                        attempt = 0
+                        if isinstance(offset, int):
+                            logger.info(f"Uploaded {offset * 100 // size}% of {label}")
+
+                    self.sessions.remove(key)
+                    self._count('uploads')
+                    return offset['id']
+
+                except SessionExpired:
+                    self.sessions.remove(key)
+                    session_uri = None
+                    error = UploadError("Upload session expired")
+                except UploadError as e:
+                    if e.status not in RETRYABLE_STATUS and e.status != 401:
+                        self._count('failures')
+                        raise
+                    error = e
+                except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                    error = e
+
+                if attempt >= self.max_retries:
+                    self._count('failures')
+                    raise UploadError(f"Upload of {label} failed after {attempt + 1} attempts: {error}")
+                delay = self._retry_delay(attempt)
+                attempt += 1
+                self._count('retries')
+                logger.warning(f"⚠️ Upload of {label} interrupted ({error}); retrying in {delay:.1f}s",
+                               extra={'fields': {'event': 'upload_retry', 'video': label,
+                                                 'attempt': attempt, 'error': str(error)}})
+                time.sleep(delay)
+
+    def report(self):
+        stats = self.stats
+        return (f"{stats['uploads']} uploaded, {stats['failures']} failed, "
+                f"{stats['retries']} retries, {stats['resumed']} resumed, "
+                f"{stats['bytes'] / MiB:.1f} MB sent")
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
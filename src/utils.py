@@ -1,38 +1,90 @@
 import os
+import sys
 import json
+import hashlib
+import threading
 from pathlib import Path
 import logging
 
 
-def setup_logging():
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('video_automation.log'),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'config.json'
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+_configs = {}
+_config_lock = threading.Lock()
+
+_logging_lock = threading.Lock()
+
+
+def setup_logging(json_log_path=None):
+    """
+    Setup logging configuration.
+
+    Pipeline messages go to the console as plain text (as they were
+    printed before) and to video_automation.log; with json_log_path every
+    record, including the per-stage metrics events, is also appended
+    there as one JSON object per line. Safe to call more than once.
+    """
+    logger = logging.getLogger('video_automation')
+    with _logging_lock:
+        if not logger.handlers:
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+
+            file_handler = logging.FileHandler('video_automation.log')
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
+
+        if json_log_path:
+            json_log_path = Path(json_log_path).resolve()
+            if not any(getattr(handler, 'baseFilename', None) == str(json_log_path)
+                       for handler in logger.handlers):
+                from src.metrics import JsonFormatter
+
+                json_log_path.parent.mkdir(parents=True, exist_ok=True)
+                json_handler = logging.FileHandler(json_log_path, encoding='utf-8')
+                json_handler.setLevel(logging.DEBUG)
+                json_handler.setFormatter(JsonFormatter())
+                logger.addHandler(json_handler)
+    return logger
+
+
+def load_config(path=None):
+    """
+    Parsed config.json (or another config file), read once per process;
+    every component built without an explicit config shares this dict
+    """
+    path = Path(path or CONFIG_PATH).resolve()
+    with _config_lock:
+        if path not in _configs:
+            with open(path) as f:
+                _configs[path] = json.load(f)
+        return _configs[path]
 
 
 def validate_config():
     """Validate configuration file and required settings"""
-    config_path = Path(__file__).parent.parent / 'config' / 'config.json'
-
-    if not config_path.exists():
+    if not CONFIG_PATH.exists():
         raise FileNotFoundError(
             "Configuration file not found. Please create config/config.json")
 
-    with open(config_path) as f:
-        config = json.load(f)
+    config = load_config()
 
-    # Check required API keys
-    required_keys = [
-        ('openrouter', 'api_key'),
-        ('elevenlabs', 'api_key')
-    ]
+    # Check the keys required by the selected text generation backend
+    from src.llm_client import REQUIRED_KEYS, backend_name
+
+    backend = backend_name(config)
+    if backend not in REQUIRED_KEYS:
+        raise ValueError(
+            f"Unknown llm.backend '{backend}'. Choose from: {', '.join(REQUIRED_KEYS)}")
+    required_keys = [(backend, key) for key in REQUIRED_KEYS[backend]]
 
     for section, key in required_keys:
         if not config.get(section, {}).get(key):
@@ -104,6 +156,28 @@ def get_file_size(file_path):
     return f"{size:.1f} TB"
 
 
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file's contents, remembered per path+mtime+size so large
+    assets are only read once while they stay unchanged
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _hash_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    with _hash_lock:
+        _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
 class ProgressTracker:
     """Simple progress tracker for long operations"""
 
@@ -138,3 +212,8 @@ if __name__ == "__main__":
 
     ensure_directories()
     logger.info("Directories ensured")
+
+    from src.media_info import get_media_info_service
+    assets_dir = Path(__file__).parent.parent / 'assets'
+    for path, info in get_media_info_service().probe_directory(assets_dir).items():
+        logger.info(f"{path}: {info}")
@@ -1,112 +1,491 @@
 import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
 import ffmpeg
 from pathlib import Path
+from src.cache import DiskCache, cache_key
+from src.media_info import get_media_info_service
+from src.render_farm import RenderTimeout, get_render_farm
+from src.subtitle_overlay import SubtitleOverlayRenderer
+from src.script import Script, parse_script
+from src.subtitles import cues_from_segments, format_srt_time, parse_srt, split_cue_text, write_ass, write_srt
+from src.utils import file_sha256, load_config
+
+
+logger = logging.getLogger('video_automation.video')
+
+
+# Canonical format of prepared backgrounds: 9:16 Shorts at a fixed frame
+# rate with a keyframe every second
+VIDEO_WIDTH = 1080
+VIDEO_HEIGHT = 1920
+VIDEO_FPS = 30
+KEYFRAME_INTERVAL = 30
+
+# Named x264/AAC settings: draft for quick previews, production for uploads,
+# archive for high quality masters
+ENCODER_PROFILES = {
+    'draft': {
+        'preset': 'ultrafast', 'crf': 30, 'tune': 'fastdecode', 'threads': 0,
+        'gop': 60, 'audio_codec': 'aac', 'audio_bitrate': '96k',
+    },
+    'production': {
+        'preset': 'medium', 'crf': 23, 'tune': None, 'threads': 0,
+        'gop': 60, 'audio_codec': 'aac', 'audio_bitrate': '192k',
+    },
+    'archive': {
+        'preset': 'slow', 'crf': 17, 'tune': 'film', 'threads': 0,
+        'gop': 120, 'audio_codec': 'aac', 'audio_bitrate': '256k',
+    },
+}
+DEFAULT_ENCODER_PROFILE = 'production'
+
+AUDIO_ENCODER_ARGS = ('acodec', 'audio_bitrate')
+
+_prepare_locks = {}
+_prepare_locks_guard = threading.Lock()
+
+
+def plan_segments(duration, segment_seconds, fps=VIDEO_FPS, gop=KEYFRAME_INTERVAL):
+    """
+    Split a render of `duration` seconds into (start_frame, frame_count)
+    segments whose boundaries fall on GOP (keyframe) multiples. The frame
+    total matches a single-pass render trimmed to the same duration.
+    """
+    total_frames = math.ceil(duration * fps - 1e-6)
+    segment_frames = max(gop, int(round(segment_seconds * fps / gop)) * gop)
+    return [(start, min(segment_frames, total_frames - start))
+            for start in range(0, total_frames, segment_frames)]
 
 
 class VideoProcessor:
-    def __init__(self):
-        config_path = Path(__file__).parent.parent / 'config' / 'config.json'
-        with open(config_path) as f:
-            config = json.load(f)
+    def __init__(self, config=None):
+        if config is None:
+            config = load_config()
 
         self.background_video = config['video']['background_video_path']
         self.background_music = config['video']['background_music_path']
         self.output_path = config['video']['output_path']
+        self.media = get_media_info_service()
+        # Shared by all processors: bounds concurrent ffmpeg renders per host
+        self.render_farm = get_render_farm(config.get('render', {}))
+
+        self.normalize_background = config['video'].get('normalize_background', True)
+        self.asset_cache_dir = Path(__file__).parent.parent / \
+            config['video'].get('asset_cache_dir', 'cache/backgrounds')
+
+        # Profiles from config extend or override the built-in ones
+        self.encoder_profiles = {name: dict(settings) for name, settings in ENCODER_PROFILES.items()}
+        for name, settings in config['video'].get('encoder_profiles', {}).items():
+            self.encoder_profiles.setdefault(name, dict(ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE]))
+            self.encoder_profiles[name].update(settings)
+        self.encoder_profile = config['video'].get('encoder_profile', DEFAULT_ENCODER_PROFILE)
+
+        # 'libass' burns subtitles with the subtitles filter; 'overlay'
+        # composites cue images rasterized once (SRT input only)
+        subtitle_config = config.get('subtitles', {})
+        self.subtitle_engine = config['video'].get('subtitle_engine', 'libass')
+        self.ass_style = subtitle_config.get('ass_style')
+        self.overlay_style = subtitle_config.get('overlay_style')
+        self.subtitle_cache_dir = Path(__file__).parent.parent / \
+            subtitle_config.get('cache_dir', 'cache/subtitles')
+        self._overlay_renderer = None
+
+        # Renders longer than 2 segments are split and encoded in parallel
+        self.segment_seconds = config['video'].get('segment_seconds', 0)
+
+        # Music sits under the voice at music_lufs; the mix is normalized to output_lufs
+        self.music_lufs = config['video'].get('music_lufs', -30.0)
+        self.output_lufs = config['video'].get('output_lufs', -14.0)
+        self.loudness_cache = DiskCache(
+            Path(__file__).parent.parent / config['video'].get('loudness_cache_dir', 'cache/loudness'),
+            max_bytes=16 * 1024 * 1024)
+
+    @property
+    def overlay_renderer(self):
+        if self._overlay_renderer is None:
+            self._overlay_renderer = SubtitleOverlayRenderer(
+                self.subtitle_cache_dir, self.overlay_style, VIDEO_WIDTH, VIDEO_HEIGHT)
+        return self._overlay_renderer
+
+    def _apply_subtitles(self, video, subtitle_path, engine=None):
+        """Burn subtitles into a video stream with the configured engine"""
+        if not subtitle_path or not Path(subtitle_path).exists():
+            return video
+
+        engine = engine or self.subtitle_engine
+        if engine == 'overlay' and str(subtitle_path).endswith('.srt'):
+            try:
+                return self.overlay_renderer.overlay(video, parse_srt(subtitle_path))
+            except ImportError as e:
+                logger.warning(f"⚠️ {str(e)}; using the subtitles filter")
+        return video.filter('subtitles', subtitle_path)
+
+    def encoder_args(self, profile=None):
+        """ffmpeg output options for a named encoder profile"""
+        name = profile or self.encoder_profile
+        if name not in self.encoder_profiles:
+            raise ValueError(f"Unknown encoder profile: {name}")
+        settings = self.encoder_profiles[name]
+
+        args = {
+            'vcodec': 'libx264',
+            'preset': settings['preset'],
+            'crf': settings['crf'],
+            'g': settings['gop'],
+            'threads': settings['threads'],
+            'pix_fmt': 'yuv420p',
+            'acodec': settings['audio_codec'],
+            'audio_bitrate': settings['audio_bitrate'],
+            'movflags': '+faststart',
+        }
+        if settings.get('tune'):
+            args['tune'] = settings['tune']
+        return args
+
+    def measure_loudness(self, audio_path):
+        """
+        Integrated loudness (LUFS) of a track, measured with ffmpeg's
+        loudnorm analysis. Cached by content hash so each music track is
+        only scanned once, ever.
+        """
+        key = cache_key('loudness', file_sha256(audio_path))
+        cached = self.loudness_cache.get(key)
+        if cached is not None:
+            return json.loads(cached)['input_i']
+
+        _, stderr = self.render_farm.run(
+            ffmpeg
+            .input(str(audio_path))
+            .audio
+            .filter('loudnorm', print_format='json')
+            .output('-', format='null'),
+            label=f"loudness:{Path(audio_path).name}",
+        )
+        # loudnorm prints its measurement as the last JSON object on stderr
+        match = re.search(r'\{[^{}]*"input_i"[^{}]*\}', stderr.decode('utf-8', 'replace'))
+        if not match:
+            raise ValueError(f"Could not measure loudness of {audio_path}")
+        stats = json.loads(match.group(0))
+        stats = {name: float(value) for name, value in stats.items()
+                 if name.startswith('input_')}
+        self.loudness_cache.put(key, json.dumps(stats).encode('utf-8'))
+        return stats['input_i']
+
+    @staticmethod
+    def _narration_input(audio):
+        """(ffmpeg input, PcmAudio or None) for a narration file or in-memory narration"""
+        if isinstance(audio, (str, Path)):
+            return ffmpeg.input(str(audio)), None
+        return audio.ffmpeg_input(), audio
+
+    def _mix_audio(self, narration, duration):
+        """
+        Narration mixed with the background music in the render's own
+        filter graph: music looped/trimmed to the narration, gain-staged
+        from its cached loudness, ducked under the voice with a sidechain
+        compressor and the mix loudness-normalized in a single pass.
+
+        The mix is stereo: mono narration is centred and the music keeps
+        its own channel layout (mono music is centred as well), instead of
+        amix negotiating everything down to the narration's single channel.
+
+        Returns the narration unchanged when there is no usable music.
+        """
+        if not self.background_music or not Path(self.background_music).is_file():
+            return narration
+        try:
+            music_gain = self.music_lufs - self.measure_loudness(self.background_music)
+        except (ffmpeg.Error, RenderTimeout, ValueError) as e:
+            logger.warning(f"⚠️ Skipping background music: {str(e)}")
+            return narration
+
+        voice = (
+            narration
+            .filter('aformat', channel_layouts='stereo')
+            .filter_multi_output('asplit', 2)
+        )
+        music = (
+            ffmpeg.input(self.background_music, stream_loop=-1)
+            .audio
+            .filter('aformat', channel_layouts='stereo')
+            .filter('atrim', duration=duration)
+            .filter('asetpts', 'PTS-STARTPTS')
+            .filter('volume', f"{music_gain:.2f}dB")
+        )
+        ducked = ffmpeg.filter([music, voice[1]], 'sidechaincompress',
+                               threshold=0.02, ratio=8, attack=20, release=350)
+        return (
+            ffmpeg.filter([voice[0], ducked], 'amix', inputs=2, duration='first',
+                          dropout_transition=0, normalize=0)
+            .filter('loudnorm', I=self.output_lufs, TP=-1.5, LRA=11)
+            .filter('aresample', 48000)
+        )
+
+    def prepare_background(self, source=None):
+        """
+        Transcode a background video once into the canonical 1080x1920
+        intermediate (fixed fps and keyframe interval, no audio) and return
+        its path. Results are cached by the source content hash, so renders
+        only trim and composite instead of scaling every time.
+        """
+        source = source or self.background_video
+        key = cache_key('background', file_sha256(source), VIDEO_WIDTH, VIDEO_HEIGHT,
+                        VIDEO_FPS, KEYFRAME_INTERVAL)
+        prepared = self.asset_cache_dir / f"{key[:16]}.mp4"
+
+        with _prepare_locks_guard:
+            lock = _prepare_locks.setdefault(key, threading.Lock())
+        with lock:
+            if prepared.exists():
+                return str(prepared)
 
-    def create_video(self, audio_path, subtitle_path, output_filename):
+            logger.info(f"🎞️ Preparing background video {source} (one-time)...")
+            self.asset_cache_dir.mkdir(parents=True, exist_ok=True)
+            # Unique per process and thread: other processes may prepare the
+            # same background at once, and only a complete file is published
+            temp_path = prepared.with_name(
+                f"{prepared.stem}.{os.getpid()}.{threading.get_ident()}.tmp.mp4")
+            try:
+                self.render_farm.run(
+                    ffmpeg
+                    .input(str(source))
+                    .video
+                    .filter('scale', VIDEO_WIDTH, VIDEO_HEIGHT)
+                    .filter('setsar', 1)
+                    .filter('fps', VIDEO_FPS)
+                    .output(
+                        str(temp_path),
+                        vcodec='libx264',
+                        preset='veryfast',
+                        crf=16,
+                        pix_fmt='yuv420p',
+                        g=KEYFRAME_INTERVAL,
+                        keyint_min=KEYFRAME_INTERVAL,
+                        sc_threshold=0,
+                        an=None,
+                    ),
+                    label=f"background:{Path(source).name}",
+                )
+                os.replace(temp_path, prepared)
+            finally:
+                temp_path.unlink(missing_ok=True)
+            return str(prepared)
+
+    def _background_source(self):
+        """
+        (path, prepared) of the background to render from: the prepared
+        intermediate when video.normalize_background is on and preparation
+        works, otherwise the original video
+        """
+        if self.normalize_background:
+            try:
+                return self.prepare_background(), True
+            except ffmpeg.Error as e:
+                logger.warning("⚠️ Background preparation failed, scaling during render")
+                logger.warning("FFmpeg stderr: " + (e.stderr or b'').decode('utf-8', 'replace'))
+            except RenderTimeout as e:
+                logger.warning(f"⚠️ Background preparation failed ({str(e)}), scaling during render")
+        return self.background_video, False
+
+    def _background_input(self, source=None, start=0.0):
+        """
+        Looping background video stream in 1080x1920, from the prepared
+        intermediate when possible, starting `start` seconds into the loop
+        """
+        path, prepared = source or self._background_source()
+        options = {'stream_loop': -1}  # Infinite loop
+        if start:
+            options['ss'] = start % self.media.probe(path).duration
+        video = ffmpeg.input(path, **options).video
+        if not prepared:
+            video = video.filter('scale', VIDEO_WIDTH, VIDEO_HEIGHT)  # YouTube Shorts format
+        return video
+
+    def validate_assets(self):
+        """
+        Probe and validate the static background assets (cached, so this is
+        cheap to call before every job). Raises ValueError if the
+        background video is unusable; a bad music track only warns.
+        """
+        assets = {'background_video': self.media.validate(
+            self.background_video, require_video=True)}
+        if self.background_music:
+            try:
+                assets['background_music'] = self.media.validate(
+                    self.background_music, require_audio=True)
+            except ValueError as e:
+                logger.warning(f"⚠️ Background music unavailable: {str(e)}")
+        return assets
+
+    def create_video(self, audio_path, subtitle_path, output_filename, output_dir=None, duration=None,
+                     profile=None, segmented=None, subtitle_engine=None):
         """
         Create final video using FFmpeg with background video, audio, subtitles and background music
+
+        audio_path is the narration file, or an in-memory narration
+        (audio_processing.PcmAudio) that is piped into ffmpeg's stdin and
+        encoded to AAC in the same pass, with no intermediate audio file.
+
+        output_dir overrides the configured output path, e.g. to render into
+        a job's scratch directory. duration is the narration length; it is
+        looked up in the shared media info cache when not given. profile
+        selects an encoder profile (draft, production, archive, ...)
+        instead of video.encoder_profile. segmented forces segment-parallel
+        encoding on or off (default: video.segment_seconds decides).
+        subtitle_engine overrides video.subtitle_engine ('libass' or
+        'overlay').
         """
         try:
             # Create output directory if it doesn't exist
-            output_dir = Path(self.output_path)
+            output_dir = Path(output_dir or self.output_path)
             output_dir.mkdir(parents=True, exist_ok=True)
 
             final_output = output_dir / output_filename
 
-            # Input streams with looping for background video
-            background_video = ffmpeg.input(
-                self.background_video, stream_loop=-1)  # Infinite loop
-            narration_audio = ffmpeg.input(audio_path)
+            narration_audio, narration_pcm = self._narration_input(audio_path)
+
+            # Get audio duration (probed at most once per file)
+            if duration is None:
+                duration = narration_pcm.duration if narration_pcm else self.media.probe(audio_path).duration
+
+            # Profiles with threads=0 get the farm's per-job share of the cores
+            encoder_args = self.encoder_args(profile)
+            if not encoder_args['threads']:
+                encoder_args['threads'] = self.render_farm.threads_per_job
 
-            # Get audio duration
-            probe = ffmpeg.probe(audio_path)
-            duration = float(probe['streams'][0]['duration'])
+            if segmented is None:
+                segmented = bool(self.segment_seconds) and duration > 2 * self.segment_seconds
+            if segmented:
+                return self._create_video_segmented(
+                    audio_path, subtitle_path, final_output, duration, encoder_args,
+                    subtitle_engine)
 
-            # Process video: scale for YouTube Shorts (9:16) and match audio duration
+            # Background is already 9:16 (prepared once); match audio duration
             video = (
-                background_video
-                .video
-                .filter('scale', 1080, 1920)  # YouTube Shorts format
+                self._background_input()
                 .filter('trim', duration=duration)  # Match audio duration
             )
 
             # Add subtitles if provided
-            if subtitle_path and Path(subtitle_path).exists():
-                video = video.filter('subtitles', subtitle_path)
+            video = self._apply_subtitles(video, subtitle_path, subtitle_engine)
+
+            # Narration with background music ducked underneath
+            audio = self._mix_audio(narration_audio.audio, duration)
 
             # Output with video and audio
             output = ffmpeg.output(
                 video,
-                narration_audio,  # Use the entire input stream
+                audio,
                 str(final_output),
-                vcodec='libx264',
-                acodec='aac',  # Re-encode audio to aac for mp4 compatibility
-                audio_bitrate='192k',
                 shortest=None,
-                t=duration
+                t=duration,
+                **encoder_args
             )
 
-            # Run the FFmpeg command and capture stderr
-            ffmpeg.run(output, overwrite_output=True, quiet=True,
-                       capture_stdout=True, capture_stderr=True)
+            # Run the FFmpeg command through the render farm (queued behind
+            # other renders when all slots are busy) and capture stderr
+            self.render_farm.run(output, label=output_filename,
+                                 input=narration_pcm.data if narration_pcm else None, video=True)
 
             return str(final_output)
 
         except ffmpeg.Error as e:
-            print(f"Error creating video: ffmpeg error (see stderr output for detail)")
-            print("FFmpeg stdout:", e.stdout.decode('utf-8'))
-            print("FFmpeg stderr:", e.stderr.decode('utf-8'))
+            logger.error("Error creating video: ffmpeg error (see stderr output for detail)")
+            logger.error("FFmpeg stdout: " + (e.stdout or b'').decode('utf-8', 'replace'))
+            logger.error("FFmpeg stderr: " + (e.stderr or b'').decode('utf-8', 'replace'))
             return None
         except Exception as e:
-            print(f"Error creating video: {str(e)}")
+            logger.error(f"Error creating video: {str(e)}")
             return None
 
+    def _create_video_segmented(self, audio_path, subtitle_path, final_output, duration, encoder_args,
+                                subtitle_engine=None):
+        """
+        Segment-parallel render: the timeline is cut at keyframe-aligned
+        frame boundaries, video-only segments are encoded concurrently on
+        the render farm (subtitles shifted to each segment's offset), then
+        joined with the concat demuxer using stream copy while the audio
+        mix is encoded once over the whole narration.
+        """
+        background = self._background_source()
+        video_args = {name: value for name, value in encoder_args.items()
+                      if name not in AUDIO_ENCODER_ARGS}
+
+        segment_dir = final_output.parent / f".{final_output.stem}.segments"
+        segment_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            # Segments and concat are parts of one video on the render farm:
+            # it is counted once, and a failed part cancels the rest
+            with self.render_farm.video(final_output.name) as unit:
+                renders = []
+                listing = ""
+                for index, (start_frame, frames) in enumerate(
+                        plan_segments(duration, self.segment_seconds, gop=encoder_args['g'])):
+                    start = start_frame / VIDEO_FPS
+                    segment_path = segment_dir / f"segment_{index:04d}.mp4"
+                    # Stamp frames with their timeline position so the subtitle
+                    # filter picks the right cues, then rebase to zero
+                    video = (
+                        self._background_input(background, start)
+                        .filter('setpts', f'PTS-STARTPTS+{start}/TB')
+                    )
+                    video = self._apply_subtitles(video, subtitle_path, subtitle_engine)
+                    video = video.filter('setpts', 'PTS-STARTPTS')
+                    # setpts drops the stream frame rate, so restate it explicitly
+                    segment = ffmpeg.output(video, str(segment_path), vframes=frames, r=VIDEO_FPS,
+                                            an=None, **video_args)
+                    renders.append(self.render_farm.submit(
+                        segment, label=f"{final_output.name}#{index}", parent=unit))
+                    listing += f"file '{segment_path.resolve()}'\n"
+
+                for render in renders:
+                    render.result()
+
+                listing_path = segment_dir / "segments.txt"
+                listing_path.write_text(listing, encoding='utf-8')
+
+                video = ffmpeg.input(str(listing_path), f='concat', safe=0).video
+                narration_audio, narration_pcm = self._narration_input(audio_path)
+                audio = self._mix_audio(narration_audio.audio, duration)
+                output = ffmpeg.output(
+                    video,
+                    audio,
+                    str(final_output),
+                    vcodec='copy',
+                    acodec=encoder_args['acodec'],
+                    audio_bitrate=encoder_args['audio_bitrate'],
+                    movflags='+faststart',
+                    t=duration,
+                )
+                self.render_farm.run(output, label=final_output.name,
+                                     input=narration_pcm.data if narration_pcm else None, parent=unit)
+            return str(final_output)
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
     def create_simple_srt(self, text, duration, output_path):
         """
-        Create a simple SRT subtitle file with smart sentence splitting
+        Create a simple SRT subtitle file with smart sentence splitting.
+
+        text is a Script (or raw script text, which is parsed into one);
+        each of its parts is a subtitle block.
         """
         try:
-            # Split text into meaningful chunks
-            lines = text.split('\n')
+            script = text if isinstance(text, Script) else parse_script(text)
             sentences = []
 
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Handle title specially
-                if line.startswith('Title:'):
-                    title_parts = line[6:].strip().split(
-                        ' ', 1)  # Split after first word
-                    if len(title_parts) > 1:
-                        sentences.append(title_parts[0])  # First word of title
-                        sentences.append(title_parts[1])  # Rest of title
-                    else:
-                        sentences.append(line[6:].strip())
-                    continue
-
-                # Remove "Fact:" prefix if present
-                if line.startswith('Fact:'):
-                    line = line[5:].strip()
-
-                # Split long lines at natural pause points
-                if len(line.split()) > 12:
-                    parts = line.split(', ')
-                    sentences.extend([p.strip() for p in parts if p.strip()])
-                else:
-                    sentences.append(line)
+            # Handle title specially: first word on its own, then the rest
+            if script.title:
+                sentences.extend(script.title.split(' ', 1))
+
+            # Split long lines at natural pause points
+            for line in [script.hook, *script.facts, script.cta]:
+                sentences.extend(split_cue_text(line))
 
             # Clean up sentences
             sentences = [s.strip() for s in sentences if s.strip()]
@@ -137,17 +516,32 @@ class VideoProcessor:
             return True
 
         except Exception as e:
-            print(f"Error creating SRT file: {str(e)}")
+            logger.error(f"Error creating SRT file: {str(e)}")
+            return False
+
+    def create_timed_srt(self, segments, output_path):
+        """
+        Create an SRT (or ASS, by extension) file timed from the real
+        duration of each synthesized sentence (see
+        AudioProcessor.text_to_speech_chunked)
+        """
+        try:
+            cues = cues_from_segments(segments)
+            if not cues:
+                raise ValueError("No subtitle cues in narration segments")
+            if str(output_path).endswith('.ass'):
+                write_ass(cues, output_path, self.ass_style)
+            else:
+                write_srt(cues, output_path)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error creating timed SRT file: {str(e)}")
             return False
 
     def _format_time(self, seconds):
         """Format time for SRT format (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millisecs = int((seconds % 1) * 1000)
-
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
+        return format_srt_time(seconds)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,27 @@
+import logging
 import os
 import pickle
+import threading
 from pathlib import Path
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-import json
+from src.upload_queue import UploadQueue
+from src.utils import load_config
+
+
+logger = logging.getLogger('video_automation.upload')
+
+
+# One set of credentials, API client and upload queue per process
+_credentials = None
+_service = None
+_upload_queue = None
+_auth_lock = threading.Lock()
 
 
 class YouTubeUploader:
-    def __init__(self):
+    def __init__(self, config=None):
         self.credentials_path = Path(
             __file__).parent.parent / 'config' / 'client_secrets.json'
         self.token_path = Path(__file__).parent.parent / \
@@ -24,43 +36,99 @@ class YouTubeUploader:
         os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
         os.environ["OAUTHLIB_RELAX_TOKEN_SCOPE"] = "1"
 
-        # Load config
-        config_path = Path(__file__).parent.parent / 'config' / 'config.json'
-        with open(config_path) as f:
-            self.config = json.load(f)
-
-    def get_authenticated_service(self):
-        """Get authenticated YouTube service."""
-        credentials = None
+        self.config = config if config is not None else load_config()
 
-        # Load existing token
-        if self.token_path.exists():
-            with open(self.token_path, 'rb') as token:
-                credentials = pickle.load(token)
+    def _save_credentials(self, credentials):
+        with open(self.token_path, 'wb') as token:
+            pickle.dump(credentials, token)
 
-        # If credentials are invalid or don't exist, get new ones
-        if not credentials or not credentials.valid:
-            if credentials and credentials.expired and credentials.refresh_token:
+    def get_credentials(self):
+        """
+        OAuth credentials, loaded from token.pickle (or the browser flow)
+        once per process and refreshed when they expire
+        """
+        global _credentials
+
+        with _auth_lock:
+            credentials = _credentials
+
+            # Load existing token
+            if credentials is None and self.token_path.exists():
+                with open(self.token_path, 'rb') as token:
+                    credentials = pickle.load(token)
+
+            # If credentials are invalid or don't exist, get new ones
+            if not credentials or not credentials.valid:
+                if credentials and credentials.expired and credentials.refresh_token:
+                    credentials.refresh(Request())
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(
+                        str(self.credentials_path), self.scopes)
+                    # Use uma porta específica que deve corresponder à configurada no Google Cloud Console
+                    credentials = flow.run_local_server(
+                        port=8080,
+                        success_message='Autenticação concluída! Você pode fechar esta janela.'
+                    )
+
+                # Save credentials
+                self._save_credentials(credentials)
+
+            _credentials = credentials
+            return credentials
+
+    def access_token(self, force_refresh=False):
+        """Current OAuth access token for the upload queue"""
+        credentials = self.get_credentials()
+        if force_refresh:
+            with _auth_lock:
                 credentials.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    str(self.credentials_path), self.scopes)
-                # Use uma porta específica que deve corresponder à configurada no Google Cloud Console
-                credentials = flow.run_local_server(
-                    port=8080,
-                    success_message='Autenticação concluída! Você pode fechar esta janela.'
-                )
+                self._save_credentials(credentials)
+        return credentials.token
 
-            # Save credentials
-            with open(self.token_path, 'wb') as token:
-                pickle.dump(credentials, token)
-
-        return build('youtube', 'v3', credentials=credentials)
+    def get_authenticated_service(self):
+        """Get authenticated YouTube service (built once per process)."""
+        global _service
+
+        credentials = self.get_credentials()
+        with _auth_lock:
+            if _service is None:
+                _service = build('youtube', 'v3', credentials=credentials, cache_discovery=False)
+            return _service
+
+    @property
+    def upload_queue(self):
+        global _upload_queue
+
+        with _auth_lock:
+            if _upload_queue is None:
+                _upload_queue = UploadQueue.from_config(
+                    self.access_token, self.config.get('youtube', {}), Path(__file__).parent.parent)
+            return _upload_queue
+
+    def _body(self, title, description=None, privacy_status="private"):
+        if description is None:
+            description = "Created with Video Automation"
+
+        return {
+            'snippet': {
+                'title': title,
+                'description': description,
+                'categoryId': '22'  # People & Blogs category
+            },
+            'status': {
+                'privacyStatus': privacy_status,
+                'selfDeclaredMadeForKids': False
+            }
+        }
 
     def upload_video(self, video_path, title, description=None, privacy_status="private"):
         """
         Upload a video to YouTube.
 
+        The upload is resumable: transient errors are retried and an upload
+        interrupted by a crash continues from where it stopped on the next
+        call for the same file.
+
         Args:
             video_path (str): Path to the video file
             title (str): Video title
@@ -71,51 +139,43 @@ class YouTubeUploader:
             str: Video ID if successful, None if failed
         """
         try:
-            youtube = self.get_authenticated_service()
-
-            if description is None:
-                description = "Created with Video Automation"
-
-            body = {
-                'snippet': {
-                    'title': title,
-                    'description': description,
-                    'categoryId': '22'  # People & Blogs category
-                },
-                'status': {
-                    'privacyStatus': privacy_status,
-                    'selfDeclaredMadeForKids': False
-                }
-            }
+            logger.info(f"🎥 Uploading video to YouTube: {title}")
+            video_id = self.upload_queue.upload(
+                video_path, self._body(title, description, privacy_status), label=title)
 
-            # Create MediaFileUpload object
-            media = MediaFileUpload(
-                video_path,
-                chunksize=1024*1024,
-                resumable=True
-            )
-
-            # Execute upload
-            print(f"🎥 Uploading video to YouTube: {title}")
-            request = youtube.videos().insert(
-                part=','.join(body.keys()),
-                body=body,
-                media_body=media
-            )
-
-            response = None
-            while response is None:
-                status, response = request.next_chunk()
-                if status:
-                    print(f"Uploaded {int(status.progress() * 100)}%")
-
-            print(f"✅ Upload complete! Video ID: {response['id']}")
-            return response['id']
+            logger.info(f"✅ Upload complete! Video ID: {video_id}")
+            return video_id
 
         except Exception as e:
-            print(f"❌ Error uploading video: {str(e)}")
+            logger.error(f"❌ Error uploading video: {str(e)}")
             return None
 
+    def upload_videos(self, videos, privacy_status="private", measure=None):
+        """
+        Upload several videos concurrently (youtube.max_workers at a time).
+
+        videos is a list of (video_path, title, description) tuples. Returns
+        the video IDs in the same order, with None for failed uploads.
+        measure(video_path), if given, returns a context manager wrapped
+        around that upload on its worker thread.
+        """
+        futures = [
+            self.upload_queue.submit(video_path, self._body(title, description, privacy_status), label=title,
+                                     measure=measure(video_path) if measure else None)
+            for video_path, title, description in videos
+        ]
+
+        video_ids = []
+        for (_, title, _), future in zip(videos, futures):
+            try:
+                video_ids.append(future.result())
+                logger.info(f"✅ Upload complete! {title}: {video_ids[-1]}")
+            except Exception as e:
+                logger.error(f"❌ Error uploading video {title}: {str(e)}")
+                video_ids.append(None)
+        logger.info(f"📤 Uploads: {self.upload_queue.report()}")
+        return video_ids
+
 
 if __name__ == "__main__":
     # Test upload
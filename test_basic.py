@@ -1,4 +1,4 @@
-monta#!/usr/bin/env python3
+#!/usr/bin/env python3
 """
 Basic test script for video automation components
 """
@@ -47,10 +47,10 @@ def test_config():
     print("\n=== Testing Configuration ===")
     try:
         from src.utils import validate_config
+        from src.llm_client import backend_name
         config = validate_config()
         print("✓ Configuration file is valid")
-        print("✓ OpenRouter API key configured")
-        print("✓ ElevenLabs API key configured")
+        print(f"✓ Text generation backend '{backend_name(config)}' configured")
         return True
     except Exception as e:
         print(f"✗ Configuration validation failed: {e}")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+DiskCache: LRU eviction, statistics, TTL and concurrent access
+"""
+
+import os
+import threading
+import time
+
+from src.cache import HEADER, DiskCache, cache_key
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = DiskCache(tmp_path)
+    key = cache_key('segment', 'hello', 1.0)
+    assert cache.get(key) is None
+    cache.put(key, b'pcm')
+    assert cache.get(key) == b'pcm'
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1 and cache.stats['writes'] == 1
+    assert cache.hit_rate() == 0.5
+    assert cache.size == len(b'pcm') + HEADER.size
+    assert "1 hits/1 misses (50% hit rate)" in cache.report()
+
+    # Sizes are recomputed from disk by a new instance
+    assert DiskCache(tmp_path).size == cache.size
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = 100 + HEADER.size
+    cache = DiskCache(tmp_path, max_bytes=3 * entry)
+    keys = [cache_key(str(i)) for i in range(3)]
+    for index, key in enumerate(keys):
+        cache.put(key, bytes(100))
+        # mtime has a coarse resolution on some filesystems
+        os.utime(cache._path(key), (index, index))
+    assert cache.get(keys[0]) == bytes(100)
+
+    cache.put(cache_key('new'), bytes(100))
+    assert cache.stats['evictions'] == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.size <= 3 * entry
+
+
+def test_ttl_and_unreadable_entries(tmp_path):
+    key = cache_key('response')
+    DiskCache(tmp_path).put(key, b'{"a": 1}')
+    # Turning the TTL on (or off) keeps entries readable
+    assert DiskCache(tmp_path, ttl=3600).get(key) == b'{"a": 1}'
+
+    expiring = DiskCache(tmp_path, ttl=0.2)
+    time.sleep(0.3)
+    assert expiring.get(key) is None and expiring.stats['expired'] == 1
+
+    cache = DiskCache(tmp_path)
+    cache._path(key).parent.mkdir(parents=True, exist_ok=True)
+    cache._path(key).write_bytes(b'{"a"')
+    assert cache.get(key) is None
+    assert cache.stats['unreadable'] == 1 and not cache._path(key).exists()
+
+
+def test_concurrent_put_and_get(tmp_path):
+    cache = DiskCache(tmp_path)
+    keys = [cache_key(i) for i in range(20)]
+    errors = []
+
+    def worker(seed):
+        try:
+            for round_ in range(20):
+                key = keys[(seed + round_) % len(keys)]
+                cache.put(key, key.encode() * 10)
+                value = cache.get(key)
+                assert value is None or value == key.encode() * 10
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.stats['writes'] == 8 * 20
+    assert cache.size == sum(len(key) * 10 + HEADER.size for key in keys)
+    assert not list(tmp_path.glob('*/*.tmp'))
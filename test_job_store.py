@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Job store checkpoints and resuming a job after a failed stage
+"""
+
+import importlib.util
+import wave
+from pathlib import Path
+
+import pytest
+
+from main import COMMAND_COMPONENTS, VideoAutomation
+from src.audio_processing import AudioProcessor
+from src.job_store import JobStore
+from src.jobs import Job
+from src.media_info import MediaInfo
+from src.text_generation import TextGenerator
+
+
+class CountingTextGenerator(TextGenerator):
+    def __init__(self):
+        super().__init__({'llm': {'backend': 'template', 'cache': False}})
+        self.calls = 0
+
+    def generate_script(self, prompt):
+        self.calls += 1
+        return super().generate_script(prompt)
+
+
+class CountingAudioProcessor(AudioProcessor):
+    def __init__(self):
+        super().__init__({'tts': {'model': 'tone', 'chunked': True, 'cache': False}})
+        self.calls = 0
+
+    def text_to_speech_chunked(self, text, output_path):
+        self.calls += 1
+        return super().text_to_speech_chunked(text, output_path)
+
+
+class WavProbe:
+    def probe(self, path):
+        with wave.open(str(path), 'rb') as wav:
+            return MediaInfo(str(path), wav.getnframes() / wav.getframerate(), audio_codec='pcm_s16le')
+
+
+class FlakyVideoProcessor:
+    """Renders a placeholder file; the first `failures` renders fail"""
+
+    def __init__(self, output_path, failures=1):
+        self.output_path = str(output_path)
+        self.failures = failures
+        self.calls = 0
+        self.media = WavProbe()
+
+    def validate_assets(self):
+        return {}
+
+    def create_timed_srt(self, segments, output_path):
+        Path(output_path).write_text("1\n00:00:00,000 --> 00:00:01,000\nHi\n\n", encoding='utf-8')
+        return True
+
+    def create_video(self, audio_path, subtitle_path, output_filename, output_dir=None, duration=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return None
+        rendered = Path(output_dir) / output_filename
+        rendered.write_bytes(b'video')
+        return str(rendered)
+
+
+def make_automation(tmp_path, failures=1):
+    config = {
+        'pipeline': {'scratch_dir': str(tmp_path / 'jobs'), 'job_store': str(tmp_path / 'jobs.sqlite3')},
+        'metrics': {'json_log': '', 'prometheus_file': ''},
+        'subtitles': {'timing': 'auto'},
+    }
+    return VideoAutomation(config, text_generator=CountingTextGenerator(),
+                           audio_processor=CountingAudioProcessor(),
+                           video_processor=FlakyVideoProcessor(tmp_path / 'videos', failures))
+
+
+def stage_statuses(store, job_id):
+    return {stage['stage']: stage['status'] for stage in store.stages(job_id)}
+
+
+def test_checkpoints_are_hashed(tmp_path):
+    store = JobStore(tmp_path / 'jobs.sqlite3')
+    job = Job('prompt', tmp_path / 'videos', tmp_path / 'jobs')
+    store.create_job(job)
+    artifact = job.path('script.json')
+    with store.stage(job.job_id, 'script'):
+        artifact.write_text('{"title": "a"}', encoding='utf-8')
+        store.finish_stage(job.job_id, 'script', artifact)
+
+    assert store.completed_artifact(job.job_id, 'script') == artifact
+    assert store.completed_artifact(job.job_id, 'tts') is None
+
+    artifact.write_text('{"title": "b"}', encoding='utf-8')
+    assert store.completed_artifact(job.job_id, 'script') is None
+    artifact.unlink()
+    assert store.completed_artifact(job.job_id, 'script') is None
+
+    with pytest.raises(RuntimeError):
+        with store.stage(job.job_id, 'tts'):
+            raise RuntimeError("model crashed")
+    assert stage_statuses(store, job.job_id)['tts'] == 'failed'
+    assert store.get_job(job.job_id)['status'] == 'failed'
+    store.close()
+
+
+def test_resume_skips_completed_stages(tmp_path):
+    automation = make_automation(tmp_path)
+    assert automation.create_video("Create a video about owls") is None
+
+    job_id = automation.jobs[0].job_id
+    store = automation.job_store
+    assert store.get_job(job_id)['status'] == 'failed'
+    assert stage_statuses(store, job_id) == {'script': 'done', 'tts': 'done', 'srt': 'done', 'render': 'failed'}
+
+    final_video = automation.resume(job_id)
+    assert final_video and Path(final_video).read_bytes() == b'video'
+    assert store.get_job(job_id)['status'] == 'done'
+    # Only the failed stage ran again
+    assert automation.text_generator.calls == 1
+    assert automation.audio_processor.calls == 1
+    assert automation.video_processor.calls == 2
+    assert automation.metrics.stages['tts'].runs['skipped'] == 1
+
+    with pytest.raises(ValueError):
+        automation.load_job(job_id)
+    store.close()
+
+
+def test_changed_checkpoint_runs_its_stage_again(tmp_path):
+    automation = make_automation(tmp_path)
+    automation.create_video("Create a video about owls")
+    job = automation.jobs[0]
+
+    # A narration that no longer matches its recorded hash is synthesized again
+    with open(job.narration_path, 'ab') as narration:
+        narration.write(b'\0\0')
+    assert automation.resume(job.job_id)
+    assert automation.text_generator.calls == 1
+    assert automation.audio_processor.calls == 2
+    automation.job_store.close()
+
+
+def test_resuming_a_render_does_not_load_the_voice_model(tmp_path):
+    make_automation(tmp_path).create_video("Create a video about owls")
+
+    # A fresh process resuming the job, set up the way main() does it
+    automation = make_automation(tmp_path, failures=0).build(COMMAND_COMPONENTS['resume'])
+    job_id = automation.job_store.list_jobs('failed')[0]['job_id']
+    assert automation.resume(job_id)
+    assert automation.audio_processor.calls == 0
+    assert automation.audio_processor._engine is None
+
+    # A missing F5-TTS is still reported up front, without loading anything
+    automation.audio_processor.tts_model = 'F5TTS_v1_Base'
+    if importlib.util.find_spec('f5_tts') is None:
+        with pytest.raises(ImportError):
+            automation.build(COMMAND_COMPONENTS['resume'])
+    automation.job_store.close()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Text generation backends against local stubs of their HTTP APIs
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.cache import cache_key
+from src.llm_client import GeminiClient, LLMError, OpenAICompatibleClient, RateLimiter, TemplateBackend
+from src.text_generation import SCRIPT_PARSER_VERSION
+
+
+class StubGemini(BaseHTTPRequestHandler):
+    # Status codes to answer with before succeeding, shared across requests
+    failures = []
+    requests = []
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path.endswith('/chat/completions'):
+            return self.chat_completion(body)
+        prompt = body['contents'][0]['parts'][0]['text']
+        type(self).requests.append((self.path, self.headers['x-goog-api-key'], prompt))
+        time.sleep(self.delay)
+
+        if type(self).failures:
+            status = type(self).failures.pop(0)
+            payload = json.dumps({'error': {'code': status, 'message': 'stub failure'}}).encode()
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', '0')
+        else:
+            payload = json.dumps({
+                'candidates': [{'content': {'parts': [{'text': f"Script for {prompt}"}]}}],
+                'usageMetadata': {'totalTokenCount': 42},
+            }).encode()
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def chat_completion(self, body):
+        prompt = body['messages'][0]['content']
+        type(self).requests.append((self.path, self.headers.get('Authorization'), prompt))
+        payload = json.dumps({
+            'choices': [{'message': {'role': 'assistant', 'content': f"Chat script for {prompt}"}}],
+            'usage': {'total_tokens': 7},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubGemini.failures = []
+    StubGemini.requests = []
+    StubGemini.delay = 0.0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGemini)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(base_url, **options):
+    return GeminiClient('test-key', base_url=base_url, backoff=0.01, **options)
+
+
+def test_generate_sends_prompt(stub):
+    client = make_client(stub)
+    assert asyncio.run(client.generate('volcanoes')) == 'Script for volcanoes'
+    path, key, prompt = StubGemini.requests[0]
+    assert path == '/v1beta/models/gemini-2.0-flash:generateContent'
+    assert key == 'test-key' and prompt == 'volcanoes'
+    assert client.stats['tokens'] == 42
+
+
+def test_retries_rate_limits_and_server_errors(stub):
+    StubGemini.failures = [429, 503]
+    client = make_client(stub)
+    assert asyncio.run(client.generate('sharks')) == 'Script for sharks'
+    assert client.stats['retries'] == 2
+    assert len(StubGemini.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    StubGemini.failures = [400]
+    client = make_client(stub)
+    with pytest.raises(LLMError) as error:
+        asyncio.run(client.generate('bad'))
+    assert error.value.status == 400
+    assert len(StubGemini.requests) == 1
+
+
+def test_gives_up_after_max_retries(stub):
+    StubGemini.failures = [500] * 10
+    client = make_client(stub, max_retries=2)
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate('x'))
+    assert len(StubGemini.requests) == 3
+
+
+def test_generate_many_runs_concurrently_in_order(stub):
+    StubGemini.delay = 0.2
+    client = make_client(stub, max_concurrency=8)
+    prompts = [f"topic {i}" for i in range(8)]
+    started = time.perf_counter()
+    texts = asyncio.run(client.generate_many(prompts))
+    elapsed = time.perf_counter() - started
+    assert texts == [f"Script for {prompt}" for prompt in prompts]
+    # Eight requests overlapping take about one round trip, not eight
+    assert elapsed < 0.2 * 4
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rpm=2, window=0.3)
+
+    async def burst():
+        started = time.perf_counter()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(burst()) >= 0.3
+
+
+def test_rate_limiter_token_budget():
+    limiter = RateLimiter(tpm=100, window=0.3)
+
+    async def burst():
+        started = time.perf_counter()
+        first = await limiter.acquire(60)
+        limiter.settle(first, 80)
+        await limiter.acquire(30)
+        return time.perf_counter() - started
+
+    assert asyncio.run(burst()) >= 0.3
+
+
+def make_generator(base_url, tmp_path, **gemini):
+    from src.text_generation import TextGenerator
+
+    cache = {key: gemini.pop(key) for key in ('cache', 'cache_ttl_hours') if key in gemini}
+    config = dict({'api_key': 'test-key', 'base_url': base_url, 'backoff': 0.01}, **gemini)
+    return TextGenerator({'llm': dict(cache, cache_dir=str(tmp_path / 'llm')), 'gemini': config})
+
+
+def test_script_cache_skips_repeated_prompts(stub, tmp_path):
+    generator = make_generator(stub, tmp_path)
+    assert generator.generate_script('#bees#').text == 'Script for bees'
+    assert generator.generate_script('#bees#').text == 'Script for bees'
+    assert len(StubGemini.requests) == 1
+
+    # New parsing rules reuse the cached raw response
+    import src.text_generation as text_generation
+    text_generation.SCRIPT_PARSER_VERSION += 1
+    try:
+        assert make_generator(stub, tmp_path).generate_script('#bees#').text == 'Script for bees'
+    finally:
+        text_generation.SCRIPT_PARSER_VERSION -= 1
+    assert len(StubGemini.requests) == 1
+
+    # Different generation parameters are a different request
+    make_generator(stub, tmp_path, max_output_tokens=10).generate_script('#bees#')
+    assert len(StubGemini.requests) == 2
+
+
+def test_script_cache_expires(stub, tmp_path):
+    generator = make_generator(stub, tmp_path, cache_ttl_hours=0.5 / 3600)
+    generator.generate_script('owls')
+    time.sleep(0.6)
+    generator.generate_script('owls')
+    assert len(StubGemini.requests) == 2
+    assert generator.cache.stats['expired'] >= 1
+
+
+def test_cache_ttl_can_be_toggled(stub, tmp_path):
+    for ttl_hours in (24, 0, 24):
+        assert make_generator(stub, tmp_path, cache_ttl_hours=ttl_hours).generate_script('owls').text == \
+            'Script for owls'
+    assert len(StubGemini.requests) == 1
+
+
+def test_bad_cache_entry_fails_only_its_prompt(stub, tmp_path):
+    generator = make_generator(stub, tmp_path)
+    key = generator._response_key('moths')
+    generator.cache.put(key, b'not json')
+    generator.cache.put(cache_key('script', SCRIPT_PARSER_VERSION, key), b'{"no": "script"')
+
+    scripts = generator.generate_scripts(['moths', 'bats'])
+    assert scripts[0] is None and scripts[1].text == 'Script for bats'
+
+
+def test_cancelled_owner_releases_coalesced_waiters(stub, tmp_path):
+    StubGemini.delay = 0.3
+    generator = make_generator(stub, tmp_path, cache=False)
+
+    async def race():
+        owner = asyncio.ensure_future(generator._raw_response('moon', 'key'))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(generator._raw_response('moon', 'key'))
+        await asyncio.sleep(0.05)
+        owner.cancel()
+        with pytest.raises(LLMError):
+            await asyncio.wait_for(waiter, 2)
+
+    asyncio.run(race())
+    assert generator._in_flight == {}
+
+
+def test_identical_requests_are_coalesced(stub, tmp_path):
+    StubGemini.delay = 0.3
+    generator = make_generator(stub, tmp_path, cache=False)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(generator.generate_script('moon').text))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['Script for moon'] * 4
+    assert len(StubGemini.requests) == 1
+
+    assert [script.text for script in generator.generate_scripts(['sun', 'sun', 'stars'])] == [
+        'Script for sun', 'Script for sun', 'Script for stars']
+    assert len(StubGemini.requests) == 3
+
+
+def test_openai_compatible_backend(stub):
+    client = OpenAICompatibleClient('', model='local-model', base_url=stub)
+    assert asyncio.run(client.generate('rivers')) == 'Chat script for rivers'
+    path, authorization, _ = StubGemini.requests[0]
+    assert path == '/v1beta/chat/completions'
+    # Local servers need no key, so none is sent
+    assert authorization is None
+
+
+def test_backend_is_selected_by_config(tmp_path):
+    from src.text_generation import TextGenerator
+
+    generator = TextGenerator({'llm': {'backend': 'template', 'cache': False}})
+    assert isinstance(generator.backend, TemplateBackend)
+    script = generator.generate_script('Create a video about black holes')
+    assert script.to_dict() == generator.generate_script('Create a video about black holes').to_dict()
+    assert script.title == '6 shocking facts about black holes'
+    assert len(script.facts) == 6 and 'Fact:' not in script.text
+
+    with pytest.raises(ValueError):
+        TextGenerator({'llm': {'backend': 'nope'}})
+
+
+def test_json_mode(stub, tmp_path):
+    from src.text_generation import TextGenerator
+
+    generator = TextGenerator({'llm': {'backend': 'template', 'cache': False, 'json_mode': True}})
+    script = generator.generate_script('Create a video about black holes')
+    assert len(script.facts) == 6 and script.cta
+
+    generator = make_generator(stub, tmp_path, cache=False)
+    generator.json_mode = True
+    generator.generate_script('comets')
+    _, _, prompt = StubGemini.requests[-1]
+    assert prompt.startswith('comets') and '"facts"' in prompt
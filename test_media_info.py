@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Media info cache: each file is probed once until it changes
+"""
+
+import json
+import os
+
+import ffmpeg
+import pytest
+
+from src import media_info
+from src.media_info import MediaInfoService
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Count ffprobe runs; the fake reads the duration from the file itself"""
+    calls = []
+
+    def probe(path):
+        calls.append(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                duration = json.load(f)['duration']
+        except ValueError:
+            raise ffmpeg.Error('ffprobe', b'', b'Invalid data found when processing input')
+        return {'format': {'duration': duration},
+                'streams': [{'codec_type': 'audio', 'codec_name': 'pcm_s16le',
+                             'sample_rate': '24000', 'channels': 1}]}
+
+    monkeypatch.setattr(media_info.ffmpeg, 'probe', probe)
+    return calls
+
+
+def test_rewritten_file_is_probed_again(tmp_path, probes):
+    service = MediaInfoService()
+    path = tmp_path / 'narration.wav'
+    path.write_text('{"duration": "1.5"}', encoding='utf-8')
+
+    assert service.probe(path).duration == 1.5
+    assert service.probe(str(path)).duration == 1.5
+    assert service.stats == {'probes': 1, 'hits': 1}
+
+    # A different size invalidates the entry...
+    path.write_text('{"duration": "12.25"}', encoding='utf-8')
+    assert service.probe(path).duration == 12.25
+    # ...and so does a new mtime with the same size
+    path.write_text('{"duration": "13.25"}', encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert service.probe(path).duration == 13.25
+    assert service.stats == {'probes': 3, 'hits': 1}
+    assert len(probes) == 3
+
+
+def test_probe_directory_skips_unreadable_files(tmp_path, probes):
+    (tmp_path / 'a.wav').write_text('{"duration": "2"}', encoding='utf-8')
+    (tmp_path / 'broken.mp3').write_text('not media', encoding='utf-8')
+    (tmp_path / 'notes.txt').write_text('{"duration": "9"}', encoding='utf-8')
+
+    service = MediaInfoService()
+    with pytest.raises(ValueError):
+        service.validate(tmp_path / 'broken.mp3')
+    results = service.probe_directory(tmp_path)
+    assert list(results) == [str(tmp_path / 'a.wav')]
+    assert results[str(tmp_path / 'a.wav')].has_audio
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-stage pipeline metrics: totals, Prometheus export and JSON logs
+"""
+
+import json
+import logging
+import urllib.request
+
+import pytest
+
+from src.metrics import JsonFormatter, PipelineMetrics
+from src.pipeline import Stage, StagedPipeline
+
+
+def samples(text):
+    """Prometheus text -> {'name{labels}': value}"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+def test_stage_totals_and_prometheus_file(tmp_path):
+    metrics = PipelineMetrics(tmp_path / 'metrics.prom')
+
+    with metrics.stage('job-1', 'script', bytes_in=100) as record:
+        record['bytes_out'] = 40
+    with pytest.raises(RuntimeError):
+        with metrics.stage('job-2', 'script', bytes_in=50):
+            raise RuntimeError("backend down")
+    with metrics.stage('job-3', 'upload') as record:
+        record['status'] = 'error'
+    metrics.skip('job-1', 'tts')
+    metrics.job_finished('job-1', True)
+    metrics.job_finished('job-2', False)
+
+    values = samples((tmp_path / 'metrics.prom').read_text())
+    assert values['video_stage_runs_total{stage="script",status="ok"}'] == 1
+    assert values['video_stage_runs_total{stage="script",status="error"}'] == 1
+    assert values['video_stage_runs_total{stage="upload",status="error"}'] == 1
+    assert values['video_stage_runs_total{stage="tts",status="skipped"}'] == 1
+    assert values['video_stage_bytes_in_total{stage="script"}'] == 150
+    assert values['video_stage_bytes_out_total{stage="script"}'] == 40
+    assert values['video_stage_duration_seconds_count{stage="script"}'] == 2
+    assert values['video_stage_duration_seconds_bucket{stage="script",le="+Inf"}'] == 2
+    assert values['video_stage_in_progress{stage="script"}'] == 0
+    assert values['video_stage_peak_rss_growth_bytes{stage="script"}'] >= 0
+    assert values['video_process_peak_rss_bytes'] > 0
+    assert values['video_jobs_total{status="done"}'] == 1
+    assert values['video_jobs_total{status="failed"}'] == 1
+    assert "script 2 runs" in metrics.report()
+
+
+def test_stage_events_are_logged_as_json(tmp_path):
+    log_path = tmp_path / 'pipeline.jsonl'
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger('video_automation.metrics')
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        metrics = PipelineMetrics()
+        with metrics.stage('job-1', 'render', bytes_in=10) as record:
+            record['bytes_out'] = 20
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    event = json.loads(log_path.read_text().splitlines()[-1])
+    assert event['event'] == 'stage'
+    assert event['job_id'] == 'job-1'
+    assert event['stage'] == 'render'
+    assert event['status'] == 'ok'
+    assert (event['bytes_in'], event['bytes_out']) == (10, 20)
+    assert event['duration_seconds'] >= 0 and event['cpu_seconds'] >= 0
+    assert event['process_peak_rss_bytes'] > 0 and event['peak_rss_growth_bytes'] >= 0
+
+
+def test_batch_stage_failures_are_logged_as_json(tmp_path):
+    class Item:
+        job_id = 'job-7'
+
+    def fail(item):
+        raise RuntimeError("render exploded")
+
+    log_path = tmp_path / 'pipeline.jsonl'
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger('video_automation')
+    logger.addHandler(handler)
+    try:
+        assert StagedPipeline([Stage('render', fail)]).run([Item()]) == [None]
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    event = json.loads(log_path.read_text().splitlines()[-1])
+    assert event['level'] == 'error' and event['event'] == 'stage_failed'
+    assert (event['stage'], event['job_id'], event['item']) == ('render', 'job-7', 0)
+    assert event['error'] == "render exploded"
+
+
+def test_component_errors_are_logged_as_json(tmp_path):
+    from src.audio_processing import AudioProcessor
+
+    log_path = tmp_path / 'pipeline.jsonl'
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger('video_automation')
+    logger.addHandler(handler)
+    try:
+        processor = AudioProcessor({'tts': {'model': 'tone', 'cache': False}})
+        assert processor.text_to_speech_chunked([], str(tmp_path / 'narration.wav')) is None
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    event = json.loads(log_path.read_text().splitlines()[-1])
+    assert (event['level'], event['logger']) == ('error', 'video_automation.audio')
+    assert "No sentences to synthesize" in event['message']
+
+
+def test_metrics_endpoint():
+    metrics = PipelineMetrics()
+    with metrics.stage('job-1', 'tts'):
+        pass
+    server = metrics.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            values = samples(response.read().decode('utf-8'))
+        assert values['video_stage_runs_total{stage="tts",status="ok"}'] == 1
+    finally:
+        metrics.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+In-memory narration: synthesized PCM piped straight into the render
+"""
+
+import shutil
+import subprocess
+import wave
+
+import pytest
+
+from src.audio_processing import AudioProcessor
+from src.render_farm import RenderFarm
+from src.video_processing import VideoProcessor
+
+
+requires_ffmpeg = pytest.mark.skipif(
+    not (shutil.which('ffmpeg') and shutil.which('ffprobe')),
+    reason="ffmpeg and ffprobe are required")
+
+LINES = ["The ocean is deep.", "Octopuses have three hearts.", "Follow for more facts!"]
+
+
+def tone_processor():
+    return AudioProcessor({'tts': {'model': 'tone', 'cache': False, 'sentence_pause': 0.1}})
+
+
+def test_synthesize_matches_streamed_wav(tmp_path):
+    processor = tone_processor()
+    narration, segments = processor.synthesize(LINES)
+    streamed = processor.text_to_speech_chunked(LINES, str(tmp_path / 'streamed.wav'))
+
+    assert [(s.text, s.start, s.duration) for s in segments] == \
+        [(s.text, s.start, s.duration) for s in streamed]
+    assert narration.duration == pytest.approx(segments[-1].end)
+    assert narration.data.nbytes == narration.nbytes
+    assert repr(narration.info()).startswith('MediaInfo(<memory>: duration=')
+
+    with wave.open(str(tmp_path / 'streamed.wav'), 'rb') as streamed_wav:
+        assert streamed_wav.readframes(streamed_wav.getnframes()) == narration.samples.tobytes()
+    with wave.open(str(narration.write_wav(tmp_path / 'memory.wav')), 'rb') as memory_wav:
+        assert memory_wav.getframerate() == narration.sample_rate
+        assert memory_wav.readframes(memory_wav.getnframes()) == narration.samples.tobytes()
+
+
+def test_text_to_speech_writes_a_wav(tmp_path):
+    path = tmp_path / 'narration.wav'
+    assert tone_processor().text_to_speech(' '.join(LINES), str(path))
+    with wave.open(str(path), 'rb') as wav:
+        assert (wav.getnchannels(), wav.getsampwidth()) == (1, 2)
+        assert wav.getnframes() > 0
+
+
+@requires_ffmpeg
+def test_render_farm_feeds_stdin():
+    farm = RenderFarm(max_jobs=1)
+    try:
+        stdout, _ = farm.run(['ffmpeg', '-v', 'error', '-f', 's16le', '-ar', '8000', '-ac', '1', '-i', 'pipe:0',
+                              '-f', 's16le', 'pipe:1'], input=bytearray(range(256)) * 64)
+    finally:
+        farm.shutdown()
+    assert stdout == bytes(range(256)) * 64
+    assert farm.jobs[0].input is None
+
+
+@requires_ffmpeg
+def test_render_from_memory(tmp_path):
+    background = tmp_path / 'background.mp4'
+    subtitles = tmp_path / 'subtitles.srt'
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=s=320x240:r=25',
+                    '-t', '2', '-pix_fmt', 'yuv420p', str(background)], check=True)
+    subtitles.write_text("1\n00:00:00,500 --> 00:00:02,000\nFrom memory\n\n", encoding='utf-8')
+
+    narration, _ = tone_processor().synthesize(LINES)
+    processor = VideoProcessor({'video': {
+        'background_video_path': str(background),
+        'background_music_path': '',
+        'output_path': str(tmp_path / 'out'),
+        'asset_cache_dir': str(tmp_path / 'cache'),
+        'loudness_cache_dir': str(tmp_path / 'loudness'),
+        'encoder_profile': 'draft',
+    }})
+    rendered = processor.create_video(narration, str(subtitles), 'memory.mp4')
+    assert rendered
+
+    info = processor.media.probe(rendered)
+    assert info.audio_codec == 'aac'
+    assert info.duration == pytest.approx(narration.duration, abs=0.1)
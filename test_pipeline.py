@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Staged pipeline: result order, failure isolation and overlapping stages
+"""
+
+import threading
+import time
+
+from src.pipeline import Stage, StagedPipeline
+
+
+def test_results_come_back_in_input_order():
+    # Later items finish first in the parallel stage
+    def slow_square(value):
+        time.sleep(0.05 * (5 - value))
+        return value * value
+
+    pipeline = StagedPipeline([
+        Stage('square', slow_square, workers=5),
+        Stage('label', lambda value: f"#{value}"),
+    ])
+    assert pipeline.run(range(5)) == ['#0', '#1', '#4', '#9', '#16']
+    assert [len(pipeline.timings[name]) for name in ('square', 'label')] == [5, 5]
+
+
+def test_failed_items_do_not_stall_the_others():
+    def script(value):
+        if value == 1:
+            raise RuntimeError("no script")
+        return None if value == 3 else value
+
+    rendered = []
+    pipeline = StagedPipeline([
+        Stage('script', script, workers=2),
+        Stage('render', lambda value: rendered.append(value) or f"video-{value}"),
+    ])
+    results = []
+    runner = threading.Thread(target=lambda: results.append(pipeline.run(range(5))))
+    runner.start()
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    # Failed items stop at the stage that failed and come back as None
+    assert sorted(rendered) == [0, 2, 4]
+    assert results == [['video-0', None, 'video-2', None, 'video-4']]
+    assert len(pipeline.timings['script']) == 5 and len(pipeline.timings['render']) == 3
+
+
+def test_stages_overlap():
+    rendering = threading.Event()
+
+    # The second item is only scripted once the first one is rendering,
+    # which never happens if a stage waits for the previous one to finish
+    def script(value):
+        if value == 1 and not rendering.wait(timeout=5):
+            return None
+        return value
+
+    def render(value):
+        rendering.set()
+        return value
+
+    pipeline = StagedPipeline([Stage('script', script), Stage('render', render)])
+    assert pipeline.run([0, 1]) == [0, 1]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Opt-in stage profiling and ffmpeg -benchmark capture
+"""
+
+import json
+import shutil
+
+import pytest
+
+from src.profiling import PROFILE_ENV, PipelineProfiler, profiling_requested
+from src.render_farm import RenderFarm, parse_benchmark
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+def test_profiling_is_off_unless_requested(monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    assert not profiling_requested({})
+    assert profiling_requested({'profiling': {'enabled': True}})
+    monkeypatch.setenv(PROFILE_ENV, '0')
+    assert not profiling_requested({})
+    monkeypatch.setenv(PROFILE_ENV, '1')
+    assert profiling_requested({})
+
+
+def test_stage_artifacts(tmp_path):
+    profiler = PipelineProfiler(tmp_path, top=5, sample_interval=0.001)
+    try:
+        with profiler.stage('job-1', 'tts'):
+            data = [bytes(1024) for _ in range(200)]
+            busy(300000)
+        with profiler.stage('job-1', 'render'):
+            busy(1000)
+    finally:
+        profiler.close()
+
+    directory = profiler.job_dir('job-1')
+    for stage in ('tts', 'render'):
+        for suffix in ('pstats', 'collapsed', 'allocations.txt'):
+            assert (directory / f"{stage}.{suffix}").exists()
+
+    summary = json.loads((directory / 'summary.json').read_text())
+    assert set(summary) == {'tts', 'render'}
+    assert summary['tts']['allocated_bytes'] >= 200 * 1024
+    assert any('busy' in row['function'] for row in summary['tts']['top_functions'])
+    assert 'busy' in (directory / 'tts.collapsed').read_text()
+    assert len(data) == 200
+
+
+def test_parse_benchmark():
+    stderr = (b"frame=  25 fps=0.0 q=-0.0 size=N/A\n"
+              b"bench: utime=1.250s stime=0.010s rtime=0.900s\n"
+              b"bench: maxrss=65536KiB\n")
+    assert parse_benchmark(stderr) == {'utime': 1.25, 'stime': 0.01, 'rtime': 0.9, 'maxrss_kib': 65536.0}
+    assert parse_benchmark("no benchmark here") == {}
+
+
+@pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg not installed")
+def test_render_farm_benchmarks_collected_jobs():
+    farm = RenderFarm(max_jobs=1)
+    command = ['ffmpeg', '-f', 'lavfi', '-i', 'sine=duration=0.2', '-f', 'null', '-']
+    try:
+        with farm.collect(benchmark=True) as jobs:
+            farm.run(command, label='measured')
+        farm.run(command, label='unmeasured')
+    finally:
+        farm.shutdown()
+
+    assert [job.label for job in jobs] == ['measured']
+    assert jobs[0].args[1] == '-benchmark'
+    assert {'utime', 'stime', 'rtime', 'maxrss_kib'} <= set(jobs[0].benchmark)
+    assert farm.jobs[1].benchmark is None
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Render farm job bookkeeping: bounded history, cancelling, videos and throughput
+"""
+
+import sys
+import time
+
+import ffmpeg
+import pytest
+
+from src.render_farm import RenderCancelled, RenderFarm
+
+
+def python(code):
+    return [sys.executable, '-c', code]
+
+
+def test_finished_jobs_are_bounded():
+    farm = RenderFarm(max_jobs=2, history=3)
+    try:
+        renders = [farm.submit(python('pass'), label=f"ok-{index}") for index in range(6)]
+        renders.append(farm.submit(python('import sys; sys.exit(1)'), label='broken'))
+        for render in renders:
+            render.future.exception()
+    finally:
+        farm.shutdown()
+
+    assert [job.label for job in farm.jobs] == ['ok-4', 'ok-5', 'broken']
+    assert farm.active == {}
+    # Counts cover every job, not only the ones still in the history
+    assert farm.stats()['counts'] == {'done': 6, 'failed': 1}
+    assert "6 done" in farm.report()
+
+
+def test_cancel_running_and_queued_jobs():
+    farm = RenderFarm(max_jobs=1)
+    try:
+        running = farm.submit(python('import time; time.sleep(30)'))
+        queued = farm.submit(python('pass'))
+        while running.status != 'running' or running._process is None:
+            time.sleep(0.01)
+        assert farm.cancel(queued) and queued.status == 'cancelled'
+        farm.cancel(running)
+        with pytest.raises(RenderCancelled):
+            running.result()
+    finally:
+        farm.shutdown()
+
+    assert running.status == 'cancelled' and running.wall_seconds < 30
+    assert farm.stats()['counts'] == {'cancelled': 2}
+
+
+def test_throughput_counts_videos_until_the_last_finish():
+    farm = RenderFarm(max_jobs=2)
+    try:
+        # A probe and a segment alongside two finished videos
+        farm.run(python('pass'), label='loudness')
+        farm.run(python('pass'), label='clip#0')
+        for index in range(2):
+            farm.run(python('import time; time.sleep(0.1)'), label=f"video-{index}", video=True)
+    finally:
+        farm.shutdown()
+
+    stats = farm.stats()
+    assert stats['counts'] == {'done': 4} and stats['videos'] == {'done': 2}
+    elapsed = farm.last_finished_at - farm.started_at
+    assert stats['videos_per_hour'] == pytest.approx(2 * 3600 / elapsed)
+    # The window ends at the last video, so idling afterwards changes nothing
+    time.sleep(0.1)
+    assert farm.stats()['videos_per_hour'] == stats['videos_per_hour']
+    assert "videos: 2 done; ffmpeg jobs: 4 done" in farm.report()
+
+
+def test_a_failed_part_cancels_the_rest_of_its_video():
+    farm = RenderFarm(max_jobs=2)
+    try:
+        with pytest.raises(ffmpeg.Error):
+            with farm.video('clip.mp4') as video:
+                slow = farm.submit(python('import time; time.sleep(30)'), parent=video)
+                farm.run(python('import sys; sys.exit(1)'), parent=video)
+        with pytest.raises(RenderCancelled):
+            slow.result()
+        with pytest.raises(RenderCancelled):
+            farm.submit(python('pass'), parent=video)
+    finally:
+        farm.shutdown()
+
+    assert video.status == 'failed' and [job.status for job in video.jobs] == ['cancelled', 'failed']
+    assert farm.stats()['videos'] == {'failed': 1}
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Parsing model output into a structured Script
+"""
+
+from src.script import Script, parse_script
+
+
+MODEL_OUTPUT = """**Title:** 6 shocking facts about the Moon (2024)
+
+Here are 6 mind-blowing facts about the Moon!
+
+1. The Moon is drifting away, about 3.8 cm per year.
+2. **Fact 2:** It has moonquakes (yes, really).
+Fact: Footprints can last for millions of years
+Which fact surprised you the most? Let us know in the comments!
+
+(Note: all facts were verified)
+"""
+
+
+def test_parse_labelled_and_listed_parts():
+    script = parse_script(MODEL_OUTPUT)
+    assert script.title == '6 shocking facts about the Moon (2024)'
+    assert script.hook == 'Here are 6 mind-blowing facts about the Moon!'
+    # Parentheses inside a line are kept; only whole-line notes are dropped
+    assert script.facts == [
+        'The Moon is drifting away, about 3.8 cm per year.',
+        'It has moonquakes (yes, really).',
+        'Footprints can last for millions of years',
+    ]
+    assert script.cta == 'Which fact surprised you the most? Let us know in the comments!'
+    assert 'Note' not in script.text and '*' not in script.text
+
+
+def test_parse_json_output():
+    script = parse_script('```json\n{"title": "T", "hook": "H", "facts": ["A", "B"], "cta": "C"}\n```')
+    assert script.lines() == ['T', 'H', 'A', 'B', 'C']
+
+
+def test_round_trip_and_metadata():
+    script = parse_script(MODEL_OUTPUT)
+    assert Script.from_dict(script.to_dict()).lines() == script.lines()
+
+    metadata = script.metadata()
+    assert metadata['title'] == script.title
+    assert '• It has moonquakes (yes, really).' in metadata['description']
+
+    long_title = Script(title='word ' * 40).metadata()['title']
+    assert len(long_title) <= 100 and long_title.endswith('…')
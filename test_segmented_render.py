@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Segment-parallel rendering must produce the same video as a single pass
+"""
+
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from src.video_processing import VIDEO_FPS, VideoProcessor, plan_segments
+
+
+requires_ffmpeg = pytest.mark.skipif(
+    not (shutil.which('ffmpeg') and shutil.which('ffprobe')),
+    reason="ffmpeg and ffprobe are required")
+
+
+def count_frames(path):
+    """Decode the video stream and return (frame count, container duration)"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-i', str(path), '-map', '0:v:0', '-f', 'null', '-'],
+                            capture_output=True, text=True, check=True)
+    frames = int(re.findall(r'frame=\s*(\d+)', result.stderr)[-1])
+    hours, minutes, seconds = re.search(r'Duration: (\d+):(\d+):([\d.]+)', result.stderr).groups()
+    return frames, int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def test_plan_segments_is_keyframe_aligned():
+    segments = plan_segments(25.01, 8, gop=60)
+    assert [start % 60 for start, _ in segments] == [0] * len(segments)
+    assert sum(frames for _, frames in segments) == 751
+
+
+def fixture(tmp_path, **video_config):
+    """A 3 s background, a 7.3 s narration, subtitles and a processor rendering them"""
+    background = tmp_path / 'background.mp4'
+    narration = tmp_path / 'narration.wav'
+    subtitles = tmp_path / 'subtitles.srt'
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=s=320x240:r=25',
+                    '-t', '3', '-pix_fmt', 'yuv420p', str(background)], check=True)
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'sine=d=7.3:sample_rate=24000',
+                    str(narration)], check=True)
+    subtitles.write_text("1\n00:00:01,000 --> 00:00:05,000\nAcross a boundary\n\n", encoding='utf-8')
+
+    processor = VideoProcessor({'video': dict({
+        'background_video_path': str(background),
+        'background_music_path': '',
+        'output_path': str(tmp_path / 'out'),
+        'asset_cache_dir': str(tmp_path / 'cache'),
+        'loudness_cache_dir': str(tmp_path / 'loudness'),
+        'encoder_profile': 'draft',
+        'segment_seconds': 2,
+    }, **video_config)})
+    return processor, narration, subtitles
+
+
+@requires_ffmpeg
+def test_segmented_render_matches_single_pass(tmp_path):
+    processor, narration, subtitles = fixture(tmp_path)
+
+    single = processor.create_video(str(narration), str(subtitles), 'single.mp4', segmented=False)
+    segmented = processor.create_video(str(narration), str(subtitles), 'segmented.mp4', segmented=True)
+    assert single and segmented
+
+    single_frames, single_duration = count_frames(single)
+    segmented_frames, segmented_duration = count_frames(segmented)
+    assert segmented_frames == single_frames == round(7.3 * VIDEO_FPS)
+    assert abs(segmented_duration - single_duration) < 1.0 / VIDEO_FPS + 0.05
+
+
+@requires_ffmpeg
+def test_segmented_render_is_one_video_and_honours_normalize_background(tmp_path):
+    processor, narration, subtitles = fixture(tmp_path, normalize_background=False)
+    farm = processor.render_farm
+    videos_before = farm.stats()['videos'].get('done', 0)
+    jobs_before = farm.stats()['counts'].get('done', 0)
+
+    segmented = processor.create_video(str(narration), str(subtitles), 'segmented.mp4', segmented=True)
+    assert segmented
+    assert count_frames(segmented)[0] == round(7.3 * VIDEO_FPS)
+    # The original background was scaled during the render, not prepared
+    assert not (tmp_path / 'cache').exists()
+
+    # Four segments and the concat, counted as a single video
+    assert farm.stats()['counts']['done'] - jobs_before == len(plan_segments(7.3, 2, gop=60)) + 1
+    assert farm.stats()['videos']['done'] - videos_before == 1
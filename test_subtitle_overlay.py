@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Overlay subtitle engine: karaoke highlights and a single timed image input
+"""
+
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PIL')
+ffmpeg = pytest.importorskip('ffmpeg')
+from PIL import Image  # noqa: E402
+
+from src.subtitle_overlay import SubtitleOverlayRenderer, styled_words  # noqa: E402
+from src.stt_engine import Word  # noqa: E402
+from src.subtitles import Cue, karaoke_srt_cues  # noqa: E402
+
+
+requires_ffmpeg = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg is required")
+
+STYLE = {'size': 20, 'outline': 1, 'margin_v': 20, 'max_width': 150}
+CUES = [Cue(0.5, 1.0, 'Hello <font color="#FFFF00">world</font>'), Cue(1.5, 2.0, 'Second')]
+
+
+def renderer(tmp_path):
+    return SubtitleOverlayRenderer(tmp_path / 'cues', STYLE, 160, 120)
+
+
+def count(image, predicate):
+    return int(predicate(np.asarray(image.convert('RGB')).astype(int)).sum())
+
+
+def yellow(pixels):
+    return (pixels[..., 0] > 150) & (pixels[..., 1] > 150) & (pixels[..., 2] < 120)
+
+
+def white(pixels):
+    return pixels.min(axis=-1) > 200
+
+
+def test_styled_words():
+    assert styled_words('<i>Hello</i> <font color="#FFFF00">big world</font>!', '#FFF') == \
+        [('Hello', '#FFF'), ('big', '#FFFF00'), ('world', '#FFFF00'), ('!', '#FFF')]
+    assert styled_words("{\\an8}", '#FFF') == []
+
+
+def test_highlighted_word_is_drawn_in_its_color(tmp_path):
+    overlay = renderer(tmp_path)
+    path = overlay.render_cue(CUES[0].text)
+    image = Image.open(path)
+    assert image.size == (160, 120)
+    assert count(image, yellow) > 0 and count(image, white) > 0
+    assert count(Image.open(overlay.render_cue('Hello world')), yellow) == 0
+
+    assert overlay.render_cue(CUES[0].text) == path
+    assert overlay.stats == {'rendered': 2, 'cached': 1}
+
+
+def test_cues_share_one_overlay_input(tmp_path):
+    overlay = renderer(tmp_path)
+    words = [Word(index * 0.4, index * 0.4 + 0.3, f"word{index}") for index in range(6)]
+    cues = karaoke_srt_cues(words)
+    assert len(cues) == 6
+    video = overlay.overlay(ffmpeg.input('background.mp4').video, cues)
+    args = ffmpeg.output(video, 'out.mp4').get_args()
+    assert args.count('-i') == 2
+    assert args[args.index('-filter_complex') + 1].count('overlay') == 1
+
+    listing = overlay.timeline(cues).read_text(encoding='utf-8')
+    # Back-to-back karaoke cues, each highlighting its own word, then a blank frame
+    assert listing.count('duration') == len(cues)
+    assert len(set(line for line in listing.splitlines() if line.startswith('file'))) == len(cues) + 1
+    assert overlay.timeline([]) is None
+    assert overlay.overlay('video', [Cue(1.0, 1.0, 'empty')]) == 'video'
+
+
+@requires_ffmpeg
+def test_cues_show_only_while_active(tmp_path):
+    overlay = renderer(tmp_path)
+    for start in (0.0, 1.5):
+        # Segmented renders stamp frames with their timeline position
+        video = (ffmpeg.input('color=c=blue:s=160x120:r=10:d=2', f='lavfi').video
+                 .filter('setpts', f'PTS-STARTPTS+{start}/TB'))
+        video = overlay.overlay(video, CUES).filter('setpts', 'PTS-STARTPTS')
+        output = tmp_path / f'{start}.mp4'
+        ffmpeg.output(video, str(output), vframes=10, r=10, pix_fmt='yuv420p').run(quiet=True)
+        subprocess.run(['ffmpeg', '-v', 'error', '-i', str(output), str(tmp_path / f'{start}-%02d.png')],
+                       check=True)
+
+        frames = [Image.open(tmp_path / f'{start}-{index:02d}.png') for index in range(1, 11)]
+        shown = ''.join('Y' if count(frame, yellow) else 'W' if count(frame, white) else '.'
+                        for frame in frames)
+        assert shown == {0.0: '.....YYYYY', 1.5: 'WWWWW.....'}[start]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Subtitle timing from TTS segments, the narration's energy and recognized words
+"""
+
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from src.audio_processing import NarrationSegment
+from src.stt_engine import Word, align_words_to_script, stream_audio_windows
+from src.subtitles import (
+    align_sentences,
+    cues_from_segments,
+    cues_from_words,
+    find_pauses,
+    karaoke_ass_cues,
+    karaoke_srt_cues,
+)
+
+
+SAMPLE_RATE = 1000
+
+SCRIPT = "Octopuses have three hearts, and blue blood! Wow."
+
+# What a recognizer might hear: lowercase, no punctuation, "three" misheard,
+# "blue" missed and a filler word that is not in the script
+RECOGNIZED = [Word(0.0, 0.4, 'octopuses'), Word(0.5, 0.9, 'have'), Word(1.0, 1.3, 'tree'),
+              Word(1.4, 1.9, 'hearts'), Word(2.6, 2.9, 'and'), Word(3.0, 3.1, 'um'),
+              Word(3.4, 3.8, 'blood'), Word(4.0, 4.3, 'wow')]
+
+
+def waveform(*parts):
+    """Concatenate (seconds, amplitude) stretches of a 100 Hz tone"""
+    chunks = []
+    for seconds, amplitude in parts:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        chunks.append(amplitude * np.sin(2 * np.pi * 100 * t))
+    return np.concatenate(chunks).astype(np.float32)
+
+
+def test_find_pauses():
+    samples = waveform((0.2, 0), (1.0, 1), (0.4, 0), (2.0, 1), (0.1, 0), (0.5, 1), (0.2, 0))
+    start, end, pauses = find_pauses(samples, SAMPLE_RATE)
+    assert start == pytest.approx(0.2, abs=0.02)
+    assert end == pytest.approx(4.2, abs=0.02)
+    # The 0.1 s gap is shorter than min_pause
+    assert len(pauses) == 1
+    assert pauses[0] == pytest.approx((1.2, 1.6), abs=0.02)
+
+
+def test_pause_threshold_is_relative_to_the_loudest_frame():
+    # Room noise at -40 dB is silence, breathing at -26 dB is not
+    quiet = waveform((1.0, 1), (0.4, 0.01), (1.0, 1))
+    assert len(find_pauses(quiet, SAMPLE_RATE)[2]) == 1
+    breathy = waveform((1.0, 1), (0.4, 0.05), (1.0, 1))
+    assert find_pauses(breathy, SAMPLE_RATE)[2] == []
+    assert find_pauses(breathy, SAMPLE_RATE, threshold_db=-20.0)[2] != []
+
+    assert find_pauses(np.zeros(5, dtype=np.float32), SAMPLE_RATE) == (0.0, 0.005, [])
+
+
+def test_align_sentences_spreads_by_length_without_pauses():
+    cues = align_sentences(["Short one.", "A sentence three times as long."], waveform((4.0, 1)), SAMPLE_RATE)
+    assert [cue.text for cue in cues] == ["Short one.", "A sentence three times as long."]
+    assert cues[0].start == pytest.approx(0.0, abs=0.02)
+    assert cues[0].end == pytest.approx(4.0 * 10 / 41, abs=0.02)
+    assert cues[1].start == cues[0].end
+    assert cues[1].end == pytest.approx(4.0, abs=0.02)
+
+
+def test_align_sentences_snaps_to_pauses():
+    samples = waveform((1.0, 1), (0.4, 0), (2.6, 1))
+    cues = align_sentences(["First sentence here.", "Second sentence here."], samples, SAMPLE_RATE)
+    # The length estimate (about 1.95 s) is snapped to the middle of the pause
+    assert cues[0].end == pytest.approx(1.2, abs=0.02)
+    assert cues[1].start == cues[0].end
+
+    assert align_sentences([], samples, SAMPLE_RATE) == []
+    assert align_sentences(["  ", ""], samples, SAMPLE_RATE) == []
+
+
+def test_cues_from_segments():
+    long_line = "This fact is long enough, so it is split at the comma, into three parts of the span"
+    segments = [NarrationSegment("Fact: Short line.", 0.0, 1.5),
+                NarrationSegment(long_line, 1.6, 4.0)]
+    cues = cues_from_segments(segments)
+    assert cues[0].text == "Short line." and (cues[0].start, cues[0].end) == (0.0, 1.5)
+
+    parts = cues[1:]
+    assert len(parts) == 3
+    assert parts[0].start == 1.6 and parts[-1].end == pytest.approx(5.6)
+    lengths = [len(cue.text) for cue in parts]
+    for cue, length in zip(parts, lengths):
+        assert cue.end - cue.start == pytest.approx(4.0 * length / sum(lengths))
+
+    assert cues_from_segments([]) == []
+
+
+def spans(words):
+    return [(word.text, round(word.start, 3), round(word.end, 3)) for word in words]
+
+
+def test_align_words_to_script():
+    words = align_words_to_script(RECOGNIZED, SCRIPT)
+    # Script text is kept; timings come from the recognized words
+    assert spans(words) == [
+        ('Octopuses', 0.0, 0.4), ('have', 0.5, 0.9),
+        ('three', 1.0, 1.3),     # misheard word of the same length: its timing is used
+        ('hearts,', 1.4, 1.9), ('and', 2.6, 2.9),
+        ('blue', 3.0, 3.1),      # missed, but a filler was heard in its place
+        ('blood!', 3.4, 3.8), ('Wow.', 4.0, 4.3),
+    ]
+
+    # Recognized words that are not in the script are dropped
+    assert spans(align_words_to_script([Word(0, 1, 'hello'), Word(1, 2, 'big'), Word(2, 3, 'wide'),
+                                        Word(3, 4, 'world')], "Hello world")) == \
+        [('Hello', 0, 1), ('world', 3, 4)]
+    # Script words the recognizer missed share the gap between their neighbours
+    assert spans(align_words_to_script([Word(0, 1, 'hello'), Word(3, 4, 'world')],
+                                       "Hello there, my world")) == \
+        [('Hello', 0, 1), ('there,', 1, 2), ('my', 2, 3), ('world', 3, 4)]
+
+    assert align_words_to_script([], SCRIPT) == []
+    assert align_words_to_script(RECOGNIZED, "  ") == []
+
+
+def test_cues_from_words_break_at_sentences_pauses_and_length():
+    words = align_words_to_script(RECOGNIZED, SCRIPT)
+    cues = cues_from_words(words, max_words=3)
+    assert [(cue.text, cue.start, cue.end) for cue in cues] == [
+        ("Octopuses have three", 0.0, 1.3),
+        ("hearts,", 1.4, 1.9),              # 0.7 s pause before "and"
+        ("and blue blood!", 2.6, 3.8),      # sentence end
+        ("Wow.", 4.0, 4.3),
+    ]
+
+
+def test_karaoke_cues():
+    words = align_words_to_script(RECOGNIZED, SCRIPT)[:4]
+    srt = karaoke_srt_cues(words)
+    assert [(cue.start, cue.end) for cue in srt] == [(0.0, 0.5), (0.5, 1.0), (1.0, 1.4), (1.4, 1.9)]
+    assert srt[1].text == 'Octopuses <font color="#FFFF00">have</font> three hearts,'
+    assert all(cue.text.count('<font') == 1 for cue in srt)
+
+    ass = karaoke_ass_cues(words)
+    assert len(ass) == 1 and (ass[0].start, ass[0].end) == (0.0, 1.9)
+    # Each word fills until the next one starts, the last one until it ends
+    assert ass[0].text == "{\\k50}Octopuses {\\k50}have {\\k40}three {\\k50}hearts,"
+
+    assert karaoke_srt_cues([]) == [] and karaoke_ass_cues([]) == []
+
+
+@pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg is required")
+def test_stream_audio_windows_cut_at_pauses(tmp_path):
+    sample_rate = 8000
+    # Speech, then a pause inside the search region of the first 3 s window
+    samples = np.concatenate([
+        waveform((2.2, 0.5)), np.zeros(int(0.4 * SAMPLE_RATE)), waveform((2.0, 0.5))])
+    samples = np.repeat(samples, sample_rate // SAMPLE_RATE)
+    path = tmp_path / 'speech.wav'
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((samples * 32767).astype('<i2').tobytes())
+
+    windows = list(stream_audio_windows(path, window_seconds=3.0, search_seconds=1.5,
+                                        sample_rate=sample_rate))
+    assert len(windows) == 2
+    (first_offset, first), (second_offset, second) = windows
+    assert first_offset == 0.0
+    # Cut in the middle of the pause rather than at the 3 s mark
+    assert second_offset == pytest.approx(2.4, abs=0.03)
+    assert len(first) + len(second) == len(samples)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+TTS engine reuse, its timing counters and the segment cache that keeps
+re-runs from loading it
+"""
+
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+from src import tts_engine
+from src.audio_processing import AudioProcessor
+from src.tts_engine import get_tts_engine, reference_hash
+
+
+LINES = ["The ocean is deep.", "Octopuses have three hearts."]
+
+
+class StubModel:
+    """Stands in for f5_tts.api.F5TTS: slow to load, counts how often it is"""
+
+    loads = 0
+    target_sample_rate = 24000
+    ema_model = vocoder = mel_spec_type = device = None
+
+    def __init__(self, model):
+        time.sleep(0.05)
+        StubModel.loads += 1
+
+
+def stub_f5_tts(monkeypatch):
+    """Install a stub F5-TTS package (and torchaudio) with the calls TTSEngine makes"""
+    def preprocess(audio_path, text):
+        calls['preprocess'] += 1
+        return audio_path, text
+
+    def infer_batch_process(reference, text, batches, *args, **kwargs):
+        time.sleep(0.01)
+        yield np.zeros(len(' '.join(batches)) * 100, dtype=np.float32), 24000, None
+
+    calls = {'preprocess': 0}
+    modules = {
+        'f5_tts': types.ModuleType('f5_tts'),
+        'f5_tts.api': types.SimpleNamespace(F5TTS=StubModel),
+        'f5_tts.infer': types.ModuleType('f5_tts.infer'),
+        'f5_tts.infer.utils_infer': types.SimpleNamespace(
+            preprocess_ref_audio_text=preprocess,
+            chunk_text=lambda text, max_chars: [text],
+            infer_batch_process=infer_batch_process),
+        'torchaudio': types.SimpleNamespace(load=lambda path: (np.zeros((1, 48000)), 24000)),
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.setattr(StubModel, 'loads', 0)
+    monkeypatch.setattr(tts_engine, '_engines', {})
+    monkeypatch.setattr(tts_engine, 'model_id', lambda model: f"{model}@stub")
+    return calls
+
+
+def cached_processor(tmp_path):
+    return AudioProcessor({'tts': {'model': 'tone', 'cache_dir': str(tmp_path / 'tts')}})
+
+
+def test_cached_narration_does_not_load_the_engine(tmp_path):
+    first = cached_processor(tmp_path)
+    narration, segments = first.synthesize(LINES)
+    assert first._engine is not None
+
+    # A later run with every sentence cached never touches the model
+    again = cached_processor(tmp_path)
+    cached, cached_segments = again.synthesize(LINES)
+    assert again._engine is None
+    assert cached.samples.tobytes() == narration.samples.tobytes()
+    assert [s.duration for s in cached_segments] == [s.duration for s in segments]
+    assert again.text_to_speech_chunked(LINES, str(tmp_path / 'narration.wav'))
+    assert again._engine is None
+
+    # A changed line loads it for that line only
+    edited = cached_processor(tmp_path)
+    edited.synthesize([LINES[0], "Octopuses have blue blood."])
+    assert edited._engine is not None
+
+
+def test_reference_hash_covers_audio_and_transcript(tmp_path):
+    audio, text = tmp_path / 'voice.wav', tmp_path / 'voice.txt'
+    audio.write_bytes(b'RIFF one')
+    text.write_text("Hello there\n", encoding='utf-8')
+    original = reference_hash(audio, text)
+
+    text.write_text("Hello there", encoding='utf-8')
+    assert reference_hash(audio, text) == original
+    text.write_text("Hello again", encoding='utf-8')
+    edited_text = reference_hash(audio, text)
+    assert edited_text != original
+    audio.write_bytes(b'RIFF two!')
+    assert reference_hash(audio, text) not in (original, edited_text)
+
+
+def test_engine_loads_the_model_once_per_process(monkeypatch, tmp_path):
+    calls = stub_f5_tts(monkeypatch)
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(get_tts_engine('stub')))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engines.append(get_tts_engine('stub'))
+
+    engine = engines[0]
+    assert StubModel.loads == 1 and all(other is engine for other in engines)
+    assert engine.model_id == 'stub@stub' and engine.sample_rate == 24000
+    assert engine.stats['model_load_seconds'] >= 0.05
+
+    # The reference voice is preprocessed once and found by its content hash
+    audio, text = tmp_path / 'voice.wav', tmp_path / 'voice.txt'
+    audio.write_bytes(b'RIFF voice')
+    text.write_text("Hello there", encoding='utf-8')
+    reference = engine.reference(audio, text)
+    assert engine.reference(audio, text) is reference
+    assert reference.content_hash == reference_hash(audio, text)
+    assert calls['preprocess'] == 1
+    assert (engine.stats['reference_cache_hits'], engine.stats['reference_cache_misses']) == (1, 1)
+
+    for line in LINES:
+        wave, sample_rate = engine.synthesize(line, reference)
+        assert len(wave) and sample_rate == 24000
+    assert engine.stats['utterances'] == 2 and engine.stats['inference_seconds'] >= 0.02
+    assert "over 2 utterances" in engine.timing_report()
+    assert StubModel.loads == 1
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+UploadQueue against a local stub of the resumable upload endpoint
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.upload_queue import CHUNK_ALIGNMENT, UploadError, UploadQueue, UploadSessionStore
+
+
+class StubUploadServer(BaseHTTPRequestHandler):
+    sessions = {}
+    failures = []   # status codes for the next chunk PUTs
+    log = []
+    lock = threading.Lock()
+
+    def reply(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        metadata = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            session_id = str(len(self.sessions) + 1)
+            self.sessions[session_id] = {
+                'data': bytearray(), 'size': int(self.headers['X-Upload-Content-Length']),
+                'metadata': metadata,
+            }
+            self.log.append(('start', session_id, self.headers['Authorization']))
+        host, port = self.server.server_address
+        self.reply(200, {'Location': f"http://{host}:{port}/session/{session_id}"})
+
+    def do_PUT(self):
+        session = self.sessions.get(self.path.rsplit('/', 1)[1])
+        data = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if session is None:
+            return self.reply(404)
+
+        content_range = self.headers['Content-Range']
+        with self.lock:
+            if content_range.startswith('bytes */'):
+                self.log.append(('query', len(session['data'])))
+            else:
+                start, end = map(int, re.match(r'bytes (\d+)-(\d+)/', content_range).groups())
+                self.log.append(('chunk', start, len(data)))
+                if self.failures:
+                    # Keep half of the chunk, like a dropped connection would
+                    if start == len(session['data']):
+                        session['data'] += data[:len(data) // 2]
+                    return self.reply(self.failures.pop(0))
+                if start == len(session['data']):
+                    session['data'] += data
+
+        received = len(session['data'])
+        if received == session['size']:
+            return self.reply(200, body=json.dumps({'id': f"video-{received}"}).encode())
+        headers = {'Range': f"bytes=0-{received - 1}"} if received else {}
+        self.reply(308, headers)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StubUploadServer.sessions = {}
+    StubUploadServer.failures = []
+    StubUploadServer.log = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubUploadServer)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/upload"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_queue(upload_url, tmp_path, **options):
+    options = dict({'chunk_size': CHUNK_ALIGNMENT, 'adaptive': False, 'backoff': 0.01}, **options)
+    return UploadQueue(lambda force_refresh=False: 'token', UploadSessionStore(tmp_path / 'sessions.json'),
+                       upload_url=upload_url, **options)
+
+
+def make_video(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(bytes(i % 251 for i in range(size)))
+    return path
+
+
+METADATA = {'snippet': {'title': 'Test'}, 'status': {'privacyStatus': 'private'}}
+
+
+def test_upload_in_chunks(server, tmp_path):
+    video = make_video(tmp_path, 'a.mp4', 3 * CHUNK_ALIGNMENT + 1000)
+    queue = make_queue(server, tmp_path)
+    assert queue.upload(video, METADATA) == f"video-{video.stat().st_size}"
+
+    session = StubUploadServer.sessions['1']
+    assert bytes(session['data']) == video.read_bytes()
+    assert session['metadata'] == METADATA
+    assert [entry[0] for entry in StubUploadServer.log] == ['start'] + ['chunk'] * 4
+    assert StubUploadServer.log[0][2] == 'Bearer token'
+
+
+def test_transient_errors_resume_from_server_offset(server, tmp_path):
+    video = make_video(tmp_path, 'b.mp4', 2 * CHUNK_ALIGNMENT)
+    StubUploadServer.failures = [503, 500]
+    queue = make_queue(server, tmp_path)
+    assert queue.upload(video, METADATA)
+
+    assert bytes(StubUploadServer.sessions['1']['data']) == video.read_bytes()
+    assert queue.stats['retries'] == 2
+    # After each failure the queue asks for the offset instead of starting over
+    assert sum(1 for entry in StubUploadServer.log if entry[0] == 'query') == 2
+    assert sum(1 for entry in StubUploadServer.log if entry[0] == 'start') == 1
+
+
+def test_interrupted_upload_continues_in_a_new_process(server, tmp_path):
+    video = make_video(tmp_path, 'c.mp4', 4 * CHUNK_ALIGNMENT)
+    StubUploadServer.failures = [503]
+    with pytest.raises(UploadError):
+        make_queue(server, tmp_path, max_retries=0).upload(video, METADATA)
+    assert 0 < len(StubUploadServer.sessions['1']['data']) < video.stat().st_size
+
+    # A fresh queue finds the persisted session URI and continues it
+    queue = make_queue(server, tmp_path)
+    assert queue.upload(video, METADATA)
+    assert queue.stats['resumed'] == 1
+    assert len(StubUploadServer.sessions) == 1
+    assert bytes(StubUploadServer.sessions['1']['data']) == video.read_bytes()
+    assert json.loads((tmp_path / 'sessions.json').read_text()) == {}
+
+
+def test_client_errors_are_not_retried(server, tmp_path):
+    video = make_video(tmp_path, 'd.mp4', CHUNK_ALIGNMENT)
+    StubUploadServer.failures = [400]
+    queue = make_queue(server, tmp_path)
+    with pytest.raises(UploadError):
+        queue.upload(video, METADATA)
+    assert queue.stats['retries'] == 0
+
+
+def test_concurrent_uploads_and_adaptive_chunks(server, tmp_path):
+    videos = [make_video(tmp_path, f"v{i}.mp4", (8 + i) * CHUNK_ALIGNMENT) for i in range(3)]
+    queue = make_queue(server, tmp_path, max_workers=3, adaptive=True,
+                       max_chunk_size=4 * CHUNK_ALIGNMENT)
+    futures = [queue.submit(video, dict(METADATA, snippet={'title': video.name})) for video in videos]
+    assert [future.result() for future in futures] == [f"video-{v.stat().st_size}" for v in videos]
+    queue.shutdown()
+
+    # Fast local transfers grow the chunks up to the configured maximum
+    chunk_sizes = {entry[2] for entry in StubUploadServer.log if entry[0] == 'chunk'}
+    assert max(chunk_sizes) == 4 * CHUNK_ALIGNMENT
+    assert all(size % CHUNK_ALIGNMENT == 0 for size in chunk_sizes if size >= CHUNK_ALIGNMENT)
+
+
+def test_measured_uploads_are_recorded_per_video(server, tmp_path):
+    from src.metrics import PipelineMetrics
+
+    metrics = PipelineMetrics()
+    videos = [make_video(tmp_path, f"m{i}.mp4", CHUNK_ALIGNMENT) for i in range(2)]
+    StubUploadServer.failures = [400]
+    queue = make_queue(server, tmp_path, max_workers=1)
+    futures = [queue.submit(video, METADATA, measure=metrics.stage(video.stem, 'upload', video.stat().st_size))
+               for video in videos]
+    with pytest.raises(UploadError):
+        futures[0].result()
+    assert futures[1].result()
+    queue.shutdown()
+
+    stats = metrics.stages['upload']
+    assert stats.runs == {'ok': 1, 'error': 1, 'skipped': 0}
+    assert stats.bytes_in == 2 * CHUNK_ALIGNMENT
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Background preparation and the narration/music mix of a render
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import ffmpeg
+import numpy as np
+import pytest
+
+from src.video_processing import VIDEO_HEIGHT, VIDEO_WIDTH, VideoProcessor
+
+
+requires_ffmpeg = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg is required")
+
+
+def make_processor(tmp_path, **video_config):
+    background = tmp_path / 'background.mp4'
+    if not background.exists():
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=s=320x240:r=25',
+                        '-t', '1', '-pix_fmt', 'yuv420p', str(background)], check=True)
+    return VideoProcessor({'video': dict({
+        'background_video_path': str(background),
+        'background_music_path': '',
+        'output_path': str(tmp_path / 'out'),
+        'asset_cache_dir': str(tmp_path / 'backgrounds'),
+        'loudness_cache_dir': str(tmp_path / 'loudness'),
+        'encoder_profile': 'draft',
+    }, **video_config)})
+
+
+@requires_ffmpeg
+def test_prepared_background_is_reused(tmp_path):
+    processor = make_processor(tmp_path)
+    prepared = Path(processor.prepare_background())
+    info = processor.media.probe(prepared)
+    assert (info.width, info.height) == (VIDEO_WIDTH, VIDEO_HEIGHT) and not info.has_audio
+
+    farm = processor.render_farm
+    jobs_before = farm.stats()['counts'].get('done', 0)
+    mtime = prepared.stat().st_mtime_ns
+    # Another processor (e.g. the next batch job) finds the published file
+    assert make_processor(tmp_path).prepare_background() == str(prepared)
+    assert farm.stats()['counts'].get('done', 0) == jobs_before
+    assert prepared.stat().st_mtime_ns == mtime
+    # No temporary files are left next to it
+    assert list((tmp_path / 'backgrounds').iterdir()) == [prepared]
+
+
+@requires_ffmpeg
+def test_failed_preparation_leaves_no_partial_file(tmp_path):
+    processor = make_processor(tmp_path)
+    broken = tmp_path / 'broken.mp4'
+    broken.write_bytes(b'not a video')
+    with pytest.raises(ffmpeg.Error):
+        processor.prepare_background(str(broken))
+    assert list((tmp_path / 'backgrounds').iterdir()) == []
+
+
+def lavfi(source, path):
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', source, str(path)], check=True)
+
+
+def decode(path, start, end):
+    """Stereo float samples of a file between start and end seconds"""
+    data, _ = (ffmpeg.input(str(path), ss=start, t=end - start)
+               .output('pipe:', format='f32le', ac=2, ar=48000)
+               .run(capture_stdout=True, quiet=True))
+    return np.frombuffer(data, np.float32).reshape(-1, 2)
+
+
+@requires_ffmpeg
+def test_music_keeps_its_stereo_image_under_the_narration(tmp_path):
+    # One second of mono voice, then a pause where only the music plays
+    narration = tmp_path / 'narration.wav'
+    lavfi('aevalsrc=if(lt(t\\,1)\\,0.5*sin(2*PI*440*t)\\,0):s=24000:d=2', narration)
+    # Different tones left and right, so a downmix would show
+    music = tmp_path / 'music.wav'
+    lavfi('aevalsrc=0.3*sin(2*PI*220*t)|0.3*sin(2*PI*330*t):s=44100:d=0.7', music)
+
+    processor = make_processor(tmp_path, background_music_path=str(music))
+    output = processor.create_video(str(narration), None, 'mixed.mp4')
+    assert output
+
+    info = processor.media.probe(output)
+    assert info.has_audio
+    assert info.duration == pytest.approx(2.0, abs=0.1)
+    assert (info.channels, info.sample_rate) == (2, 48000)
+
+    # The looped music fills the pause on both channels, each with its own tone
+    pause = decode(output, 1.3, 1.9)
+    left, right = pause[:, 0], pause[:, 1]
+    assert np.abs(left).max() > 0.01 and np.abs(right).max() > 0.01
+    assert not np.allclose(left, right, atol=0.01)